@@ -143,28 +143,18 @@ class ActivityCollector:
     def get_activity_summary(self, start_time: datetime, end_time: datetime) -> Dict:
         """Get activity summary for a time period."""
         try:
-            logs = self.db.get_activity_logs_between(start_time, end_time)
-            
-            # Calculate summary statistics
-            app_usage = {}
-            total_time = 0
-            last_time = None
-            last_app = None
-
-            for log in logs:
-                current_time = datetime.fromisoformat(log["created_at"])
-                
-                if last_time and last_app:
-                    time_diff = (current_time - last_time).total_seconds()
-                    app_usage[last_app] = app_usage.get(last_app, 0) + time_diff
-                    total_time += time_diff
-
-                last_time = current_time
-                last_app = log["app_name"]
+            rollups = self.db.get_rollup_summary(self.user_id, start_time, end_time)
 
+            app_usage = {
+                app: totals["active_seconds"] + totals["idle_seconds"]
+                for app, totals in rollups.items()
+            }
             return {
-                "total_time": total_time,
+                "total_time": sum(app_usage.values()),
+                "active_time": sum(totals["active_seconds"] for totals in rollups.values()),
+                "idle_time": sum(totals["idle_seconds"] for totals in rollups.values()),
                 "app_usage": app_usage,
+                "app_totals": rollups,
                 "start_time": start_time.isoformat(),
                 "end_time": end_time.isoformat()
             }
@@ -173,7 +163,10 @@ class ActivityCollector:
             logger.error(f"Error getting activity summary: {str(e)}")
             return {
                 "total_time": 0,
+                "active_time": 0,
+                "idle_time": 0,
                 "app_usage": {},
+                "app_totals": {},
                 "start_time": start_time.isoformat(),
                 "end_time": end_time.isoformat()
             }
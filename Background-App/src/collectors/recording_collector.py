@@ -5,7 +5,7 @@ import platform
 import cv2
 import numpy as np
 import pyautogui
-from utils.sqlite_manager import SQLiteManager
+from ..utils.sqlite_manager import get_engine
 
 TERMINAL_APPS = [
     "cmd.exe", "powershell.exe", "conhost.exe", # Windows
@@ -25,18 +25,17 @@ def is_terminal_active():
     return False
 
 class RecordingCollector:
-    def __init__(self, user_id, output_dir="data/recordings"):
+    def __init__(self, user_id, output_dir="data/recordings", max_recordings=100):
         self.user_id = user_id
         self.output_dir = output_dir
-        self.sqlite_db = SQLiteManager()
+        self.max_recordings = max_recordings
+        self.sqlite_db = get_engine()
         os.makedirs(output_dir, exist_ok=True)
 
     def capture_recording(self, duration=10):
         if is_terminal_active():
             return None
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(self.output_dir, f"{file_id}.mp4")
-        timestamp = datetime.utcnow().isoformat()
+        file_path = os.path.join(self.output_dir, f"{uuid.uuid4()}.mp4")
         screen = pyautogui.size()
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         out = cv2.VideoWriter(file_path, fourcc, 20.0, (screen.width, screen.height))
@@ -47,16 +46,8 @@ class RecordingCollector:
             frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
             out.write(frame)
         out.release()
-        file_size = os.path.getsize(file_path)
-        data = {
-            "id": file_id,
-            "user_id": self.user_id,
-            "timestamp": timestamp,
-            "file_path": file_path,
-            "file_size": file_size,
-            "duration": duration,
-            "created_at": timestamp
-        }
-        self.sqlite_db.insert_record("recordings", data)
-        self.sqlite_db.cleanup_old_media("recordings", self.output_dir)
-        return {"id": file_id, "count": self.sqlite_db.get_count("recordings", self.user_id)} 
\ No newline at end of file
+        recording_id = self.sqlite_db.insert_recording(
+            self.user_id, file_path, os.path.getsize(file_path), duration
+        )
+        self.sqlite_db.delete_old_recordings(self.user_id, self.max_recordings)
+        return {"id": recording_id, "count": self.sqlite_db.get_recording_count(self.user_id)}
\ No newline at end of file
@@ -1,29 +1,66 @@
 import asyncio
 import logging
 import os
-from datetime import datetime
-import pygetwindow as gw
-import keyboard
-import mouse
+from datetime import datetime, timedelta
+from typing import Optional
 from PIL import ImageGrab
-from .utils.sqlite_manager import SQLiteManager
+
+# Desktop input/window libraries are unavailable on headless machines (e.g.
+# when replaying a journal); ActivityMonitor accepts fake backends instead.
+try:
+    import pygetwindow as gw
+except (ImportError, NotImplementedError):
+    gw = None
+try:
+    import keyboard
+    import mouse
+except ImportError:
+    keyboard = mouse = None
+from .utils.sqlite_manager import get_engine
+from .utils.async_storage import AsyncStorage
+from .utils.partitions import PartitionManager
+from .utils.storage_compactor import StorageCompactor
 from .utils.sync_manager import SyncManager
 from .utils.event_manager import EventManager
+from .utils.input_bridge import InputBridge
+from .utils.activity_aggregator import ActivityAggregator
+from .utils.config import KEYSTROKE_INTERVAL, MOUSE_MOVE_THRESHOLD, DATA_RETENTION_DAYS
 from .utils.resource_manager import ResourceManager
+from .utils.event_journal import EventRecorder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ActivityMonitor:
-    def __init__(self, supabase_url: str, supabase_key: str, user_id: str):
+    def __init__(self,
+                 supabase_url: str,
+                 supabase_key: str,
+                 user_id: str,
+                 db_path: str = "workmatrix.db",
+                 window_backend=None,
+                 screen_backend=None,
+                 data_dir: Optional[str] = None):
         self.user_id = user_id
+
+        # Sources of the active window and screenshots; pygetwindow and
+        # PIL.ImageGrab unless replaced (see src/replay.py)
+        self.window_backend = window_backend or gw
+        self.screen_backend = screen_backend or ImageGrab
         
         # Initialize managers
-        self.sqlite = SQLiteManager()
+        self.sqlite = get_engine(db_path)
+        # Handlers write through this so SQLite never runs on the event loop
+        self.storage = AsyncStorage(self.sqlite)
+        self.partitions = PartitionManager(self.sqlite)
         self.event_manager = EventManager()
+        self.input_bridge = InputBridge(
+            self.event_manager,
+            mouse_move_threshold=MOUSE_MOVE_THRESHOLD
+        )
+        self.aggregator = ActivityAggregator(window_seconds=KEYSTROKE_INTERVAL)
         self.resource_manager = ResourceManager(
-            base_dir=os.path.join(os.path.dirname(__file__), '..', 'data'),
+            base_dir=data_dir or os.path.join(os.path.dirname(__file__), '..', 'data'),
             max_storage_mb=500,  # 500MB limit for screenshots
             max_file_age_days=7,
             compression_quality=60
@@ -32,6 +69,7 @@ class ActivityMonitor:
             supabase_url=supabase_url,
             supabase_key=supabase_key,
             sqlite=self.sqlite,
+            storage=self.storage,
             max_batch_size=50,
             sync_interval=300  # 5 minutes
         )
@@ -45,23 +83,26 @@ class ActivityMonitor:
         self.screenshot_interval = 300  # 5 minutes
         self.activity_log_interval = 60  # 1 minute
         self.idle_threshold = 300  # 5 minutes
+        self.performance_log_interval = 60  # 1 minute
+        self.retention_days = DATA_RETENTION_DAYS
+        self.compactor = StorageCompactor(self.sqlite, retention_days=self.retention_days)
 
     async def start_monitoring(self):
         """Start monitoring user activity."""
         try:
             self._running = True
-            self.current_time_entry = self.sqlite.insert_time_entry(self.user_id)
-            
-            # Register event handlers
-            self.event_manager.register_handler('keyboard', self._handle_keyboard_event)
-            self.event_manager.register_handler('mouse', self._handle_mouse_event)
-            self.event_manager.register_handler('window', self._handle_window_event)
+            self.current_time_entry = await self.storage.insert_time_entry(self.user_id)
+            self.register_handlers()
             
             # Start all monitoring tasks
             await asyncio.gather(
                 self.event_manager.start(),
+                self.input_bridge.run(),
                 self._monitor_activity(),
+                self._flush_activity(),
+                self._flush_writes(),
                 self._take_screenshots(),
+                self._report_performance(),
                 self.sync_manager.start(),
                 self._cleanup_task()
             )
@@ -71,24 +112,41 @@ class ActivityMonitor:
         finally:
             await self.stop_monitoring()
 
+    def register_handlers(self):
+        """Register the monitor's event handlers with the event manager."""
+        self.event_manager.register_handler('keyboard', self._handle_keyboard_event)
+        self.event_manager.register_handler('mouse', self._handle_mouse_event)
+        self.event_manager.register_handler('mouse_movement', self._handle_mouse_movement_event)
+        self.event_manager.register_handler('window', self._handle_window_event)
+
     async def stop_monitoring(self):
         """Stop monitoring and clean up."""
         try:
             self._running = False
             
             # Stop managers
+            self.input_bridge.stop()
             self.event_manager.stop()
             self.sync_manager.stop()
             
+            # Persist counts from the still-open aggregation window
+            await self._write_rollups(self.aggregator.flush(force=True))
+
             # Update time entry
             if self.current_time_entry:
-                self.sqlite.update_time_entry(
+                await self.storage.update_time_entry(
                     self.current_time_entry,
                     end_time=datetime.now().isoformat()
                 )
             
+            # Commit everything still in the write buffer before syncing
+            await self.storage.flush()
+
             # Final sync
             await self.sync_manager.force_sync()
+            await self.sync_manager.close()
+            self.storage.close()
+            self.sqlite.close()
             
         except Exception as e:
             logger.error(f"Error stopping monitoring: {e}")
@@ -98,14 +156,7 @@ class ActivityMonitor:
         """Monitor and log user activity."""
         while self._running:
             try:
-                # Get active window
-                active_window = gw.getActiveWindow()
-                if active_window:
-                    await self.event_manager.put_event('window', {
-                        'app_name': active_window.title,
-                        'window_title': active_window.title,
-                        'timestamp': datetime.now().isoformat()
-                    })
+                await self._poll_active_window()
                 
                 # Check for idle state
                 idle_time = (datetime.now() - self.last_activity).total_seconds()
@@ -118,6 +169,55 @@ class ActivityMonitor:
                 logger.error(f"Error in activity monitoring: {e}")
                 await asyncio.sleep(5)  # Wait before retrying
 
+    async def _poll_active_window(self):
+        """Queue a window event for the window the backend reports as active."""
+        active_window = self.window_backend.getActiveWindow()
+        if active_window:
+            await self.event_manager.put_event('window', {
+                'app_name': active_window.title,
+                'window_title': active_window.title
+            })
+
+    async def _flush_activity(self):
+        """Periodically write aggregated input counts as rollup rows."""
+        while self._running:
+            try:
+                await asyncio.sleep(self.aggregator.window_seconds)
+                await self._write_rollups(self.aggregator.flush())
+            except Exception as e:
+                logger.error(f"Error flushing activity rollups: {e}")
+                await asyncio.sleep(5)  # Wait before retrying
+
+    async def _flush_writes(self):
+        """Commit buffered SQLite inserts once they reach the write delay.
+
+        Busy periods flush on row count from the insert itself; this bounds
+        how long rows wait in memory when inserts are sparse.
+        """
+        interval = self.sqlite.write_buffer.max_delay / 2
+        while self._running:
+            try:
+                await asyncio.sleep(interval)
+                await self.storage.write(self.sqlite.flush_if_due)
+            except Exception as e:
+                logger.error(f"Error flushing buffered writes: {e}")
+                await asyncio.sleep(5)  # Wait before retrying
+
+    async def _write_rollups(self, rows):
+        """Insert one activity log row per aggregated window and app."""
+        for row in rows:
+            await self.storage.insert_activity_log(
+                user_id=self.user_id,
+                time_entry_id=self.current_time_entry,
+                app_name=row['app_name'],
+                window_title=row['window_title'],
+                activity_type='input',
+                keystroke_count=row['keystroke_count'],
+                mouse_events=row['mouse_events'],
+                mouse_movement_distance=row['mouse_movement_distance'],
+                scroll_events=row['scroll_events']
+            )
+
     async def _take_screenshots(self):
         """Take periodic screenshots."""
         while self._running:
@@ -125,18 +225,7 @@ class ActivityMonitor:
                 # Skip if user is idle
                 idle_time = (datetime.now() - self.last_activity).total_seconds()
                 if idle_time < self.idle_threshold:
-                    screenshot = ImageGrab.grab()
-                    filepath = await self.resource_manager.save_screenshot(
-                        screenshot,
-                        self.user_id
-                    )
-                    
-                    if filepath:
-                        self.sqlite.insert_screenshot(
-                            user_id=self.user_id,
-                            time_entry_id=self.current_time_entry,
-                            local_file_path=filepath
-                        )
+                    await self._capture_screenshot()
                 
                 await asyncio.sleep(self.screenshot_interval)
                 
@@ -144,62 +233,114 @@ class ActivityMonitor:
                 logger.error(f"Error taking screenshot: {e}")
                 await asyncio.sleep(5)  # Wait before retrying
 
+    async def _capture_screenshot(self):
+        """Grab the screen from the backend, save it and record it for upload."""
+        screenshot = self.screen_backend.grab()
+        filepath = await self.resource_manager.save_screenshot(
+            screenshot,
+            self.user_id
+        )
+
+        if filepath:
+            await self.storage.insert_screenshot(
+                user_id=self.user_id,
+                time_entry_id=self.current_time_entry,
+                local_file_path=filepath
+            )
+
+    async def _report_performance(self):
+        """Periodically dump event latency and queue stats to the performance log."""
+        while self._running:
+            try:
+                await asyncio.sleep(self.performance_log_interval)
+                self.event_manager.log_stats()
+            except Exception as e:
+                logger.error(f"Error reporting performance stats: {e}")
+                await asyncio.sleep(5)  # Wait before retrying
+
     async def _cleanup_task(self):
         """Periodic cleanup task."""
         while self._running:
             try:
                 await self.resource_manager.cleanup_old_files()
+                await self._expire_local_data()
                 await asyncio.sleep(3600)  # Run cleanup every hour
             except Exception as e:
                 logger.error(f"Error in cleanup task: {e}")
                 await asyncio.sleep(300)  # Wait before retrying
 
+    async def _expire_local_data(self):
+        """Archive synced rows to day partitions, expire old ones and compact the hot database."""
+        await self.storage.write(self.partitions.archive)
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        await self.storage.write(self.partitions.drop_before, cutoff)
+        await self.compactor.compact_async(self.storage)
+
     async def _handle_keyboard_event(self, event):
         """Handle keyboard events."""
         self.last_activity = datetime.now()
-        self.sqlite.insert_activity_log(
-            user_id=self.user_id,
-            time_entry_id=self.current_time_entry,
-            activity_type='keyboard',
-            keystroke_count=1,
-            mouse_events=0
-        )
+        self.aggregator.add_keystrokes()
 
     async def _handle_mouse_event(self, event):
         """Handle mouse events."""
         self.last_activity = datetime.now()
-        self.sqlite.insert_activity_log(
-            user_id=self.user_id,
-            time_entry_id=self.current_time_entry,
-            activity_type='mouse',
-            keystroke_count=0,
-            mouse_events=1
+        # Coalesced events stand for several raw mouse events
+        self.aggregator.add_mouse_events(event.count)
+
+    async def _handle_mouse_movement_event(self, event):
+        """Handle summarized mouse movement from the input bridge."""
+        summary = event.data
+        if summary['moves'] or summary['scroll_events']:
+            self.last_activity = datetime.now()
+        self.aggregator.add_mouse_movement(
+            summary['distance'],
+            summary['moves'],
+            summary['scroll_events']
         )
 
     async def _handle_window_event(self, event):
         """Handle window focus events."""
-        self.sqlite.insert_activity_log(
+        data = event.data
+        self.aggregator.set_active_app(data['app_name'], data['window_title'])
+        await self.storage.insert_activity_log(
             user_id=self.user_id,
             time_entry_id=self.current_time_entry,
-            app_name=event['app_name'],
-            window_title=event['window_title'],
+            app_name=data['app_name'],
+            window_title=data['window_title'],
             activity_type='window_focus',
             keystroke_count=0,
             mouse_events=0
         )
 
-def start_monitoring(supabase_url: str, supabase_key: str, user_id: str):
-    """Start the monitoring process."""
+def _on_mouse_event(bridge: InputBridge, e):
+    """Route a mouse hook event: moves and scrolls are summarized, clicks queued."""
+    if isinstance(e, mouse.MoveEvent):
+        bridge.push_mouse_move(e.x, e.y)
+    elif isinstance(e, mouse.WheelEvent):
+        bridge.push_scroll()
+    else:
+        bridge.push('mouse', e)
+
+def start_monitoring(supabase_url: str,
+                     supabase_key: str,
+                     user_id: str,
+                     journal_path: Optional[str] = None):
+    """Start the monitoring process.
+
+    If journal_path is given, all events are also recorded to that file so
+    the session can be replayed later with src/replay.py.
+    """
     monitor = ActivityMonitor(supabase_url, supabase_key, user_id)
+    recorder = None
+    if journal_path:
+        recorder = EventRecorder(journal_path)
+        monitor.event_manager.add_tap(recorder.record)
     
     try:
-        # Set up keyboard and mouse hooks
-        keyboard.hook(lambda e: asyncio.create_task(
-            monitor.event_manager.put_event('keyboard', {'event': e})
-        ))
-        mouse.hook(lambda e: asyncio.create_task(
-            monitor.event_manager.put_event('mouse', {'event': e})
-        ))
+        # Set up keyboard and mouse hooks. They run on the hook library's
+        # threads, so they only hand events to the bridge's ring buffer.
+        keyboard.hook(lambda e: monitor.input_bridge.push('keyboard', e))
+        mouse.hook(lambda e: _on_mouse_event(monitor.input_bridge, e))
         
         # Run the monitoring loop
         asyncio.run(monitor.start_monitoring())
@@ -208,4 +349,6 @@ def start_monitoring(supabase_url: str, supabase_key: str, user_id: str):
     finally:
         # Clean up hooks
         keyboard.unhook_all()
-        mouse.unhook_all() 
\ No newline at end of file
+        mouse.unhook_all()
+        if recorder:
+            recorder.close() 
\ No newline at end of file
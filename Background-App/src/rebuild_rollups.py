@@ -0,0 +1,33 @@
+"""
+Recompute the activity rollup tables from the raw activity logs.
+
+Usage:
+    python -m src.rebuild_rollups [--db workmatrix.db] [--since YYYY-MM-DD]
+
+Use after restoring a database, or if the rollups are suspected to have
+drifted from the raw logs. Logs archived to partition files (in the
+partitions directory next to the database) are read as well.
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from .utils.sqlite_manager import SQLiteManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild WorkMatrix activity rollups")
+    parser.add_argument('--db', default='workmatrix.db', help="SQLite database to rebuild")
+    parser.add_argument('--since', type=datetime.fromisoformat, metavar='YYYY-MM-DD',
+                        help="First day to rebuild (default: the oldest activity log)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sqlite = SQLiteManager(args.db)
+    try:
+        count = sqlite.rebuild_rollups(since=args.since)
+    finally:
+        sqlite.close()
+    print(f"Rebuilt rollups from {count} activity logs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Replay a recorded event journal through the monitoring pipeline.
+
+Runs the EventManager and ActivityMonitor handlers against a scratch SQLite
+database with fake window and screen backends (fed by the journal's window
+and screenshot events), so ingest throughput and latency can be measured on
+a headless machine:
+
+    python -m src.replay session.wmej --speed max
+    python -m src.replay synthetic.wmej --generate 600 --speed 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Optional
+
+from PIL import Image
+
+from .monitor import ActivityMonitor
+from .utils.event_journal import EventRecorder, EventReplayer
+from .utils.events import Event, type_code
+
+logger = logging.getLogger(__name__)
+
+class FakeWindow:
+    def __init__(self, title: str):
+        self.title = title
+
+class FakeWindowBackend:
+    """Stands in for pygetwindow; the active window is whichever was last focused."""
+
+    def __init__(self, title: str = 'Editor'):
+        self.title = title
+        self.polls = 0
+
+    def focus(self, title: str):
+        self.title = title
+
+    def getActiveWindow(self) -> FakeWindow:
+        self.polls += 1
+        return FakeWindow(self.title)
+
+class FakeScreenBackend:
+    """Stands in for PIL.ImageGrab, returning a small blank image."""
+
+    def __init__(self, size=(320, 200)):
+        self.size = size
+        self.grabs = 0
+
+    def grab(self) -> Image.Image:
+        self.grabs += 1
+        return Image.new('RGB', self.size)
+
+class CollectorFeed:
+    """Replay target that runs the window and screenshot collectors.
+
+    Recorded window changes focus the fake window backend and poll it, and
+    screenshot events capture from the fake screen backend, so both go
+    through the same monitor code as a live session. Input events are put
+    on the EventManager unchanged.
+    """
+
+    def __init__(self, monitor: ActivityMonitor):
+        self.monitor = monitor
+
+    async def put_event(self, event_type: str, data):
+        if event_type == 'window':
+            self.monitor.window_backend.focus(data['window_title'])
+            await self.monitor._poll_active_window()
+        elif event_type == 'screenshot':
+            await self.monitor._capture_screenshot()
+        else:
+            await self.monitor.event_manager.put_event(event_type, data)
+
+def generate_journal(path: str,
+                     seconds: int = 60,
+                     keys_per_second: int = 8,
+                     mouse_summaries_per_second: int = 1,
+                     screenshot_interval: int = 300,
+                     seed: int = 0) -> int:
+    """Write a synthetic typing/mouse session to a journal and return its size in events."""
+    rng = random.Random(seed)
+    recorder = EventRecorder(path)
+    apps = ['Editor', 'Browser', 'Terminal']
+    start_ns = time.monotonic_ns()
+    keyboard_code = type_code('keyboard')
+    movement_code = type_code('mouse_movement')
+    window_code = type_code('window')
+    screenshot_code = type_code('screenshot')
+
+    for second in range(seconds):
+        base_ns = start_ns + second * 1_000_000_000
+        if second % 30 == 0:
+            app = rng.choice(apps)
+            recorder.record(Event(window_code, {'app_name': app, 'window_title': app}, base_ns))
+        if second % screenshot_interval == 0:
+            recorder.record(Event(screenshot_code, {}, base_ns))
+        for i in range(keys_per_second):
+            t_ns = base_ns + i * 1_000_000_000 // keys_per_second
+            recorder.record(Event(keyboard_code, {'event_type': 'down', 'name': 'a'}, t_ns))
+        for i in range(mouse_summaries_per_second):
+            t_ns = base_ns + i * 1_000_000_000 // mouse_summaries_per_second
+            recorder.record(Event(movement_code, {
+                'distance': rng.randint(0, 400),
+                'moves': rng.randint(0, 40),
+                'scroll_events': rng.randint(0, 3),
+                'start_ns': t_ns,
+                'end_ns': t_ns
+            }, t_ns))
+
+    recorder.close()
+    return recorder.records
+
+async def replay_session(journal_path: str,
+                         db_path: str,
+                         speed: Optional[float] = None,
+                         supabase_url: str = '',
+                         supabase_key: str = '',
+                         window_backend: Optional[FakeWindowBackend] = None,
+                         screen_backend: Optional[FakeScreenBackend] = None) -> dict:
+    """Replay a journal through EventManager, ActivityMonitor handlers and SQLite.
+
+    Screenshots are saved under a replay-data directory next to db_path. If
+    supabase_url is given, a sync pass is run afterwards and timed too.
+    """
+    monitor = ActivityMonitor(
+        supabase_url,
+        supabase_key,
+        user_id='replay',
+        db_path=db_path,
+        window_backend=window_backend or FakeWindowBackend(),
+        screen_backend=screen_backend or FakeScreenBackend(),
+        data_dir=os.path.join(os.path.dirname(os.path.abspath(db_path)), 'replay-data')
+    )
+    monitor.current_time_entry = await monitor.storage.insert_time_entry(monitor.user_id)
+    monitor.register_handlers()
+
+    loop = asyncio.get_running_loop()
+    dispatcher = asyncio.create_task(monitor.event_manager.start())
+    started = loop.time()
+    stats = await EventReplayer(journal_path, speed).replay(CollectorFeed(monitor))
+
+    # Stopping drains the handler queues, so this includes handler time
+    monitor.event_manager.stop()
+    await dispatcher
+    stats['drained_seconds'] = loop.time() - started
+
+    started = loop.time()
+    await monitor._write_rollups(monitor.aggregator.flush(force=True))
+    await monitor.storage.flush()
+    stats['write_seconds'] = loop.time() - started
+
+    if supabase_url:
+        started = loop.time()
+        await monitor.sync_manager.force_sync()
+        stats['sync_seconds'] = loop.time() - started
+        await monitor.sync_manager.close()
+
+    stats['event_stats'] = monitor.event_manager.get_event_stats()
+    monitor.storage.close()
+    monitor.sqlite.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a WorkMatrix event journal")
+    parser.add_argument('journal', help="Journal file to replay (or to create with --generate)")
+    parser.add_argument('--db', help="SQLite database to write to (default: a temporary file)")
+    parser.add_argument('--speed', default='max', help="Replay speed multiple, or 'max'")
+    parser.add_argument('--generate', type=int, metavar='SECONDS',
+                        help="Write a synthetic journal of this many seconds first")
+    parser.add_argument('--supabase-url', default='')
+    parser.add_argument('--supabase-key', default='')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.generate:
+        generate_journal(args.journal, seconds=args.generate)
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = args.db or os.path.join(tmpdir, 'replay.db')
+        stats = asyncio.run(replay_session(
+            args.journal,
+            db_path,
+            speed=speed,
+            supabase_url=args.supabase_url,
+            supabase_key=args.supabase_key
+        ))
+    print(json.dumps(stats, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
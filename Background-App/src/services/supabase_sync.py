@@ -1,26 +1,67 @@
 import os
-import time
+import asyncio
+import random
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import AsyncIterator, List, Optional
 import json
+import aiohttp
 from supabase import create_client, Client
+from src.utils.async_storage import AsyncStorage
+from src.utils.sqlite_manager import SQLiteManager, get_engine
 from src.utils.config import (
     SUPABASE_URL,
     SUPABASE_KEY,
     SCREENSHOTS_DIR,
     MAX_RETRIES,
     RETRY_DELAY,
-    API_CALLS_PER_SYNC
+    API_CALLS_PER_SYNC,
+    UPLOAD_WORKERS,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_RETRY_BASE_DELAY
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SCREENSHOT_BUCKET = "user-captures"
+UPLOAD_TIMEOUT = 60  # seconds per upload request
+
+# Upload failures worth retrying besides 5xx
+RETRY_STATUSES = {408, 429}
+
+class UploadRejected(Exception):
+    """Storage refused a file for a reason retrying will not fix (a 4xx such as 400 or 403)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Upload rejected ({status}): {message}")
+        self.status = status
+
+def retry_delay(attempt: int) -> float:
+    """Seconds to wait before retry number attempt + 1: exponential with full jitter.
+
+    Spreading retries out keeps a pool of workers that failed together
+    (e.g. on a 429) from retrying in lockstep.
+    """
+    return random.uniform(0, min(RETRY_DELAY, UPLOAD_RETRY_BASE_DELAY * 2 ** attempt))
+
+async def read_chunks(path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read a file chunk by chunk on a worker thread, for streaming request bodies."""
+    loop = asyncio.get_running_loop()
+    with open(path, "rb") as f:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
 class SupabaseSync:
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, sqlite_db: Optional[SQLiteManager] = None):
         self.user_id = user_id
         self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.sqlite_db = sqlite_db or get_engine()
+        self.storage = AsyncStorage(self.sqlite_db)
         self.last_sync = self._load_last_sync()
         self.api_calls_today = self._load_api_calls()
         
@@ -59,9 +100,10 @@ class SupabaseSync:
             return False
         return True
         
-    def _increment_api_calls(self):
+    def _increment_api_calls(self, save: bool = True):
         self.api_calls_today += 1
-        self._save_api_calls()
+        if save:
+            self._save_api_calls()
         
     def sync_data(self):
         if not self._check_api_limits():
@@ -85,103 +127,124 @@ class SupabaseSync:
             logger.error(f"Sync failed: {str(e)}")
             
     def _sync_screenshots(self):
+        asyncio.run(self.sync_screenshots())
+
+    async def sync_screenshots(self):
+        """Upload the user's pending screenshot files to Supabase Storage.
+
+        Up to UPLOAD_WORKERS files upload at once. Each finished upload is
+        recorded with update_screenshot_sync_details and its local file
+        deleted straight away, so an interrupted sync keeps its progress.
+        """
         logger.info("Starting screenshot sync process...")
         if not self.user_id:
             logger.warning("User ID not set, skipping screenshot sync.")
             return
 
-        # Ensure sqlite_db is an instance of SQLiteManager
-        # This assumes sqlite_manager.py is updated with get_unsynced_screenshots_for_user 
-        # and update_screenshot_sync_details as discussed.
-        if not hasattr(self.sqlite_db, 'get_unsynced_screenshots_for_user') or \
-           not hasattr(self.sqlite_db, 'update_screenshot_sync_details') or \
-           not hasattr(self.sqlite_db, 'delete_screenshot_record_and_file'):
-            logger.error("SQLiteManager is missing required methods for screenshot sync. Please update it.")
-            return
-
-        screenshots_to_sync = self.sqlite_db.get_unsynced_screenshots_for_user(self.user_id)
+        screenshots_to_sync = await self.storage.get_pending_screenshots(self.user_id)
 
         if not screenshots_to_sync:
             logger.info("No new screenshots to sync.")
             return
 
         logger.info(f"Found {len(screenshots_to_sync)} screenshots to sync.")
-        bucket_name = "user-captures" # Or your chosen bucket name
+        uploaded = await self.upload_screenshots(screenshots_to_sync)
+        logger.info(f"Screenshot sync process finished: {uploaded}/{len(screenshots_to_sync)} uploaded.")
+
+    async def upload_screenshots(self, records: List[dict], workers: int = UPLOAD_WORKERS) -> int:
+        """Upload screenshot records' files through a pool of workers; returns the number uploaded."""
+        pending: asyncio.Queue = asyncio.Queue()
+        for record in records:
+            pending.put_nowait(record)
+        uploaded = 0
+
+        async def worker(session):
+            nonlocal uploaded
+            while not pending.empty():
+                if not self._check_api_limits():
+                    logger.warning("API call limit possibly reached, pausing screenshot sync.")
+                    return
+                if await self._sync_screenshot(session, pending.get_nowait()):
+                    uploaded += 1
+
+        connector = aiohttp.TCPConnector(limit=workers)
+        try:
+            async with aiohttp.ClientSession(
+                connector=connector,
+                headers={'apikey': SUPABASE_KEY, 'Authorization': f'Bearer {SUPABASE_KEY}'},
+                timeout=aiohttp.ClientTimeout(total=UPLOAD_TIMEOUT)
+            ) as session:
+                await asyncio.gather(*(worker(session) for _ in range(min(workers, len(records)))))
+        finally:
+            self._save_api_calls()
+        return uploaded
 
-        for record in screenshots_to_sync:
-            if not self._check_api_limits(): # Assuming this checks generic API call count
-                logger.warning("API call limit possibly reached, pausing screenshot sync.")
+    async def _sync_screenshot(self, session: aiohttp.ClientSession, record: dict) -> bool:
+        """Upload one screenshot with retries and record it; returns whether it was uploaded."""
+        local_file_path_str = record.get('local_file_path')
+        screenshot_id = record.get('id')
+
+        if not local_file_path_str or not screenshot_id:
+            logger.error(f"Skipping record due to missing local_file_path or id: {record}")
+            return False
+
+        local_file = Path(local_file_path_str)
+        if not local_file.exists():
+            logger.warning(f"Local screenshot file not found: {local_file_path_str}. Skipping.")
+            return False
+
+        # Using user_id/screenshot_id.webp to ensure uniqueness and organization
+        supabase_file_path = f"{self.user_id}/{screenshot_id}.webp"
+
+        for attempt in range(MAX_RETRIES):
+            try:
+                await self._upload_file(session, local_file, supabase_file_path)
                 break
-            
-            local_file_path_str = record.get('local_file_path')
-            screenshot_id = record.get('id')
+            except UploadRejected as e:
+                logger.error(f"Upload of screenshot {local_file_path_str} rejected, not retrying: {e}")
+                return False
+            except Exception as e:
+                logger.error(f"Attempt {attempt + 1}/{MAX_RETRIES} failed for screenshot {local_file_path_str}: {str(e)}")
+                if attempt == MAX_RETRIES - 1:
+                    logger.error(f"All retries failed for screenshot {local_file_path_str}. It will be retried in the next sync cycle.")
+                    return False
+                await asyncio.sleep(retry_delay(attempt))
+
+        logger.info(f"Successfully uploaded {supabase_file_path}")
+        # Store the relative path used for upload; the frontend can build the URL
+        await self.storage.update_screenshot_sync_details(screenshot_id, supabase_file_path)
+
+        # Delete local file after successful upload and DB update
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, local_file.unlink)
+        except Exception as e_del:
+            logger.error(f"Error deleting local screenshot file {local_file}: {e_del}")
+        return True
+
+    async def _upload_file(self, session: aiohttp.ClientSession, local_file: Path, supabase_file_path: str):
+        """Upload one file to the screenshot bucket, replacing any existing object, streaming it from disk."""
+        url = f"{SUPABASE_URL}/storage/v1/object/{SCREENSHOT_BUCKET}/{supabase_file_path}"
+        headers = {
+            'Content-Type': 'image/webp',
+            # Known length, so the body is streamed without chunked encoding
+            'Content-Length': str(local_file.stat().st_size),
+            'Cache-Control': 'max-age=3600',
+            # Overwrite, so retrying an upload whose response was lost succeeds
+            'x-upsert': 'true'
+        }
+        self._increment_api_calls(save=False)
+        async with session.post(url, data=read_chunks(local_file), headers=headers) as response:
+            if response.status in (200, 201):
+                return
+            message = await response.text()
+            if 400 <= response.status < 500 and response.status not in RETRY_STATUSES:
+                raise UploadRejected(response.status, message)
+            raise Exception(f"Upload failed ({response.status}): {message}")
+
+    def close(self):
+        """Stop the storage threads."""
+        self.storage.close()
 
-            if not local_file_path_str or not screenshot_id:
-                logger.error(f"Skipping record due to missing local_file_path or id: {record}")
-                continue
-            
-            local_file = Path(local_file_path_str)
-            if not local_file.exists():
-                logger.warning(f"Local screenshot file not found: {local_file_path_str}. Skipping and marking as error or deleting record.")
-                # Optionally, delete the orphaned DB record here if the file is truly gone
-                # self.sqlite_db.delete_screenshot_record_and_file(screenshot_id, None) 
-                continue
-
-            # Define the path in Supabase Storage
-            # Using user_id/screenshot_id.webp to ensure uniqueness and organization
-            supabase_file_path = f"{self.user_id}/{screenshot_id}.webp"
-
-            for attempt in range(MAX_RETRIES):
-                try:
-                    logger.info(f"Attempting to upload {local_file} to {bucket_name}/{supabase_file_path}")
-                    with open(local_file, "rb") as f:
-                        # file_options for content type and potentially upsert behavior
-                        file_options = {"content-type": "image/webp", "cacheControl": "3600", "upsert": False}
-                        upload_response = self.supabase.storage.from_(bucket_name).upload(
-                            path=supabase_file_path,
-                            file=f,
-                            file_options=file_options
-                        )
-                    self._increment_api_calls() # Count this as an API call
-
-                    # upload_response from supabase-py v1.x returns data on success, error on failure
-                    # For supabase-py v2.x, it might raise an exception on failure directly or response structure might differ.
-                    # Assuming supabase-py v1 style for now. Adjust if using v2.
-                    # if upload_response.get('error'): # Check if there was an error object
-                    #    raise Exception(str(upload_response['error']))
-                    # If no error, proceed. The actual path is supabase_file_path we defined.
-
-                    logger.info(f"Successfully uploaded {supabase_file_path}")
-
-                    # Option 1: Store the simple path. Frontend can construct full URL if needed.
-                    # public_url_data = self.supabase.storage.from_(bucket_name).get_public_url(supabase_file_path)
-                    # stored_path_for_db = public_url_data.public_url 
-                    # self._increment_api_calls() # If get_public_url is an API call
-                    
-                    # Option 2: Store the relative path used for upload. Simpler.
-                    stored_path_for_db = supabase_file_path
-
-                    # Update local SQLite DB with the Supabase storage path
-                    self.sqlite_db.update_screenshot_sync_details(screenshot_id, stored_path_for_db)
-                    logger.info(f"Updated local DB for screenshot {screenshot_id} with path: {stored_path_for_db}")
-
-                    # Delete local file after successful upload and DB update
-                    try:
-                        local_file.unlink()
-                        logger.info(f"Deleted local screenshot file: {local_file}")
-                    except Exception as e_del:
-                        logger.error(f"Error deleting local screenshot file {local_file}: {e_del}")
-                    
-                    break  # Success, break retry loop
-                    
-                except Exception as e:
-                    logger.error(f"Attempt {attempt + 1}/{MAX_RETRIES} failed for screenshot {local_file_path_str}: {str(e)}")
-                    if attempt == MAX_RETRIES - 1:
-                        logger.error(f"All retries failed for screenshot {local_file_path_str}. It will be retried in the next sync cycle.")
-                    else:
-                        time.sleep(RETRY_DELAY)
-        logger.info("Screenshot sync process finished.")
-        
     def _sync_activity_logs(self):
         # Similar implementation for activity logs
         pass
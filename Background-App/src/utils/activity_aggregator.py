@@ -0,0 +1,110 @@
+import time
+import logging
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ActivityAggregator:
+    """Accumulates input counts per time window and active app.
+
+    Instead of one activity row per key press or mouse event, counts are
+    summed per (window, app) and emitted as a single rollup row once the
+    window has closed.
+    """
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.app_name = 'unknown'
+        self.window_title = None
+        self._window_start: Optional[float] = None
+        self._buckets: Dict[str, dict] = {}
+        self._ready: List[dict] = []
+        self._lock = Lock()
+
+    def set_active_app(self, app_name: str, window_title: Optional[str] = None):
+        """Record the app that subsequent input should be attributed to."""
+        with self._lock:
+            self.app_name = app_name or 'unknown'
+            self.window_title = window_title
+
+    def add_keystrokes(self, count: int = 1, now: Optional[float] = None):
+        """Count keystrokes against the active app."""
+        self._add('keystroke_count', count, now)
+
+    def add_mouse_events(self, count: int = 1, now: Optional[float] = None):
+        """Count mouse events against the active app."""
+        self._add('mouse_events', count, now)
+
+    def add_mouse_movement(self,
+                           distance: int,
+                           moves: int,
+                           scrolls: int = 0,
+                           now: Optional[float] = None):
+        """Count a summarized window of mouse moves against the active app."""
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket = self._bucket(now)
+            bucket['mouse_movement_distance'] += distance
+            bucket['mouse_events'] += moves
+            bucket['scroll_events'] += scrolls
+
+    def _add(self, field: str, count: int, now: Optional[float]):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._bucket(now)[field] += count
+
+    def _bucket(self, now: float) -> dict:
+        """Get the bucket for the active app in the window containing `now`."""
+        self._roll_window(now)
+        bucket = self._buckets.get(self.app_name)
+        if bucket is None:
+            bucket = self._buckets[self.app_name] = {
+                'app_name': self.app_name,
+                'window_title': self.window_title,
+                'keystroke_count': 0,
+                'mouse_events': 0,
+                'mouse_movement_distance': 0,
+                'scroll_events': 0
+            }
+        else:
+            bucket['window_title'] = self.window_title
+        return bucket
+
+    def _roll_window(self, now: float):
+        """Close the current window if `now` falls past its end."""
+        window_start = now - (now % self.window_seconds)
+        if self._window_start is None:
+            self._window_start = window_start
+        elif window_start != self._window_start:
+            self._close_window()
+            self._window_start = window_start
+
+    def _close_window(self):
+        """Move the current buckets to the ready list as rollup rows."""
+        if self._window_start is None:
+            return
+        start = datetime.fromtimestamp(self._window_start).isoformat()
+        end = datetime.fromtimestamp(self._window_start + self.window_seconds).isoformat()
+        for bucket in self._buckets.values():
+            bucket['window_start'] = start
+            bucket['window_end'] = end
+            self._ready.append(bucket)
+        self._buckets = {}
+
+    def flush(self, force: bool = False, now: Optional[float] = None) -> List[dict]:
+        """Return rollup rows for all closed windows.
+
+        With force=True the current, still-open window is closed as well,
+        which is what shutdown should use so no counts are lost.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if force:
+                self._close_window()
+                self._window_start = None
+            else:
+                self._roll_window(now)
+            rows, self._ready = self._ready, []
+            return rows
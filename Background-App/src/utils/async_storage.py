@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from .sqlite_manager import (
+    SQLiteManager, SYNC_TABLES, fetch_pending_screenshots, fetch_unsynced_page, unsynced_start
+)
+
+logger = logging.getLogger(__name__)
+
+class AsyncStorage:
+    """Asyncio facade over the storage engine that never blocks the event loop.
+
+    Writes are queued to a single writer thread, which calls the engine in
+    submission order and resolves a future for each. Reads run on a small
+    pool of threads, each with its own read-only connection; in WAL mode
+    they see committed data without waiting for the writer.
+    """
+
+    def __init__(self, engine: SQLiteManager, readers: int = 2):
+        self.engine = engine
+        self.readers = readers
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._read_connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    # Writes
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run_writer, name="sqlite-writer", daemon=True)
+                self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            func, args, kwargs, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue func(*args, **kwargs) for the writer thread and return its future."""
+        self._ensure_writer()
+        future = Future()
+        self._queue.put((func, args, kwargs, future))
+        return future
+
+    async def write(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func on the writer thread and wait for its result."""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    async def insert_time_entry(self, *args, **kwargs):
+        return await self.write(self.engine.insert_time_entry, *args, **kwargs)
+
+    async def update_time_entry(self, *args, **kwargs):
+        return await self.write(self.engine.update_time_entry, *args, **kwargs)
+
+    async def insert_activity_log(self, *args, **kwargs):
+        return await self.write(self.engine.insert_activity_log, *args, **kwargs)
+
+    async def insert_screenshot(self, *args, **kwargs):
+        return await self.write(self.engine.insert_screenshot, *args, **kwargs)
+
+    async def update_screenshot_sync_details(self, screenshot_id, storage_path):
+        return await self.write(self.engine.update_screenshot_sync_details, screenshot_id, storage_path)
+
+    async def mark_as_synced(self, table_name, record_ids):
+        return await self.write(self.engine.mark_as_synced, table_name, record_ids)
+
+    async def record_sync_failure(self, *args, **kwargs):
+        return await self.write(self.engine.record_sync_failure, *args, **kwargs)
+
+    async def set_sync_watermark(self, table_name, record_id):
+        return await self.write(self.engine.set_sync_watermark, table_name, record_id)
+
+    async def flush(self):
+        """Commit the engine's buffered inserts."""
+        return await self.write(self.engine.flush)
+
+    # Reads
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.engine.db_path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {int(self.engine.profile.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._lock:
+                self._read_connections.append(conn)
+        return conn
+
+    async def run_read(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run func(conn) on a read-only connection from the pool."""
+        with self._lock:
+            if self._read_pool is None:
+                self._read_pool = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="sqlite-reader")
+            pool = self._read_pool
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, lambda: func(self._reader()))
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run a query on a read-only connection and return all rows."""
+        return await self.run_read(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def get_unsynced_counts(self) -> Dict[str, int]:
+        """Get the number of unsynced rows per remote sync table.
+
+        Reads committed rows only; inserts still in the engine's write buffer
+        are counted once they are flushed.
+        """
+        def count(conn):
+            return {
+                remote: conn.execute(f"SELECT COUNT(*) FROM {local} WHERE is_synced = 0").fetchone()[0]
+                for remote, local in SYNC_TABLES.items()
+            }
+        return await self.run_read(count)
+
+    async def get_retry_counts(self) -> Dict[str, int]:
+        """Get the number of records waiting for a retry and in the dead-letter table."""
+        def count(conn):
+            return {
+                'retrying': conn.execute("SELECT COUNT(*) FROM sync_retries").fetchone()[0],
+                'dead_letters': conn.execute("SELECT COUNT(*) FROM sync_dead_letters").fetchone()[0],
+            }
+        return await self.run_read(count)
+
+    async def get_pending_screenshots(self, user_id: str, limit: Optional[int] = None) -> List[dict]:
+        """Get a user's screenshots whose file has not been uploaded yet, oldest first."""
+        await self.flush()
+        return await self.run_read(lambda conn: fetch_pending_screenshots(conn, user_id, limit))
+
+    async def get_first_deferred_id(self, table_name: str) -> Optional[int]:
+        """Get the lowest id of a sync table's records whose next retry is still in the future."""
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        rows = await self.fetchall(
+            "SELECT MIN(record_id) FROM sync_retries WHERE table_name = ? AND next_attempt_at > ?",
+            (table_name, datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        return rows[0][0]
+
+    async def iter_unsynced(self, table_name: str,
+                            batch_size: Union[int, Callable[[], int]] = 100,
+                            skip_deferred: bool = False) -> AsyncIterator[List[dict]]:
+        """Async version of SQLiteManager.iter_unsynced, paging on the read pool.
+
+        batch_size may be a callable, which is asked for the size of each page.
+        With skip_deferred, records waiting for a later retry are left out.
+        """
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        if table_name not in SYNC_TABLES.values():
+            raise ValueError(f"Unknown sync table: {table_name}")
+        await self.flush()
+        rows = await self.fetchall(
+            "SELECT value FROM local_settings WHERE key = ?", (f"sync_watermark.{table_name}",)
+        )
+        watermark = json.loads(rows[0][0]) if rows else None
+        key = await self.run_read(lambda conn: unsynced_start(conn, table_name, watermark))
+        deferred_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S') if skip_deferred else None
+        while True:
+            size = batch_size() if callable(batch_size) else batch_size
+            batch = await self.run_read(
+                lambda conn, key=key: fetch_unsynced_page(conn, table_name, key, size, deferred_at)
+            )
+            if not batch:
+                return
+            key = batch[-1]['id']
+            yield batch
+            if len(batch) < size:
+                return
+
+    # Shutdown
+
+    def close(self):
+        """Finish queued writes, stop the writer thread and close the read connections."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            pool, self._read_pool = self._read_pool, None
+            connections, self._read_connections = self._read_connections, []
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        if pool is not None:
+            pool.shutdown(wait=True)
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
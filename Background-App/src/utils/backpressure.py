@@ -0,0 +1,150 @@
+import asyncio
+import random
+import logging
+from typing import Dict, Iterable, Optional, Union
+from .events import Event
+
+logger = logging.getLogger(__name__)
+
+class BackpressurePolicy:
+    """Decides what happens to an event when the event queue is under pressure.
+
+    Every policy keeps exact per-type counters of events it dropped or merged
+    into an already queued event, so losses are visible in event stats.
+    """
+
+    name = 'base'
+
+    def __init__(self, high_water: float = 0.9):
+        self.high_water = high_water
+        self.dropped: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+
+    async def offer(self, queue: asyncio.Queue, event: Event):
+        """Enqueue the event, or drop/merge it according to the policy."""
+        raise NotImplementedError
+
+    def on_dequeue(self, event: Event):
+        """Called by the consumer when an event leaves the queue."""
+
+    def _above_high_water(self, queue: asyncio.Queue) -> bool:
+        return queue.qsize() >= queue.maxsize * self.high_water
+
+    def _count_dropped(self, event_type: str, count: int = 1):
+        self.dropped[event_type] = self.dropped.get(event_type, 0) + count
+
+    def _count_coalesced(self, event_type: str):
+        self.coalesced[event_type] = self.coalesced.get(event_type, 0) + 1
+
+    def _evict_oldest(self, queue: asyncio.Queue):
+        """Remove the oldest queued event to make room."""
+        evicted = queue.get_nowait()
+        queue.task_done()
+        self.on_dequeue(evicted)
+        self._count_dropped(evicted.type, evicted.count)
+
+    def get_stats(self) -> dict:
+        """Get drop and coalesce counters."""
+        return {
+            'policy': self.name,
+            'dropped': self.dropped.copy(),
+            'coalesced': self.coalesced.copy()
+        }
+
+class DropOldestPolicy(BackpressurePolicy):
+    """Always accept new events, evicting the oldest one when the queue is full."""
+
+    name = 'drop_oldest'
+
+    async def offer(self, queue: asyncio.Queue, event: Event):
+        if queue.full():
+            self._evict_oldest(queue)
+        queue.put_nowait(event)
+
+class CoalescePolicy(DropOldestPolicy):
+    """Merge repeated events of the same type while one is still queued.
+
+    Above the high-water mark, an event of a coalescable type (mouse moves by
+    default) replaces the payload of the pending event of that type instead
+    of taking a new queue slot; the merged event's ``count`` keeps the number
+    of raw events it stands for. Falls back to drop-oldest when full.
+    """
+
+    name = 'coalesce'
+
+    def __init__(self, high_water: float = 0.5, coalesce_types: Iterable[str] = ('mouse',)):
+        super().__init__(high_water)
+        self.coalesce_types = set(coalesce_types)
+        self._pending: Dict[str, Event] = {}
+
+    async def offer(self, queue: asyncio.Queue, event: Event):
+        event_type = event.type
+        if event_type in self.coalesce_types:
+            pending = self._pending.get(event_type)
+            if pending is not None and self._above_high_water(queue):
+                pending.data = event.data
+                pending.count += event.count
+                self._count_coalesced(event_type)
+                return
+            self._pending[event_type] = event
+        await super().offer(queue, event)
+
+    def on_dequeue(self, event: Event):
+        if self._pending.get(event.type) is event:
+            del self._pending[event.type]
+
+class SamplingPolicy(BackpressurePolicy):
+    """Above the high-water mark, keep only a random fraction of events."""
+
+    name = 'sample'
+
+    def __init__(self,
+                 high_water: float = 0.5,
+                 sample_rate: float = 0.1,
+                 sample_types: Optional[Iterable[str]] = ('keyboard', 'mouse')):
+        super().__init__(high_water)
+        self.sample_rate = sample_rate
+        self.sample_types = set(sample_types) if sample_types is not None else None
+        self._random = random.Random()
+
+    async def offer(self, queue: asyncio.Queue, event: Event):
+        event_type = event.type
+        sampled = self.sample_types is None or event_type in self.sample_types
+        if sampled and self._above_high_water(queue) and self._random.random() >= self.sample_rate:
+            self._count_dropped(event_type)
+            return
+        if queue.full():
+            self._count_dropped(event_type)
+            return
+        queue.put_nowait(event)
+
+class BlockPolicy(BackpressurePolicy):
+    """Wait for queue space, dropping the event if none frees up in time."""
+
+    name = 'block'
+
+    def __init__(self, timeout: float = 1.0):
+        super().__init__()
+        self.timeout = timeout
+
+    async def offer(self, queue: asyncio.Queue, event: Event):
+        try:
+            await asyncio.wait_for(queue.put(event), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._count_dropped(event.type)
+
+BACKPRESSURE_POLICIES = {
+    DropOldestPolicy.name: DropOldestPolicy,
+    CoalescePolicy.name: CoalescePolicy,
+    SamplingPolicy.name: SamplingPolicy,
+    BlockPolicy.name: BlockPolicy
+}
+
+def create_policy(policy: Union[str, BackpressurePolicy]) -> BackpressurePolicy:
+    """Build a policy from its name, or return an existing policy instance."""
+    if isinstance(policy, BackpressurePolicy):
+        return policy
+    try:
+        return BACKPRESSURE_POLICIES[policy]()
+    except KeyError:
+        raise ValueError(f"Unknown backpressure policy: {policy}")
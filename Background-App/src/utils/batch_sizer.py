@@ -0,0 +1,85 @@
+import time
+from collections import deque
+from typing import Optional
+
+# HTTP statuses that mean the request was too big or the server is struggling
+SHRINK_STATUSES = {408, 413, 429}
+
+class AdaptiveBatchSizer:
+    """Picks the number of rows per sync request with additive-increase,
+    multiplicative-decrease (AIMD).
+
+    A full batch that finished within both the time and the byte budget
+    grows the size by ``step``. A batch over budget shrinks it in proportion
+    to the overshoot, and a timeout, 408/413/429 or 5xx halves it. Bigger
+    batches mean fewer API calls for the same rows, so the size keeps
+    growing until a budget is reached or ``max_size``.
+    """
+
+    def __init__(self,
+                 initial: int = 100,
+                 min_size: int = 10,
+                 max_size: int = 1000,
+                 step: int = 25,
+                 decrease: float = 0.5,
+                 target_seconds: float = 2.0,
+                 target_bytes: int = 512 * 1024,
+                 history_size: int = 50):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.step = step
+        self.decrease = decrease
+        self.target_seconds = target_seconds
+        self.target_bytes = target_bytes
+        self.size = self._clamp(initial)
+        self.requests = 0
+        self.history = deque(maxlen=history_size)
+
+    def _clamp(self, size: float) -> int:
+        return max(self.min_size, min(self.max_size, int(size)))
+
+    def record(self, rows: int, seconds: float, payload_bytes: int,
+               status: Optional[int] = None, timed_out: bool = False) -> int:
+        """Update the size from one request's outcome and return the new size.
+
+        status is the HTTP status, if a response arrived.
+        """
+        self.requests += 1
+        previous = self.size
+        if timed_out or (status is not None and (status in SHRINK_STATUSES or status >= 500)):
+            outcome = 'timeout' if timed_out else f'http_{status}'
+            self.size = self._clamp(min(self.size, rows) * self.decrease)
+        elif status is not None and status >= 300:
+            # Rejected for another reason (auth, bad row); size is not the problem
+            outcome = f'http_{status}'
+        else:
+            load = max(seconds / self.target_seconds, payload_bytes / self.target_bytes)
+            if load > 1:
+                outcome = 'over_budget'
+                self.size = self._clamp(rows / load)
+            elif rows >= self.size:
+                outcome = 'grow'
+                self.size = self._clamp(self.size + self.step)
+            else:
+                # A partial batch says nothing about larger ones
+                outcome = 'hold'
+        self.history.append({
+            'at': time.time(),
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'bytes': payload_bytes,
+            'outcome': outcome,
+            'size_before': previous,
+            'size_after': self.size
+        })
+        return self.size
+
+    def get_stats(self) -> dict:
+        """Get the current size, limits and recent adjustments."""
+        return {
+            'size': self.size,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'requests': self.requests,
+            'history': list(self.history)
+        }
@@ -53,6 +53,11 @@ API_CALLS_PER_SYNC = 50       # Calls per sync operation
 MAX_RETRIES = 3
 RETRY_DELAY = 60  # seconds
 
+# Screenshot uploads
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))  # Files uploading at once
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read from disk per chunk
+UPLOAD_RETRY_BASE_DELAY = 1  # seconds; doubles per retry, capped at RETRY_DELAY
+
 # Logging
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
@@ -2,10 +2,12 @@ import os
 import logging
 from supabase import create_client, Client
 from dotenv import load_dotenv
-import sqlite3
+import json
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Union
 from loguru import logger
+from .partitions import PartitionManager
+from .sqlite_manager import READ_VIEWS, SQLiteManager, bulk_mark_synced, get_engine
 
 # Configure logging
 logging.basicConfig(
@@ -75,87 +77,60 @@ class DatabaseHandler:
             raise
 
 class LocalDatabase:
-    def __init__(self, db_path: str = "workmatrix.db"):
-        """Initialize the local database connection."""
-        self.db_path = db_path
-        self.conn = None
-        self.cursor = None
-        self.initialize()
+    """Adapter exposing the collectors' API over the shared storage engine.
 
-    def initialize(self):
-        """Initialize the database and create tables if they don't exist."""
-        try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-            self._create_tables()
-            logger.info("Local database initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing database: {str(e)}")
-            raise
+    Rows go to the engine's local_* tables, so collectors and SyncManager
+    see the same data through one connection.
+    """
+
+    # Table names used by this API -> engine tables
+    TABLES = {
+        'activity_logs': 'local_activity_logs',
+        'screenshots': 'local_screenshots',
+        'app_usage': 'local_app_usage',
+        'breaks': 'local_breaks',
+    }
 
-    def _create_tables(self):
-        """Create necessary tables if they don't exist."""
-        self.cursor.executescript('''
-            CREATE TABLE IF NOT EXISTS activity_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                timestamp DATETIME NOT NULL,
-                activity_type TEXT NOT NULL,
-                details TEXT,
-                synced BOOLEAN DEFAULT 0
-            );
-
-            CREATE TABLE IF NOT EXISTS screenshots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                timestamp DATETIME NOT NULL,
-                file_path TEXT NOT NULL,
-                synced BOOLEAN DEFAULT 0
-            );
-
-            CREATE TABLE IF NOT EXISTS app_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                timestamp DATETIME NOT NULL,
-                app_name TEXT NOT NULL,
-                window_title TEXT,
-                duration INTEGER,
-                synced BOOLEAN DEFAULT 0
-            );
-
-            CREATE TABLE IF NOT EXISTS breaks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                start_time DATETIME NOT NULL,
-                end_time DATETIME,
-                break_type TEXT NOT NULL,
-                synced BOOLEAN DEFAULT 0
-            );
-        ''')
-        self.conn.commit()
+    def __init__(self, db_path: str = "workmatrix.db", engine: Optional[SQLiteManager] = None,
+                 partitions: Optional[PartitionManager] = None):
+        """Attach to the storage engine for db_path and its archived partitions."""
+        self.db_path = db_path
+        self.engine = engine or get_engine(db_path)
+        self.partitions = partitions or PartitionManager(self.engine)
 
     def insert_activity(self, user_id: str, activity_type: str, details: Optional[Dict] = None) -> int:
         """Insert a new activity log."""
         try:
-            self.cursor.execute(
-                "INSERT INTO activity_logs (user_id, timestamp, activity_type, details) VALUES (?, ?, ?, ?)",
-                (user_id, datetime.now().isoformat(), activity_type, str(details) if details else None)
+            return self.engine.insert_activity_log(
+                user_id, None, '', None, activity_type,
+                details=json.dumps(details, default=str) if details else None
             )
-            self.conn.commit()
-            return self.cursor.lastrowid
         except Exception as e:
             logger.error(f"Error inserting activity: {str(e)}")
             raise
 
+    def insert_activity_log(self, activity_data: Dict[str, Any]) -> int:
+        """Insert an activity log from a collector's activity dict."""
+        known = {'user_id', 'app_name', 'window_title', 'activity_type', 'idle_duration', 'created_at'}
+        details = {key: value for key, value in activity_data.items() if key not in known}
+        try:
+            return self.engine.insert_activity_log(
+                activity_data['user_id'],
+                None,
+                activity_data.get('app_name') or '',
+                activity_data.get('window_title'),
+                activity_data.get('activity_type', 'window_focus'),
+                idle_time=int(activity_data.get('idle_duration') or 0),
+                details=json.dumps(details, default=str) if details else None
+            )
+        except Exception as e:
+            logger.error(f"Error inserting activity log: {str(e)}")
+            raise
+
     def insert_screenshot(self, user_id: str, file_path: str) -> int:
         """Insert a new screenshot record."""
         try:
-            self.cursor.execute(
-                "INSERT INTO screenshots (user_id, timestamp, file_path) VALUES (?, ?, ?)",
-                (user_id, datetime.now().isoformat(), file_path)
-            )
-            self.conn.commit()
-            return self.cursor.lastrowid
+            return self.engine.insert_screenshot(user_id, None, file_path)
         except Exception as e:
             logger.error(f"Error inserting screenshot: {str(e)}")
             raise
@@ -163,12 +138,7 @@ class LocalDatabase:
     def insert_app_usage(self, user_id: str, app_name: str, window_title: str, duration: int) -> int:
         """Insert a new app usage record."""
         try:
-            self.cursor.execute(
-                "INSERT INTO app_usage (user_id, timestamp, app_name, window_title, duration) VALUES (?, ?, ?, ?, ?)",
-                (user_id, datetime.now().isoformat(), app_name, window_title, duration)
-            )
-            self.conn.commit()
-            return self.cursor.lastrowid
+            return self.engine.insert_app_usage(user_id, app_name, window_title, duration_seconds=duration)
         except Exception as e:
             logger.error(f"Error inserting app usage: {str(e)}")
             raise
@@ -176,37 +146,69 @@ class LocalDatabase:
     def insert_break(self, user_id: str, break_type: str) -> int:
         """Insert a new break record."""
         try:
-            self.cursor.execute(
-                "INSERT INTO breaks (user_id, start_time, break_type) VALUES (?, ?, ?)",
-                (user_id, datetime.now().isoformat(), break_type)
-            )
-            self.conn.commit()
-            return self.cursor.lastrowid
+            return self.engine.insert_break(user_id, break_type)
         except Exception as e:
             logger.error(f"Error inserting break: {str(e)}")
             raise
 
     def update_break_end(self, break_id: int):
-        """Update the end time of a break."""
+        """Update break end time."""
         try:
-            self.cursor.execute(
-                "UPDATE breaks SET end_time = ? WHERE id = ?",
-                (datetime.now().isoformat(), break_id)
-            )
-            self.conn.commit()
+            self.engine.end_break(break_id)
         except Exception as e:
             logger.error(f"Error updating break end time: {str(e)}")
             raise
 
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        self.engine.flush()
+        with self.engine.get_connection() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_recent_activity_logs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the most recent activity logs, newest first."""
+        try:
+            return self.partitions.read_recent('local_activity_logs', limit)
+        except Exception as e:
+            logger.error(f"Error getting recent activity logs: {str(e)}")
+            raise
+
+    def get_activity_logs_between(self, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Get activity logs created in [start_time, end_time), oldest first, including archived days."""
+        try:
+            return self.partitions.read_range('local_activity_logs', start_time, end_time)
+        except Exception as e:
+            logger.error(f"Error getting activity logs: {str(e)}")
+            raise
+
+    def get_rollup_summary(self, user_id: str, start_time: datetime, end_time: datetime) -> Dict[str, Dict[str, float]]:
+        """Get a user's per-app activity totals for [start_time, end_time) from the rollups."""
+        try:
+            return self.engine.get_rollup_summary(user_id, start_time, end_time)
+        except Exception as e:
+            logger.error(f"Error getting activity rollups: {str(e)}")
+            raise
+
+    def delete_old_activity_logs(self, cutoff: datetime) -> int:
+        """Delete synced activity logs created before cutoff; unsynced ones are kept."""
+        try:
+            with self.engine.get_connection() as conn:
+                return conn.execute(
+                    "DELETE FROM local_activity_logs WHERE is_synced = 1 AND created_at < ?",
+                    (cutoff.strftime('%Y-%m-%d %H:%M:%S'),)
+                ).rowcount
+        except Exception as e:
+            logger.error(f"Error deleting old activity logs: {str(e)}")
+            raise
+
+    def _get_unsynced(self, table: str, user_id: str) -> List[Dict[str, Any]]:
+        return [record for batch in self.iter_unsynced(table, user_id, batch_size=500) for record in batch]
+
     def get_unsynced_activities(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all unsynced activity logs for a user."""
         try:
-            self.cursor.execute(
-                "SELECT * FROM activity_logs WHERE user_id = ? AND synced = 0",
-                (user_id,)
-            )
-            return [dict(zip([col[0] for col in self.cursor.description], row))
-                   for row in self.cursor.fetchall()]
+            return self._get_unsynced('activity_logs', user_id)
         except Exception as e:
             logger.error(f"Error getting unsynced activities: {str(e)}")
             raise
@@ -214,12 +216,7 @@ class LocalDatabase:
     def get_unsynced_screenshots(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all unsynced screenshots for a user."""
         try:
-            self.cursor.execute(
-                "SELECT * FROM screenshots WHERE user_id = ? AND synced = 0",
-                (user_id,)
-            )
-            return [dict(zip([col[0] for col in self.cursor.description], row))
-                   for row in self.cursor.fetchall()]
+            return self._get_unsynced('screenshots', user_id)
         except Exception as e:
             logger.error(f"Error getting unsynced screenshots: {str(e)}")
             raise
@@ -227,12 +224,7 @@ class LocalDatabase:
     def get_unsynced_app_usage(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all unsynced app usage records for a user."""
         try:
-            self.cursor.execute(
-                "SELECT * FROM app_usage WHERE user_id = ? AND synced = 0",
-                (user_id,)
-            )
-            return [dict(zip([col[0] for col in self.cursor.description], row))
-                   for row in self.cursor.fetchall()]
+            return self._get_unsynced('app_usage', user_id)
         except Exception as e:
             logger.error(f"Error getting unsynced app usage: {str(e)}")
             raise
@@ -240,66 +232,72 @@ class LocalDatabase:
     def get_unsynced_breaks(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all unsynced breaks for a user."""
         try:
-            self.cursor.execute(
-                "SELECT * FROM breaks WHERE user_id = ? AND synced = 0",
-                (user_id,)
-            )
-            return [dict(zip([col[0] for col in self.cursor.description], row))
-                   for row in self.cursor.fetchall()]
+            return self._get_unsynced('breaks', user_id)
         except Exception as e:
             logger.error(f"Error getting unsynced breaks: {str(e)}")
             raise
 
-    def mark_activity_synced(self, activity_id: int):
-        """Mark an activity log as synced."""
+    def iter_unsynced(self, table: str, user_id: str, batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a user's unsynced rows of a table in id order, one batch at a time."""
+        if table not in self.TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        source = READ_VIEWS.get(self.TABLES[table], self.TABLES[table])
+        last_id = 0
+        while True:
+            try:
+                batch = self._query(
+                    f"SELECT * FROM {source} WHERE user_id = ? AND is_synced = 0 AND id > ? "
+                    "ORDER BY id LIMIT ?",
+                    (user_id, last_id, batch_size)
+                )
+            except Exception as e:
+                logger.error(f"Error reading unsynced rows from {table}: {str(e)}")
+                raise
+            if not batch:
+                return
+            last_id = batch[-1]['id']
+            yield batch
+            if len(batch) < batch_size:
+                return
+
+    def _mark_synced(self, table: str, record_ids: Union[int, Iterable[int]]) -> int:
+        self.engine.flush()
+        with self.engine.get_connection() as conn:
+            return bulk_mark_synced(conn, self.TABLES[table], record_ids)
+
+    def mark_activity_synced(self, activity_ids: Union[int, Iterable[int]]) -> int:
+        """Mark an activity log or a list of them as synced in one transaction."""
         try:
-            self.cursor.execute(
-                "UPDATE activity_logs SET synced = 1 WHERE id = ?",
-                (activity_id,)
-            )
-            self.conn.commit()
+            return self._mark_synced('activity_logs', activity_ids)
         except Exception as e:
             logger.error(f"Error marking activity as synced: {str(e)}")
             raise
 
-    def mark_screenshot_synced(self, screenshot_id: int):
-        """Mark a screenshot as synced."""
+    def mark_screenshot_synced(self, screenshot_ids: Union[int, Iterable[int]]) -> int:
+        """Mark a screenshot or a list of them as synced in one transaction."""
         try:
-            self.cursor.execute(
-                "UPDATE screenshots SET synced = 1 WHERE id = ?",
-                (screenshot_id,)
-            )
-            self.conn.commit()
+            return self._mark_synced('screenshots', screenshot_ids)
         except Exception as e:
             logger.error(f"Error marking screenshot as synced: {str(e)}")
             raise
 
-    def mark_app_usage_synced(self, app_usage_id: int):
-        """Mark an app usage record as synced."""
+    def mark_app_usage_synced(self, app_usage_ids: Union[int, Iterable[int]]) -> int:
+        """Mark an app usage record or a list of them as synced in one transaction."""
         try:
-            self.cursor.execute(
-                "UPDATE app_usage SET synced = 1 WHERE id = ?",
-                (app_usage_id,)
-            )
-            self.conn.commit()
+            return self._mark_synced('app_usage', app_usage_ids)
         except Exception as e:
             logger.error(f"Error marking app usage as synced: {str(e)}")
             raise
 
-    def mark_break_synced(self, break_id: int):
-        """Mark a break as synced."""
+    def mark_break_synced(self, break_ids: Union[int, Iterable[int]]) -> int:
+        """Mark a break or a list of them as synced in one transaction."""
         try:
-            self.cursor.execute(
-                "UPDATE breaks SET synced = 1 WHERE id = ?",
-                (break_id,)
-            )
-            self.conn.commit()
+            return self._mark_synced('breaks', break_ids)
         except Exception as e:
             logger.error(f"Error marking break as synced: {str(e)}")
             raise
 
     def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed") 
\ No newline at end of file
+        """Commit buffered writes. The shared engine stays open for other users."""
+        self.engine.flush()
+        logger.info("Database connection closed")
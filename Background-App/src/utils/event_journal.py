@@ -0,0 +1,130 @@
+import asyncio
+import json
+import struct
+import logging
+from typing import Any, Iterator, Optional, Tuple
+
+from .events import Event
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, then records of RECORD_HEADER followed by a JSON payload.
+# Type codes are process-local, so the first record for each type is a
+# definition record (code 0) whose payload maps the code to the type name.
+MAGIC = b'WMEJ\x01'
+RECORD_HEADER = struct.Struct('<HqI')  # type code, monotonic ns, payload length
+TYPE_DEFINITION = 0
+
+def _json_default(value: Any):
+    """Serialize hook event objects (namedtuples, KeyboardEvent) for the journal."""
+    if hasattr(value, '_asdict'):
+        return value._asdict()
+    if hasattr(value, 'to_json'):
+        return json.loads(value.to_json())
+    if hasattr(value, '__dict__'):
+        return vars(value)
+    return str(value)
+
+class EventRecorder:
+    """Writes EventManager traffic to a compact binary journal.
+
+    Attach it with ``event_manager.add_tap(recorder.record)``. Records are
+    buffered in memory and written out in large chunks.
+    """
+
+    def __init__(self, path: str, buffer_bytes: int = 64 * 1024):
+        self.path = path
+        self.buffer_bytes = buffer_bytes
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._buffer = bytearray()
+        self._known_types = set()
+        self.records = 0
+
+    def record(self, event: Event):
+        """Append an event to the journal."""
+        if event.type_code not in self._known_types:
+            self._known_types.add(event.type_code)
+            self._append(TYPE_DEFINITION, event.t_ns, {
+                'code': event.type_code,
+                'name': event.type
+            })
+        self._append(event.type_code, event.t_ns, event.data)
+        self.records += 1
+
+    def _append(self, code: int, t_ns: int, payload: Any):
+        body = json.dumps(payload, default=_json_default, separators=(',', ':')).encode('utf-8')
+        self._buffer += RECORD_HEADER.pack(code, t_ns, len(body))
+        self._buffer += body
+        if len(self._buffer) >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to disk."""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.flush()
+
+    def close(self):
+        """Flush and close the journal file."""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        logger.info(f"Recorded {self.records} events to {self.path}")
+
+def read_journal(path: str) -> Iterator[Tuple[str, int, Any]]:
+    """Yield (event_type, t_ns, data) tuples from a journal file."""
+    names = {}
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not an event journal: {path}")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            code, t_ns, length = RECORD_HEADER.unpack(header)
+            payload = json.loads(f.read(length))
+            if code == TYPE_DEFINITION:
+                names[payload['code']] = payload['name']
+                continue
+            yield names[code], t_ns, payload
+
+class EventReplayer:
+    """Feeds a recorded journal back through an EventManager.
+
+    ``speed`` is a multiple of the recorded pace (1.0 is real time, 10.0 is
+    ten times faster); None replays as fast as the EventManager accepts.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0):
+        self.path = path
+        self.speed = speed
+
+    async def replay(self, event_manager) -> dict:
+        """Replay the journal and return throughput statistics."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first_t_ns = None
+        events = 0
+
+        for event_type, t_ns, data in read_journal(self.path):
+            if first_t_ns is None:
+                first_t_ns = t_ns
+            if self.speed:
+                delay = start + (t_ns - first_t_ns) / 1e9 / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await event_manager.put_event(event_type, data)
+            events += 1
+            if not self.speed and events % 256 == 0:
+                # Give the dispatcher and handlers a chance to run
+                await asyncio.sleep(0)
+
+        elapsed = loop.time() - start
+        return {
+            'events': events,
+            'elapsed_seconds': elapsed,
+            'events_per_second': events / elapsed if elapsed > 0 else 0.0
+        }
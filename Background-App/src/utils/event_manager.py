@@ -1,90 +1,324 @@
 import asyncio
+import json
 from datetime import datetime
-from typing import Callable, Dict, List
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
 import logging
 from queue import Queue
 from threading import Lock
+from .backpressure import BackpressurePolicy, create_policy
+from .events import Event, type_code, wall_time
+from .metrics import EventLatency
 
 logger = logging.getLogger(__name__)
+perf_logger = logging.getLogger('performance')
+
+class HandlerWorker:
+    """Runs one handler off its own bounded queue.
+
+    Each registered handler gets a worker task, so a slow handler only
+    fills its own queue instead of stalling dispatch to the others. Batch
+    workers hand the handler a list of up to ``max_batch`` events, waiting
+    at most ``max_delay_ms`` after the first event for the batch to fill.
+    """
+
+    def __init__(self,
+                 event_type: str,
+                 handler: Callable,
+                 max_queue_size: int = 1000,
+                 batch: bool = False,
+                 max_batch: int = 1,
+                 max_delay_ms: int = 0,
+                 latency: Optional[EventLatency] = None):
+        self.event_type = event_type
+        self.handler = handler
+        self.latency = latency or EventLatency()
+        self.batch = batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    @property
+    def name(self) -> str:
+        return getattr(self.handler, '__qualname__', repr(self.handler))
+
+    def start(self):
+        """Start the worker task on the running loop."""
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.task = asyncio.create_task(self.run())
+
+    def offer(self, event: Event):
+        """Hand an event to the worker without waiting; counts it if the queue is full."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def run(self):
+        """Process events until the shutdown sentinel is received."""
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            if not self.batch:
+                await self._call(event)
+                continue
+
+            events = [event]
+            stopping = await self._fill_batch(events)
+            await self._call(events)
+            if stopping:
+                return
+
+    async def _fill_batch(self, events: list) -> bool:
+        """Collect events until the batch is full or max_delay has passed.
+
+        Returns True if the shutdown sentinel was reached.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(events) < self.max_batch:
+            try:
+                event = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if event is None:
+                return True
+            events.append(event)
+        return False
+
+    async def _call(self, payload):
+        events = payload if self.batch else (payload,)
+        latency = self.latency
+        started = time.monotonic_ns()
+        for event in events:
+            latency.queue.record(started - event.t_ns)
+        try:
+            await self.handler(payload)
+        except Exception as e:
+            logger.error(f"Error in event handler for {self.event_type}: {e}")
+        finished = time.monotonic_ns()
+        latency.handler.record(finished - started)
+        for event in events:
+            latency.end_to_end.record(finished - event.t_ns)
+
+    async def stop(self):
+        """Let the worker finish its queued events, then end it."""
+        if self.task is None:
+            return
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    def get_stats(self) -> dict:
+        return {
+            'event_type': self.event_type,
+            'handler': self.name,
+            'batch': self.batch,
+            'queue_size': self.queue.qsize() if self.queue else 0,
+            'dropped': self.dropped
+        }
 
 class EventManager:
-    def __init__(self, max_queue_size: int = 1000):
+    def __init__(self,
+                 max_queue_size: int = 1000,
+                 backpressure: Union[str, BackpressurePolicy] = 'coalesce',
+                 handler_queue_size: Optional[int] = None):
         self.event_queue = asyncio.Queue(maxsize=max_queue_size)
+        self.backpressure = create_policy(backpressure)
+        self.handler_queue_size = handler_queue_size or max_queue_size
         self.handlers: Dict[str, List[Callable]] = {}
+        self._workers: Dict[str, List[HandlerWorker]] = {}
+        self._taps: List[Callable[[Event], None]] = []
+        self.latency: Dict[str, EventLatency] = {}
         self._running = False
+        self._task: Optional[asyncio.Task] = None
         self._lock = Lock()
         self.event_counts = {
             'keyboard': 0,
             'mouse': 0,
             'window': 0
         }
-        self.last_event_time = datetime.now()
+        self.last_event_ns = time.monotonic_ns()
+
+    @property
+    def last_event_time(self) -> datetime:
+        return wall_time(self.last_event_ns)
 
     async def start(self):
         """Start the event processing loop."""
         self._running = True
+        self._task = asyncio.current_task()
+        for worker in self._all_workers():
+            worker.start()
         try:
             while self._running:
                 event = await self.event_queue.get()
-                await self._process_event(event)
+                self.backpressure.on_dequeue(event)
+                self._dispatch(event)
                 self.event_queue.task_done()
+        except asyncio.CancelledError:
+            # stop() cancels the loop while it waits for the next event
+            if self._running:
+                raise
         except Exception as e:
             logger.error(f"Error in event processing loop: {e}")
             raise
+        finally:
+            self._task = None
+            self._dispatch_pending()
+            await self._stop_workers()
 
     def stop(self):
         """Stop the event processing loop."""
         self._running = False
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
 
-    async def put_event(self, event_type: str, event_data: dict):
-        """Put an event into the queue with throttling."""
-        try:
-            # Basic throttling: skip if queue is nearly full
-            if self.event_queue.qsize() > self.event_queue.maxsize * 0.9:
-                logger.warning(f"Event queue nearly full, skipping {event_type} event")
-                return
+    async def put_event(self, event_type: str, event_data: Any, t_ns: Optional[int] = None):
+        """Put an event into the queue, applying the backpressure policy.
 
-            current_time = datetime.now()
+        t_ns is the time.monotonic_ns() at which the event happened; it
+        defaults to now.
+        """
+        try:
+            event = Event(type_code(event_type), event_data, t_ns)
             # Update event counts and last event time
             with self._lock:
                 self.event_counts[event_type] = self.event_counts.get(event_type, 0) + 1
-                self.last_event_time = current_time
+                self.last_event_ns = event.t_ns
 
-            await self.event_queue.put({
-                'type': event_type,
-                'data': event_data,
-                'timestamp': current_time.isoformat()
-            })
+            for tap in self._taps:
+                tap(event)
+
+            await self.backpressure.offer(self.event_queue, event)
         except Exception as e:
             logger.error(f"Error putting event in queue: {e}")
 
-    async def _process_event(self, event: dict):
-        """Process a single event."""
-        event_type = event['type']
-        if event_type in self.handlers:
-            for handler in self.handlers[event_type]:
-                try:
-                    await handler(event)
-                except Exception as e:
-                    logger.error(f"Error in event handler for {event_type}: {e}")
+    def _dispatch(self, event: Event):
+        """Fan an event out to the workers of its handlers."""
+        for worker in self._workers.get(event.type, ()):
+            worker.offer(event)
+
+    def _dispatch_pending(self):
+        """Hand events still in the queue to the workers so stopping loses nothing."""
+        while True:
+            try:
+                event = self.event_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self.backpressure.on_dequeue(event)
+            self._dispatch(event)
+            self.event_queue.task_done()
+
+    def _all_workers(self) -> List[HandlerWorker]:
+        return [worker for workers in self._workers.values() for worker in workers]
+
+    async def _stop_workers(self):
+        """Drain and stop all handler workers."""
+        workers = self._all_workers()
+        if workers:
+            await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+
+    def _latency_for(self, event_type: str) -> EventLatency:
+        latency = self.latency.get(event_type)
+        if latency is None:
+            latency = self.latency[event_type] = EventLatency()
+        return latency
+
+    def _add_worker(self, worker: HandlerWorker):
+        self._workers.setdefault(worker.event_type, []).append(worker)
+        if self._task is not None:
+            worker.start()
 
     def register_handler(self, event_type: str, handler: Callable):
         """Register an event handler."""
         if event_type not in self.handlers:
             self.handlers[event_type] = []
         self.handlers[event_type].append(handler)
+        self._add_worker(HandlerWorker(
+            event_type,
+            handler,
+            self.handler_queue_size,
+            latency=self._latency_for(event_type)
+        ))
+
+    def register_batch_handler(self,
+                               event_type: str,
+                               handler: Callable,
+                               max_batch: int = 100,
+                               max_delay_ms: int = 1000):
+        """Register a handler that receives lists of events.
+
+        The handler is called with up to max_batch events, at most
+        max_delay_ms after the first event of the batch arrived.
+        """
+        if event_type not in self.handlers:
+            self.handlers[event_type] = []
+        self.handlers[event_type].append(handler)
+        self._add_worker(HandlerWorker(
+            event_type,
+            handler,
+            self.handler_queue_size,
+            batch=True,
+            max_batch=max_batch,
+            max_delay_ms=max_delay_ms,
+            latency=self._latency_for(event_type)
+        ))
+
+    def add_tap(self, tap: Callable[[Event], None]):
+        """Register a synchronous callback that sees every event as it is put.
+
+        Taps run before backpressure is applied, e.g. to record a journal.
+        """
+        self._taps.append(tap)
+
+    def remove_tap(self, tap: Callable[[Event], None]):
+        """Unregister a tap added with add_tap."""
+        self._taps.remove(tap)
 
     def get_event_stats(self) -> dict:
         """Get current event statistics."""
         with self._lock:
+            backpressure = self.backpressure.get_stats()
             return {
                 'counts': self.event_counts.copy(),
-                'last_event_time': self.last_event_time,
-                'queue_size': self.event_queue.qsize()
+                'last_event_time': wall_time(self.last_event_ns),
+                'queue_size': self.event_queue.qsize(),
+                'backpressure': backpressure['policy'],
+                'dropped': backpressure['dropped'],
+                'coalesced': backpressure['coalesced'],
+                'handlers': [worker.get_stats() for worker in self._all_workers()],
+                'latency': {
+                    event_type: latency.to_dict()
+                    for event_type, latency in self.latency.items()
+                }
             }
 
+    def log_stats(self, reset_latency: bool = True):
+        """Write current stats to the performance logger.
+
+        By default the latency histograms are reset afterwards, so each dump
+        covers the period since the previous one.
+        """
+        stats = self.get_event_stats()
+        stats['last_event_time'] = stats['last_event_time'].isoformat()
+        perf_logger.info(f"event_manager {json.dumps(stats)}")
+        if reset_latency:
+            for latency in self.latency.values():
+                latency.reset()
+
     def reset_counts(self):
         """Reset event counts."""
         with self._lock:
             for key in self.event_counts:
-                self.event_counts[key] = 0 
\ No newline at end of file
+                self.event_counts[key] = 0
@@ -0,0 +1,79 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Small integer codes for the built-in event types
+KEYBOARD = 1
+MOUSE = 2
+WINDOW = 3
+
+_TYPE_CODES: Dict[str, int] = {
+    'keyboard': KEYBOARD,
+    'mouse': MOUSE,
+    'window': WINDOW
+}
+_TYPE_NAMES: List[Optional[str]] = [None, 'keyboard', 'mouse', 'window']
+
+# Offset between the monotonic clock and wall-clock time, taken once so
+# events only carry an integer and wall-clock values are derived on demand.
+_WALL_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+def type_code(event_type: str) -> int:
+    """Get the integer code for an event type, registering new types on first use."""
+    code = _TYPE_CODES.get(event_type)
+    if code is None:
+        code = _TYPE_CODES[event_type] = len(_TYPE_NAMES)
+        _TYPE_NAMES.append(event_type)
+    return code
+
+def type_name(code: int) -> str:
+    """Get the event type name for an integer code."""
+    return _TYPE_NAMES[code]
+
+def wall_time(t_ns: int) -> datetime:
+    """Convert a monotonic_ns timestamp to a local wall-clock datetime."""
+    return datetime.fromtimestamp((t_ns + _WALL_OFFSET_NS) / 1e9)
+
+class Event:
+    """Compact event record.
+
+    Holds a small integer type code and a ``time.monotonic_ns()`` timestamp
+    instead of a type string and an ISO timestamp string. ``count`` is the
+    number of raw input events the record stands for (see CoalescePolicy).
+    Item access (``event['type']``) is kept for handlers written against the
+    old dict events; wall-clock strings are only built when asked for.
+    """
+
+    __slots__ = ('type_code', 't_ns', 'data', 'count')
+
+    def __init__(self, type_code: int, data: Any = None, t_ns: Optional[int] = None, count: int = 1):
+        self.type_code = type_code
+        self.t_ns = time.monotonic_ns() if t_ns is None else t_ns
+        self.data = data
+        self.count = count
+
+    @property
+    def type(self) -> str:
+        return _TYPE_NAMES[self.type_code]
+
+    @property
+    def wall_time(self) -> datetime:
+        return wall_time(self.t_ns)
+
+    @property
+    def timestamp(self) -> str:
+        return wall_time(self.t_ns).isoformat()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ('type', 'data', 'timestamp', 'count'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self) -> str:
+        return f"Event(type={self.type!r}, t_ns={self.t_ns}, count={self.count}, data={self.data!r})"
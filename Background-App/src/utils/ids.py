@@ -0,0 +1,78 @@
+import os
+import time
+import uuid
+from threading import Lock
+
+# Layout of a 64-bit id, high to low bits:
+#   41 bits  milliseconds since ID_EPOCH_MS (good for ~69 years)
+#   10 bits  node, so concurrent processes writing one database don't collide
+#   12 bits  per-millisecond sequence (4096 ids/ms per node)
+# Ids sort by creation time, so inserts land at the end of the primary key
+# B-tree, and they fit SQLite's INTEGER PRIMARY KEY (the rowid) directly.
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+class IdGenerator:
+    """Thread-safe generator of time-ordered 64-bit integer ids."""
+
+    def __init__(self, node=None):
+        if node is None:
+            node = os.getpid()
+        self.node = node & MAX_NODE
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = Lock()
+
+    def advance_past(self, record_id):
+        """Make every later id greater than record_id, e.g. the newest id already stored.
+
+        Guards against a wall clock that stepped back while the process was
+        down, and against ids written by other nodes.
+        """
+        with self._lock:
+            after_ms = (record_id >> (NODE_BITS + SEQUENCE_BITS)) + 1
+            if after_ms > self._last_ms:
+                self._last_ms = after_ms
+                self._sequence = 0
+
+    def next_id(self):
+        """Get a new id, greater than every id this generator returned before."""
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - ID_EPOCH_MS
+            # Never go backwards if the wall clock is adjusted
+            if now < self._last_ms:
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted for this millisecond; borrow the next one
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self._sequence
+
+def id_timestamp_ms(record_id):
+    """Get the Unix time in milliseconds at which an id was generated."""
+    return (record_id >> (NODE_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS
+
+def to_uuid(record_id, namespace):
+    """Map a local id to the UUID used for it remotely.
+
+    namespace is the installation's UUID, so the mapping is stable for a
+    database and ids from different installations never meet.
+    """
+    return uuid.uuid5(namespace, str(record_id))
+
+_default_generator = IdGenerator()
+
+def next_id():
+    """Get a new id from the process-wide generator."""
+    return _default_generator.next_id()
+
+def advance_past(record_id):
+    """Make the process-wide generator hand out only ids greater than record_id."""
+    _default_generator.advance_past(record_id)
@@ -0,0 +1,159 @@
+import asyncio
+import time
+import logging
+from threading import Lock
+from typing import Any, Optional
+
+from .event_manager import EventManager
+from .mouse_tracker import MouseMoveBuffer
+
+logger = logging.getLogger(__name__)
+
+class InputBridge:
+    """Moves events from keyboard/mouse hook threads into an EventManager.
+
+    Hook callbacks run on the hook library's own thread, where no event loop
+    is available. They append into a preallocated ring buffer, and a single
+    drainer coroutine forwards the buffered events to the EventManager in
+    batches. The loop is only woken (via ``call_soon_threadsafe``) when the
+    buffer goes from empty to non-empty, not once per event.
+
+    Mouse moves and scrolls bypass the ring buffer: they are collected in a
+    MouseMoveBuffer and emitted as one 'mouse_movement' summary event every
+    ``mouse_flush_interval`` seconds.
+    """
+
+    def __init__(self,
+                 event_manager: EventManager,
+                 capacity: int = 4096,
+                 max_batch: int = 256,
+                 mouse_move_threshold: int = 10,
+                 mouse_flush_interval: float = 1.0):
+        self.event_manager = event_manager
+        self.capacity = capacity
+        self.max_batch = max_batch
+        self.mouse_moves = MouseMoveBuffer(threshold=mouse_move_threshold)
+        self.mouse_flush_interval = mouse_flush_interval
+        self._buffer: list = [None] * capacity
+        self._head = 0  # next slot to read
+        self._size = 0
+        self._lock = Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+        self.dropped = 0
+        self.forwarded = 0
+
+    def push(self, event_type: str, event_data: Any):
+        """Append an event from a hook thread. Never blocks on the event loop."""
+        with self._lock:
+            if self._size == self.capacity:
+                # Overwrite the oldest event rather than stall the hook thread
+                self._head = (self._head + 1) % self.capacity
+                self._size -= 1
+                self.dropped += 1
+            self._buffer[(self._head + self._size) % self.capacity] = (
+                event_type, event_data, time.monotonic_ns())
+            self._size += 1
+            was_empty = self._size == 1
+
+        if was_empty and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Loop already closed during shutdown
+                pass
+
+    def push_mouse_move(self, x: int, y: int):
+        """Record a mouse move from a hook thread."""
+        self.mouse_moves.add_move(x, y)
+
+    def push_scroll(self, count: int = 1):
+        """Record scroll wheel events from a hook thread."""
+        self.mouse_moves.add_scroll(count)
+
+    def _drain(self) -> list:
+        """Pop up to max_batch events from the ring buffer."""
+        with self._lock:
+            count = min(self._size, self.max_batch)
+            batch = []
+            for _ in range(count):
+                batch.append(self._buffer[self._head])
+                self._buffer[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+            self._size -= count
+            return batch
+
+    async def run(self):
+        """Drain buffered hook events into the EventManager until stopped."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        # Events pushed before the loop was attached are still buffered
+        if self._size:
+            self._wakeup.set()
+
+        loop = self._loop
+        next_mouse_flush = loop.time() + self.mouse_flush_interval
+        try:
+            while self._running:
+                timeout = next_mouse_flush - loop.time()
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                if loop.time() >= next_mouse_flush:
+                    await self._flush_mouse_moves()
+                    next_mouse_flush = loop.time() + self.mouse_flush_interval
+                self._wakeup.clear()
+                batch = self._drain()
+                while batch:
+                    await self._forward(batch)
+                    # Let other tasks run between batches during input bursts
+                    await asyncio.sleep(0)
+                    batch = self._drain()
+        finally:
+            self._loop = None
+            # Forward what the hooks pushed since the last drain, so the
+            # last input before shutdown is not lost
+            batch = self._drain()
+            while batch:
+                await self._forward(batch)
+                batch = self._drain()
+            await self._flush_mouse_moves()
+
+    async def _flush_mouse_moves(self):
+        """Emit the summary of buffered mouse moves as a single event."""
+        summary = self.mouse_moves.flush()
+        if summary is None:
+            return
+        t_ns = summary['end_ns']
+        await self.event_manager.put_event('mouse_movement', summary, t_ns)
+
+    async def _forward(self, batch: list):
+        """Forward a batch of (event_type, event_data, t_ns) records."""
+        for event_type, event_data, t_ns in batch:
+            await self.event_manager.put_event(event_type, event_data, t_ns)
+        self.forwarded += len(batch)
+
+    def stop(self):
+        """Stop the drainer coroutine."""
+        self._running = False
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+
+    def get_stats(self) -> dict:
+        """Get ring buffer statistics."""
+        with self._lock:
+            return {
+                'buffered': self._size,
+                'capacity': self.capacity,
+                'dropped': self.dropped,
+                'forwarded': self.forwarded,
+                'mouse_samples': len(self.mouse_moves),
+                'mouse_samples_dropped': self.mouse_moves.dropped
+            }
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from threading import RLock
+from typing import Optional
+
+class Interner:
+    """Maps strings to the integer ids of a lookup table (``apps``, ``titles``).
+
+    Recently used strings are kept in an LRU map, so the common case of the
+    same few apps and windows costs a dict lookup; a miss reads the table
+    and inserts the string if it is new. Ids are never reused or deleted,
+    so cached ids stay valid for the life of the database.
+    """
+
+    def __init__(self, table: str, column: str, capacity: int = 1024):
+        self.table = table
+        self.column = column
+        self.capacity = capacity
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = RLock()
+
+    def id_for(self, conn, value: Optional[str]) -> Optional[int]:
+        """Get the id of value, adding it to the table on first use. None maps to None."""
+        if value is None:
+            return None
+        with self._lock:
+            value_id = self._cache.get(value)
+            if value_id is not None:
+                self._cache.move_to_end(value)
+                return value_id
+            row = conn.execute(
+                f"SELECT id FROM {self.table} WHERE {self.column} = ?", (value,)
+            ).fetchone()
+            if row:
+                value_id = row[0]
+            else:
+                value_id = conn.execute(
+                    f"INSERT INTO {self.table} ({self.column}) VALUES (?)", (value,)
+                ).lastrowid
+            self._cache[value] = value_id
+            if len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+            return value_id
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
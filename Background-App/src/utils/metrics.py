@@ -0,0 +1,88 @@
+from typing import Dict, List
+
+# Bucket i holds latencies below 2**i microseconds; the last bucket is open-ended.
+# 28 buckets cover 1us .. ~134s, which is plenty for queue and handler times.
+NUM_BUCKETS = 28
+
+class LatencyHistogram:
+    """Fixed power-of-two bucket histogram of latencies in nanoseconds.
+
+    Recording is a bit_length() and a list increment, so it is cheap enough
+    to run for every event. Percentiles are reported as the upper bound of
+    the bucket they fall in, i.e. within a factor of two.
+    """
+
+    __slots__ = ('buckets', 'count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, latency_ns: int):
+        """Add one latency sample."""
+        if latency_ns < 0:
+            latency_ns = 0
+        index = (latency_ns // 1000).bit_length()
+        if index >= NUM_BUCKETS:
+            index = NUM_BUCKETS - 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ns += latency_ns
+        if latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+
+    def percentile(self, fraction: float) -> float:
+        """Get the approximate latency in milliseconds at a fraction (0-1) of samples."""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= threshold:
+                if index == NUM_BUCKETS - 1:
+                    return self.max_ns / 1e6
+                return min((1 << index) / 1000, self.max_ns / 1e6)
+        return self.max_ns / 1e6
+
+    def reset(self):
+        """Clear all samples."""
+        self.buckets = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def to_dict(self) -> dict:
+        """Summarize the histogram in milliseconds."""
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ns / self.count / 1e6 if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max_ns / 1e6
+        }
+
+class EventLatency:
+    """Queue, handler and end-to-end latency histograms for one event type."""
+
+    __slots__ = ('queue', 'handler', 'end_to_end')
+
+    def __init__(self):
+        self.queue = LatencyHistogram()
+        self.handler = LatencyHistogram()
+        self.end_to_end = LatencyHistogram()
+
+    def reset(self):
+        self.queue.reset()
+        self.handler.reset()
+        self.end_to_end.reset()
+
+    def to_dict(self) -> Dict[str, dict]:
+        return {
+            'queue': self.queue.to_dict(),
+            'handler': self.handler.to_dict(),
+            'end_to_end': self.end_to_end.to_dict()
+        }
@@ -0,0 +1,532 @@
+"""
+Versioned schema migrations for the local database.
+
+The schema version is kept in ``PRAGMA user_version``. On startup
+``migrate()`` reads it once and applies only the migrations above it, each
+in its own transaction together with the version bump, so an up-to-date
+database costs a single PRAGMA instead of a round of schema probes.
+
+To change the schema, append a function decorated with ``@migration(n)``
+where n is one more than the last version. Never edit a released migration.
+"""
+import logging
+
+from .ids import next_id
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register a function(conn) as the migration to schema version ``version``."""
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Bring the database up to the latest schema version. Returns the final version."""
+    current = schema_version(conn)
+    for version, description, func in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Migrating local database to version {version}: {description}")
+        conn.execute("BEGIN")
+        try:
+            func(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _add_missing_columns(conn, table, columns):
+    existing = _columns(conn, table)
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+@migration(1, "local cache tables")
+def _local_cache_tables(conn):
+    # Databases created before versioning already have some of this, so
+    # every step is idempotent.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS local_time_entries (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            task_id TEXT,
+            start_time TEXT NOT NULL,
+            end_time TEXT,
+            duration INTEGER,
+            status TEXT DEFAULT 'active',
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS local_activity_logs (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            time_entry_id INTEGER,
+            app_name TEXT NOT NULL,
+            window_title TEXT,
+            activity_type TEXT NOT NULL,
+            keystroke_count INTEGER DEFAULT 0,
+            mouse_events INTEGER DEFAULT 0,
+            mouse_movement_distance INTEGER DEFAULT 0,
+            scroll_events INTEGER DEFAULT 0,
+            idle_time INTEGER DEFAULT 0,
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS local_screenshots (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            time_entry_id INTEGER,
+            local_file_path TEXT NOT NULL,
+            storage_path TEXT,
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS local_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _add_missing_columns(conn, "local_activity_logs", [
+        ("mouse_movement_distance", "INTEGER DEFAULT 0"),
+        ("scroll_events", "INTEGER DEFAULT 0"),
+    ])
+    _migrate_text_ids(conn)
+
+def _migrate_text_ids(conn):
+    """Rebuild tables created with TEXT ids ("al_<timestamp>") to use integer ids.
+
+    Rows get new time-ordered ids in created_at order, and time_entry_id
+    references are remapped to the new time entry ids.
+    """
+    id_type = conn.execute(
+        "SELECT type FROM pragma_table_info('local_time_entries') WHERE name = 'id'"
+    ).fetchone()[0]
+    if id_type.upper() == "INTEGER":
+        return
+
+    logger.info("Migrating local tables to integer ids")
+    time_entry_ids = {}
+    for table in ("local_time_entries", "local_activity_logs", "local_screenshots"):
+        schema = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        schema = (schema.replace("id TEXT PRIMARY KEY", "id INTEGER PRIMARY KEY")
+                        .replace("time_entry_id TEXT", "time_entry_id INTEGER"))
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        conn.execute(schema)
+
+        cursor = conn.execute(f"SELECT * FROM {table}_old ORDER BY created_at, id")
+        columns = [col[0] for col in cursor.description]
+        rows = []
+        for row in cursor.fetchall():
+            record = dict(zip(columns, row))
+            new_id = next_id()
+            if table == "local_time_entries":
+                time_entry_ids[record["id"]] = new_id
+            elif "time_entry_id" in record:
+                record["time_entry_id"] = time_entry_ids.get(record["time_entry_id"])
+            record["id"] = new_id
+            rows.append(tuple(record[col] for col in columns))
+        if rows:
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows
+            )
+        conn.execute(f"DROP TABLE {table}_old")
+
+    # Watermarks refer to the old ids
+    conn.execute("DELETE FROM local_settings WHERE key LIKE 'sync_watermark.%'")
+
+@migration(2, "partial unsynced and (user_id, created_at) indexes")
+def _sync_indexes(conn):
+    for name in (
+        "idx_time_entries_user_id",
+        "idx_time_entries_sync",
+        "idx_activity_logs_user_id",
+        "idx_activity_logs_sync",
+        "idx_screenshots_user_id",
+        "idx_screenshots_sync",
+    ):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    # Unsynced rows are a small, moving subset of each table, so the sync
+    # queries use partial indexes over just those rows, ordered like the
+    # outbox keyset. Per-user reporting reads go through (user_id, created_at).
+    for table, prefix in (
+        ("local_time_entries", "time_entries"),
+        ("local_activity_logs", "activity_logs"),
+        ("local_screenshots", "screenshots"),
+    ):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{prefix}_unsynced ON {table}(created_at, id) WHERE is_synced = 0"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{prefix}_user_created ON {table}(user_id, created_at)"
+        )
+
+@migration(3, "tables of the retired LocalDatabase and src/sqlite_manager layers")
+def _merged_tables(conn):
+    _add_missing_columns(conn, "local_activity_logs", [("details", "TEXT")])
+    conn.execute("""
+        CREATE TABLE local_app_usage (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            app_name TEXT NOT NULL,
+            window_title TEXT,
+            duration_seconds INTEGER DEFAULT 0,
+            keystroke_count INTEGER DEFAULT 0,
+            mouse_event_count INTEGER DEFAULT 0,
+            mouse_movement_distance INTEGER DEFAULT 0,
+            scroll_events INTEGER DEFAULT 0,
+            idle_time_seconds INTEGER DEFAULT 0,
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE local_breaks (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            break_type TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT,
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for table, prefix in (("local_app_usage", "app_usage"), ("local_breaks", "breaks")):
+        conn.execute(f"CREATE INDEX idx_{prefix}_unsynced ON {table}(user_id, id) WHERE is_synced = 0")
+        conn.execute(f"CREATE INDEX idx_{prefix}_user_created ON {table}(user_id, created_at)")
+
+    # Admin data previously created by src/sqlite_manager.py
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS profiles (
+            id TEXT PRIMARY KEY,
+            email TEXT NOT NULL UNIQUE,
+            full_name TEXT NOT NULL,
+            role TEXT NOT NULL CHECK (role IN ('admin', 'employee')),
+            department TEXT,
+            phone TEXT,
+            avatar_url TEXT,
+            created_at TEXT DEFAULT (datetime('now')),
+            updated_at TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leave_requests (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            leave_type TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            reason TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            requested_at TEXT DEFAULT (datetime('now')),
+            reviewed_at TEXT,
+            reviewer_id TEXT,
+            comments TEXT,
+            FOREIGN KEY (user_id) REFERENCES profiles(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leave_balances (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            leave_type TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            total_allotted INTEGER NOT NULL,
+            total_taken INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT (datetime('now')),
+            FOREIGN KEY (user_id) REFERENCES profiles(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leave_types (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            default_allotment_days INTEGER,
+            is_active INTEGER DEFAULT 1
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS company_settings (
+            setting_name TEXT PRIMARY KEY,
+            setting_value TEXT NOT NULL,
+            description TEXT,
+            updated_at TEXT DEFAULT (datetime('now'))
+        )
+    """)
+
+def _pick(columns, candidates, default="NULL"):
+    """SQL expression for the first of candidates present in columns."""
+    present = [col for col in candidates if col in columns]
+    if not present:
+        return default
+    if len(present) == 1 and default == "NULL":
+        return present[0]
+    return f"COALESCE({', '.join(present + [default])})"
+
+def _copy_legacy_table(conn, source, target, expressions):
+    """Copy a legacy table into target with new ids, then drop it.
+
+    expressions maps each target column to a SQL expression over the
+    source columns; rows are copied in created_at order.
+    """
+    if not _table_exists(conn, source):
+        return 0
+    targets = list(expressions)
+    select = ", ".join(expressions[col] for col in targets)
+    rows = conn.execute(f"SELECT {select} FROM {source} ORDER BY 1 IS NULL, 1").fetchall()
+    conn.executemany(
+        f"INSERT INTO {target} (id, {', '.join(targets)}) VALUES (?{', ?' * len(targets)})",
+        [(next_id(),) + tuple(row) for row in rows]
+    )
+    conn.execute(f"DROP TABLE {source}")
+    logger.info(f"Moved {len(rows)} rows from {source} to {target}")
+    return len(rows)
+
+@migration(4, "move rows from the retired tables into the local_* tables")
+def _import_legacy_rows(conn):
+    now = "datetime('now')"
+
+    if _table_exists(conn, "activity_logs"):
+        cols = _columns(conn, "activity_logs")
+        _copy_legacy_table(conn, "activity_logs", "local_activity_logs", {
+            "created_at": f"datetime({_pick(cols, ['timestamp'], now)})",
+            "user_id": _pick(cols, ["user_id"], "''"),
+            "app_name": "''",
+            "activity_type": _pick(cols, ["activity_type"], "'unknown'"),
+            "details": _pick(cols, ["details"]),
+            "is_synced": _pick(cols, ["synced", "is_synced"], "0"),
+        })
+
+    # Both retired layers created a "screenshots" table, and each added its
+    # columns to the other's, so take whichever column is populated.
+    if _table_exists(conn, "screenshots"):
+        cols = _columns(conn, "screenshots")
+        _copy_legacy_table(conn, "screenshots", "local_screenshots", {
+            "created_at": f"datetime({_pick(cols, ['timestamp', 'captured_at_local', 'created_at_local'], now)})",
+            "user_id": _pick(cols, ["user_id"], "''"),
+            "local_file_path": _pick(cols, ["file_path", "local_file_path"], "''"),
+            "storage_path": _pick(cols, ["storage_path_supabase"]),
+            "is_synced": _pick(cols, ["synced", "is_synced"], "0"),
+        })
+
+    if _table_exists(conn, "app_usage"):
+        cols = _columns(conn, "app_usage")
+        _copy_legacy_table(conn, "app_usage", "local_app_usage", {
+            "created_at": f"datetime({_pick(cols, ['timestamp', 'created_at_local'], now)})",
+            "user_id": _pick(cols, ["user_id"], "''"),
+            "app_name": _pick(cols, ["app_name"], "''"),
+            "window_title": _pick(cols, ["window_title"]),
+            "duration_seconds": _pick(cols, ["duration_seconds", "duration"], "0"),
+            "keystroke_count": _pick(cols, ["keystroke_count"], "0"),
+            "mouse_event_count": _pick(cols, ["mouse_event_count"], "0"),
+            "mouse_movement_distance": _pick(cols, ["mouse_movement_distance"], "0"),
+            "scroll_events": _pick(cols, ["scroll_events"], "0"),
+            "idle_time_seconds": _pick(cols, ["idle_time_seconds"], "0"),
+            "is_synced": _pick(cols, ["synced", "is_synced"], "0"),
+        })
+
+    if _table_exists(conn, "breaks"):
+        cols = _columns(conn, "breaks")
+        _copy_legacy_table(conn, "breaks", "local_breaks", {
+            "created_at": f"datetime({_pick(cols, ['start_time'], now)})",
+            "user_id": _pick(cols, ["user_id"], "''"),
+            "break_type": _pick(cols, ["break_type"], "'break'"),
+            "start_time": _pick(cols, ["start_time"], now),
+            "end_time": _pick(cols, ["end_time"]),
+            "is_synced": _pick(cols, ["synced", "is_synced"], "0"),
+        })
+
+@migration(5, "intern app names and window titles")
+def _intern_app_names(conn):
+    # apps and titles are never pruned, so archived partitions can keep
+    # pointing at them; that is also why the id columns have no REFERENCES
+    # clause (partition files copy the table definition).
+    conn.execute("CREATE TABLE apps (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("CREATE TABLE titles (id INTEGER PRIMARY KEY, title TEXT NOT NULL UNIQUE)")
+    conn.execute("""
+        INSERT OR IGNORE INTO apps (name)
+        SELECT app_name FROM local_activity_logs UNION SELECT app_name FROM local_app_usage
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO titles (title)
+        SELECT window_title FROM local_activity_logs WHERE window_title IS NOT NULL
+        UNION SELECT window_title FROM local_app_usage WHERE window_title IS NOT NULL
+    """)
+
+    _rebuild_interned(conn, "local_activity_logs", """
+        CREATE TABLE local_activity_logs (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            time_entry_id INTEGER,
+            app_id INTEGER NOT NULL,
+            title_id INTEGER,
+            activity_type TEXT NOT NULL,
+            keystroke_count INTEGER DEFAULT 0,
+            mouse_events INTEGER DEFAULT 0,
+            mouse_movement_distance INTEGER DEFAULT 0,
+            scroll_events INTEGER DEFAULT 0,
+            idle_time INTEGER DEFAULT 0,
+            details TEXT,
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX idx_activity_logs_unsynced ON local_activity_logs(created_at, id) WHERE is_synced = 0"
+    )
+    conn.execute("CREATE INDEX idx_activity_logs_user_created ON local_activity_logs(user_id, created_at)")
+
+    _rebuild_interned(conn, "local_app_usage", """
+        CREATE TABLE local_app_usage (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            app_id INTEGER NOT NULL,
+            title_id INTEGER,
+            duration_seconds INTEGER DEFAULT 0,
+            keystroke_count INTEGER DEFAULT 0,
+            mouse_event_count INTEGER DEFAULT 0,
+            mouse_movement_distance INTEGER DEFAULT 0,
+            scroll_events INTEGER DEFAULT 0,
+            idle_time_seconds INTEGER DEFAULT 0,
+            is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX idx_app_usage_unsynced ON local_app_usage(user_id, id) WHERE is_synced = 0")
+    conn.execute("CREATE INDEX idx_app_usage_user_created ON local_app_usage(user_id, created_at)")
+
+    # Readers that want the strings (reporting, sync payloads) use these
+    conn.execute("""
+        CREATE VIEW local_activity_logs_view AS
+        SELECT l.id, l.user_id, l.time_entry_id, a.name AS app_name, t.title AS window_title,
+               l.activity_type, l.keystroke_count, l.mouse_events, l.mouse_movement_distance,
+               l.scroll_events, l.idle_time, l.details, l.is_synced, l.created_at
+        FROM local_activity_logs l
+        LEFT JOIN apps a ON a.id = l.app_id
+        LEFT JOIN titles t ON t.id = l.title_id
+    """)
+    conn.execute("""
+        CREATE VIEW local_app_usage_view AS
+        SELECT u.id, u.user_id, a.name AS app_name, t.title AS window_title,
+               u.duration_seconds, u.keystroke_count, u.mouse_event_count,
+               u.mouse_movement_distance, u.scroll_events, u.idle_time_seconds,
+               u.is_synced, u.created_at
+        FROM local_app_usage u
+        LEFT JOIN apps a ON a.id = u.app_id
+        LEFT JOIN titles t ON t.id = u.title_id
+    """)
+
+def _rebuild_interned(conn, table, schema):
+    """Recreate table from schema, replacing app_name/window_title with their ids."""
+    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    conn.execute(schema)
+    columns = [col for col in _columns(conn, table) if col not in ("app_id", "title_id")]
+    select = ", ".join(f"o.{col}" for col in columns)
+    conn.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)}, app_id, title_id)
+        SELECT {select}, a.id, t.id FROM {table}_old o
+        JOIN apps a ON a.name = o.app_name
+        LEFT JOIN titles t ON t.title = o.window_title
+    """)
+    conn.execute(f"DROP TABLE {table}_old")
+
+@migration(6, "per-app activity rollups")
+def _activity_rollups(conn):
+    # Filled in by SQLiteManager.insert_activity_log; rebuild existing data
+    # with SQLiteManager.rebuild_rollups (python -m src.rebuild_rollups)
+    for grain in ("minute", "hour", "day"):
+        conn.execute(f"""
+            CREATE TABLE activity_rollup_{grain} (
+                user_id TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                app_id INTEGER NOT NULL,
+                active_seconds REAL NOT NULL DEFAULT 0,
+                idle_seconds REAL NOT NULL DEFAULT 0,
+                keystrokes INTEGER NOT NULL DEFAULT 0,
+                mouse_events INTEGER NOT NULL DEFAULT 0,
+                scroll_events INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, bucket_start, app_id)
+            ) WITHOUT ROWID
+        """)
+
+@migration(7, "sync retry state and dead letters")
+def _sync_retries(conn):
+    # Rows of the sync tables whose last upload failed, keyed by local table
+    conn.execute("""
+        CREATE TABLE sync_retries (
+            table_name TEXT NOT NULL,
+            record_id INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            last_error TEXT,
+            PRIMARY KEY (table_name, record_id)
+        ) WITHOUT ROWID
+    """)
+    # Rows that were rejected too often; their source row has is_synced = 2
+    conn.execute("""
+        CREATE TABLE sync_dead_letters (
+            table_name TEXT NOT NULL,
+            record_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            error TEXT,
+            attempts INTEGER NOT NULL,
+            failed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (table_name, record_id)
+        ) WITHOUT ROWID
+    """)
+
+@migration(8, "key the sync outbox on id alone")
+def _outbox_by_id(conn):
+    # Ids are time-ordered; created_at is wall-clock time and often steps
+    # back, which let new rows sort below a saved watermark
+    for table, prefix in (
+        ("local_time_entries", "time_entries"),
+        ("local_activity_logs", "activity_logs"),
+        ("local_screenshots", "screenshots"),
+    ):
+        conn.execute(f"DROP INDEX IF EXISTS idx_{prefix}_unsynced")
+        conn.execute(f"CREATE INDEX idx_{prefix}_unsynced ON {table}(id) WHERE is_synced = 0")
+    # Watermarks were (created_at, id) keys; the first pass rescans the outbox
+    conn.execute("DELETE FROM local_settings WHERE key LIKE 'sync_watermark.%'")
+
+@migration(9, "screen recordings")
+def _recordings(conn):
+    conn.execute("""
+        CREATE TABLE local_recordings (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_size INTEGER DEFAULT 0,
+            duration_seconds INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX idx_recordings_user ON local_recordings(user_id, id)")
@@ -0,0 +1,109 @@
+import math
+import time
+import logging
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class MouseMoveBuffer:
+    """Collects raw mouse move samples from the hook thread.
+
+    Moves are not queued as events. The hook thread writes (x, y, t) samples
+    into one of two preallocated arrays, and ``flush`` swaps the arrays and
+    summarizes the finished window: movement distance, number of meaningful
+    moves and scroll count. A sample only counts once it is at least
+    ``threshold`` pixels from the last counted one, so jitter is filtered out.
+    """
+
+    def __init__(self, capacity: int = 8192, threshold: int = 10):
+        self.capacity = capacity
+        self.threshold = max(int(threshold), 1)
+        self._active = self._allocate()
+        self._spare = self._allocate()
+        self._size = 0
+        self._scrolls = 0
+        self._last_point: Optional[tuple] = None
+        self._lock = Lock()
+        self.dropped = 0
+
+    def _allocate(self) -> np.ndarray:
+        # Columns: x, y, monotonic time in ns
+        return np.empty((self.capacity, 3), dtype=np.int64)
+
+    def add_move(self, x: int, y: int, t_ns: Optional[int] = None):
+        """Record a mouse move sample. Called from the hook thread."""
+        t_ns = time.monotonic_ns() if t_ns is None else t_ns
+        with self._lock:
+            if self._size == self.capacity:
+                self.dropped += 1
+                return
+            self._active[self._size] = (x, y, t_ns)
+            self._size += 1
+
+    def add_scroll(self, count: int = 1):
+        """Record scroll wheel events. Called from the hook thread."""
+        with self._lock:
+            self._scrolls += count
+
+    def __len__(self) -> int:
+        return self._size
+
+    def flush(self) -> Optional[dict]:
+        """Summarize and reset the current window.
+
+        Returns None if nothing was recorded since the last flush.
+        """
+        with self._lock:
+            if not self._size and not self._scrolls:
+                return None
+            samples = self._active[:self._size]
+            scrolls = self._scrolls
+            # Double buffering: the hook thread keeps writing into the spare
+            self._active, self._spare = self._spare, self._active
+            self._size = 0
+            self._scrolls = 0
+            last_point = self._last_point
+
+        summary, self._last_point = self._summarize(samples, last_point)
+        summary['scroll_events'] = scrolls
+        return summary
+
+    def _summarize(self, samples: np.ndarray, last_point: Optional[tuple]) -> tuple:
+        """Compute distance and move count for a window of samples.
+
+        Returns the summary and the last counted point, which the next
+        window continues from.
+        """
+        if not len(samples):
+            return {'distance': 0, 'moves': 0, 'start_ns': None, 'end_ns': None}, last_point
+
+        points = samples[:, :2]
+        if last_point is not None:
+            # Continue the path from where the previous window ended
+            points = np.vstack((np.asarray(last_point, dtype=np.int64), points))
+        # Repeated positions never count; drop them before the walk below
+        changed = np.concatenate(([True], np.any(points[1:] != points[:-1], axis=1)))
+        points = points[changed]
+
+        # Keep a sample only once it is threshold pixels from the last kept
+        # one, so jitter back and forth (even across a grid line) adds nothing
+        xs, ys = points[:, 0].tolist(), points[:, 1].tolist()
+        kept_x, kept_y = xs[0], ys[0]
+        min_squared = self.threshold * self.threshold
+        distance = 0.0
+        moves = 0
+        for x, y in zip(xs[1:], ys[1:]):
+            dx, dy = x - kept_x, y - kept_y
+            if dx * dx + dy * dy >= min_squared:
+                distance += math.hypot(dx, dy)
+                moves += 1
+                kept_x, kept_y = x, y
+        return {
+            'distance': int(round(distance)),
+            'moves': moves,
+            'start_ns': int(samples[0, 2]),
+            'end_ns': int(samples[-1, 2])
+        }, (kept_x, kept_y)
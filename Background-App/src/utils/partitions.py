@@ -0,0 +1,293 @@
+import os
+import re
+import logging
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta
+
+from .sqlite_manager import READ_VIEWS
+
+logger = logging.getLogger(__name__)
+
+# SQLite attaches at most 10 databases per connection by default
+MAX_ATTACHED = 10
+
+# SQL expression giving the partition key (start date) of a created_at value
+PERIOD_KEYS = {
+    'day': "date(created_at)",
+    # 'weekday 0' moves forward to Sunday, so -6 days is that week's Monday
+    'week': "date(created_at, 'weekday 0', '-6 days')",
+}
+
+# Extra conditions a synced row must meet to be archived (or compacted away, see
+# storage_compactor.py), per table
+ARCHIVE_CONDITIONS = {
+    # SupabaseSync uploads files from the hot table; keep rows until theirs is uploaded
+    'local_screenshots': "storage_path IS NOT NULL",
+}
+
+class PartitionManager:
+    """Moves synced rows out of the hot database into per-period files.
+
+    Rows of ``tables`` that are synced and belong to a closed period (an
+    earlier day or week), and meet the table's ARCHIVE_CONDITIONS, are archived to ``<directory>/<stem>-<period>.db``.
+    Unsynced rows and the current period stay in the hot database, which
+    keeps it small. Archived data is read back through a UNION ALL view
+    (``open_view``) and expired by deleting whole files (``drop_before``).
+    """
+
+    def __init__(self, sqlite, directory=None, period='day',
+                 tables=('local_activity_logs', 'local_screenshots')):
+        if period not in PERIOD_KEYS:
+            raise ValueError(f"Unknown partition period: {period}")
+        self.sqlite = sqlite
+        self.period = period
+        self.tables = tuple(tables)
+        base, _ = os.path.splitext(sqlite.db_path)
+        self.directory = directory or os.path.join(os.path.dirname(base), 'partitions')
+        self.stem = os.path.basename(base)
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def period_days(self):
+        return 7 if self.period == 'week' else 1
+
+    def path_for(self, key):
+        """Get the file holding the partition that starts on date key (YYYY-MM-DD)."""
+        return os.path.join(self.directory, f"{self.stem}-{key}.db")
+
+    def partitions(self):
+        """List (start date, path) of the existing partition files, oldest first."""
+        pattern = re.compile(rf"^{re.escape(self.stem)}-(\d{{4}}-\d{{2}}-\d{{2}})\.db$")
+        found = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match:
+                found.append((date.fromisoformat(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _current_key(self, now=None):
+        now = now or datetime.utcnow()
+        start = now.date()
+        if self.period == 'week':
+            start -= timedelta(days=start.weekday())
+        return start.isoformat()
+
+    def archive(self, now=None):
+        """Move synced rows of closed periods into their partition files.
+
+        Each partition is filled in one transaction, so a row is either in
+        the hot table or in its partition. Returns the number of rows moved.
+        """
+        key_sql = PERIOD_KEYS[self.period]
+        current = self._current_key(now)
+        moved = 0
+        try:
+            with self.sqlite.get_connection() as conn:
+                keys = sorted({
+                    row[0]
+                    for table in self.tables
+                    for row in conn.execute(
+                        f"SELECT DISTINCT {key_sql} FROM {table} WHERE {self._archivable(table)} AND {key_sql} < ?",
+                        (current,)
+                    )
+                    if row[0]
+                })
+            for key in keys:
+                with self.sqlite.attached(self.path_for(key), 'part') as conn:
+                    with conn:
+                        for table in self.tables:
+                            columns = self._prepare_table(conn, table)
+                            column_list = ", ".join(columns)
+                            where = f"{self._archivable(table)} AND {key_sql} = ?"
+                            conn.execute(
+                                f"INSERT INTO part.{table} ({column_list}) "
+                                f"SELECT {column_list} FROM main.{table} WHERE {where}",
+                                (key,)
+                            )
+                            moved += conn.execute(f"DELETE FROM main.{table} WHERE {where}", (key,)).rowcount
+            if moved:
+                logger.info(f"Archived {moved} synced rows into {len(keys)} partitions")
+            return moved
+        except Exception as e:
+            logger.error(f"Error archiving partitions: {e}")
+            raise
+
+    def _archivable(self, table):
+        condition = ARCHIVE_CONDITIONS.get(table)
+        return f"is_synced = 1 AND {condition}" if condition else "is_synced = 1"
+
+    def _prepare_table(self, conn, table):
+        """Create or extend part.<table> to match the hot table; return its columns."""
+        info = conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+        columns = [row[1] for row in info]
+        existing = self._intern_legacy_names(conn, 'part', table)
+        if not existing:
+            self._create_table(conn, 'part', table)
+        else:
+            for row in info:
+                if row[1] not in existing:
+                    conn.execute(f"ALTER TABLE part.{table} ADD COLUMN {row[1]} {row[2]}")
+        return columns
+
+    def _create_table(self, conn, alias, table):
+        schema = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        conn.execute(re.sub(r"^CREATE TABLE \"?\w+\"?", f"CREATE TABLE {alias}.{table}", schema))
+        conn.execute(f"CREATE INDEX {alias}.idx_{table}_user_created ON {table}(user_id, created_at)")
+
+    def _intern_legacy_names(self, conn, alias, table):
+        """Rebuild a partition archived before app names were interned.
+
+        Its app_name/window_title strings are replaced by ids from the main
+        database's apps and titles tables. Returns the partition table's
+        columns (empty if it does not exist).
+        """
+        existing = {row[1] for row in conn.execute(f"PRAGMA {alias}.table_info({table})")}
+        if 'app_name' not in existing:
+            return existing
+        conn.execute(f"INSERT OR IGNORE INTO main.apps (name) SELECT app_name FROM {alias}.{table}")
+        conn.execute(f"""
+            INSERT OR IGNORE INTO main.titles (title)
+            SELECT window_title FROM {alias}.{table} WHERE window_title IS NOT NULL
+        """)
+        conn.execute(f"ALTER TABLE {alias}.{table} RENAME TO {table}_old")
+        conn.execute(f"DROP INDEX IF EXISTS {alias}.idx_{table}_user_created")
+        self._create_table(conn, alias, table)
+        columns = [row[1] for row in conn.execute(f"PRAGMA {alias}.table_info({table})")]
+        copied = [col for col in columns if col in existing]
+        conn.execute(f"""
+            INSERT INTO {alias}.{table} ({', '.join(copied)}, app_id, title_id)
+            SELECT {', '.join('o.' + col for col in copied)}, a.id, t.id FROM {alias}.{table}_old o
+            JOIN main.apps a ON a.name = o.app_name
+            LEFT JOIN main.titles t ON t.title = o.window_title
+        """)
+        conn.execute(f"DROP TABLE {alias}.{table}_old")
+        logger.info(f"Interned app names of archived {table} in {alias}")
+        return set(columns)
+
+    @contextmanager
+    def open_view(self, table, start=None, end=None):
+        """Attach the partitions overlapping [start, end) and yield a UNION ALL view name.
+
+        The temp view ``all_<table>`` covers the hot table and those
+        partitions, and is only valid inside the block. Tables with interned
+        app names get ``app_name`` and ``window_title`` columns joined back.
+        """
+        if table not in self.tables:
+            raise ValueError(f"Table is not partitioned: {table}")
+        selected = [
+            (key, path) for key, path in self.partitions()
+            if (start is None or key + timedelta(days=self.period_days) > start.date())
+            and (end is None or key < end.date() + timedelta(days=1))
+        ]
+        if len(selected) > MAX_ATTACHED:
+            raise ValueError(
+                f"Range covers {len(selected)} partitions; at most {MAX_ATTACHED} can be attached"
+            )
+
+        view = f"all_{table}"
+        with ExitStack() as stack:
+            conn = stack.enter_context(self.sqlite.get_connection())
+            columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+            selects = [f"SELECT {', '.join(columns)} FROM main.{table}"]
+            for index, (key, path) in enumerate(selected):
+                alias = f"p{index}"
+                stack.enter_context(self.sqlite.attached(path, alias))
+                present = self._intern_legacy_names(conn, alias, table)
+                if not present:
+                    continue
+                values = ", ".join(col if col in present else f"NULL AS {col}" for col in columns)
+                selects.append(f"SELECT {values} FROM {alias}.{table}")
+            body = ' UNION ALL '.join(selects)
+            if 'app_id' in columns:
+                body = f"""
+                    SELECT u.*, a.name AS app_name, t.title AS window_title FROM ({body}) u
+                    LEFT JOIN main.apps a ON a.id = u.app_id
+                    LEFT JOIN main.titles t ON t.id = u.title_id
+                """
+            conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+            conn.execute(f"CREATE TEMP VIEW {view} AS {body}")
+            try:
+                yield view
+            finally:
+                conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+
+    @property
+    def window(self):
+        """Longest range one open_view can cover without attaching more than MAX_ATTACHED partitions."""
+        return timedelta(days=(MAX_ATTACHED - 2) * self.period_days)
+
+    def _read_window(self, table, start, end, order, limit=None, columns=None):
+        where, params = [], []
+        if start is not None:
+            where.append("created_at >= ?")
+            params.append(start.strftime('%Y-%m-%d %H:%M:%S'))
+        if end is not None:
+            where.append("created_at < ?")
+            params.append(end.strftime('%Y-%m-%d %H:%M:%S'))
+        if limit is not None:
+            params.append(limit)
+        with self.open_view(table, start, end) as view:
+            with self.sqlite.get_connection() as conn:
+                if columns is None:
+                    columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({READ_VIEWS.get(table, table)})")]
+                cursor = conn.execute(
+                    f"SELECT {', '.join(columns)} FROM {view}"
+                    + (" WHERE " + " AND ".join(where) if where else "")
+                    + f" ORDER BY {order}"
+                    + (" LIMIT ?" if limit is not None else ""),
+                    params
+                )
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def read_range(self, table, start, end, columns=None):
+        """Get the rows of table created in [start, end), hot and archived, oldest first.
+
+        Rows come back as dicts with the given columns, by default those of
+        the table's read view (see READ_VIEWS). Long ranges are read one
+        window at a time.
+        """
+        self.sqlite.flush()
+        rows = []
+        while start < end:
+            window_end = min(end, start + self.window)
+            rows += self._read_window(table, start, window_end, "created_at, id", columns=columns)
+            start = window_end
+        return rows
+
+    def read_recent(self, table, limit, now=None):
+        """Get the newest limit rows of table, hot and archived, newest first."""
+        self.sqlite.flush()
+        found = self.partitions()
+        oldest = found[0][0] if found else None
+        rows = []
+        end = None
+        start = (now or datetime.utcnow()) - self.window
+        while len(rows) < limit:
+            if oldest is None or start.date() <= oldest:
+                # Every partition left fits in this window; it also picks up
+                # old rows still in the hot table (e.g. unsynced ones)
+                start = None
+            rows += self._read_window(table, start, end, "created_at DESC, id DESC", limit - len(rows))
+            if start is None:
+                break
+            end, start = start, start - self.window
+        return rows
+
+    def drop_before(self, cutoff):
+        """Delete partition files whose whole period ends on or before cutoff.
+
+        Returns the number of files removed.
+        """
+        removed = 0
+        for key, path in self.partitions():
+            if key + timedelta(days=self.period_days) > cutoff.date():
+                continue
+            for suffix in ('', '-journal', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} partitions older than {cutoff.date()}")
+        return removed
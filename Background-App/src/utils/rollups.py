@@ -0,0 +1,114 @@
+"""
+Per-app activity rollups at minute, hour and day granularity.
+
+Each activity log ends the interval started by the user's previous log,
+and that interval's seconds are credited to the previous log's app, as
+active time or, after an 'idle' log, as idle time. A log's own input
+counts go to the bucket it was written in. The rollup tables are keyed by
+(user_id, bucket_start, app_id) and only ever incremented, so summaries
+read a handful of buckets instead of every raw row.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Grain name -> bucket length in seconds, coarsest first
+GRAINS = (('day', 86400), ('hour', 3600), ('minute', 60))
+
+ROLLUP_TABLES = {grain: f"activity_rollup_{grain}" for grain, _ in GRAINS}
+
+# Order of the counters in rollup rows and upsert parameters
+COUNTERS = ('active_seconds', 'idle_seconds', 'keystrokes', 'mouse_events', 'scroll_events')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_EPOCH = datetime(1970, 1, 1)
+
+UPSERT_SQL = {
+    grain: f"""
+        INSERT INTO {table} (user_id, bucket_start, app_id, {', '.join(COUNTERS)})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, bucket_start, app_id) DO UPDATE SET
+        {', '.join(f'{name} = {name} + excluded.{name}' for name in COUNTERS)}
+    """
+    for grain, table in ROLLUP_TABLES.items()
+}
+
+def floor_time(ts: datetime, seconds: int) -> datetime:
+    """Start of the bucket of the given length that contains ts."""
+    return ts - timedelta(seconds=(ts - _EPOCH).total_seconds() % seconds)
+
+def ceil_time(ts: datetime, seconds: int) -> datetime:
+    floored = floor_time(ts, seconds)
+    return floored if floored == ts else floored + timedelta(seconds=seconds)
+
+def split_interval(start: datetime, end: datetime, seconds: int) -> Iterator[Tuple[datetime, float]]:
+    """Yield (bucket_start, seconds in bucket) for the buckets [start, end) overlaps."""
+    bucket = floor_time(start, seconds)
+    while bucket < end:
+        following = bucket + timedelta(seconds=seconds)
+        yield bucket, (min(end, following) - max(start, bucket)).total_seconds()
+        bucket = following
+
+def cover(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """Split [start, end) into (grain, from, to) ranges using as few buckets as possible.
+
+    Whole days are read from the day table, the hours around them from the
+    hour table, and the remaining minutes from the minute table. Both ends
+    are rounded down to the minute.
+    """
+    def _cover(start, end, grains):
+        grain, seconds = grains[0]
+        if len(grains) == 1:
+            return [(grain, start, end)] if start < end else []
+        low, high = ceil_time(start, seconds), floor_time(end, seconds)
+        if low >= high:
+            return _cover(start, end, grains[1:])
+        return _cover(start, low, grains[1:]) + [(grain, low, high)] + _cover(high, end, grains[1:])
+
+    return _cover(floor_time(start, 60), floor_time(end, 60), GRAINS)
+
+class RollupTracker:
+    """Turns a time-ordered stream of activity logs into rollup upserts.
+
+    Remembers each user's latest log so the next one can close its interval.
+    """
+
+    def __init__(self):
+        self._last: Dict[str, Tuple[datetime, int, bool]] = {}
+
+    def __contains__(self, user_id):
+        return user_id in self._last
+
+    def seed(self, user_id: str, ts: Optional[datetime], app_id: Optional[int], idle: bool = False):
+        """Set the user's latest log, e.g. from the database after a restart."""
+        if ts is not None and app_id is not None:
+            self._last[user_id] = (ts, app_id, idle)
+        else:
+            self._last.setdefault(user_id, None)
+
+    def record(self, user_id: str, ts: datetime, app_id: int, idle: bool = False,
+               keystrokes: int = 0, mouse_events: int = 0, scroll_events: int = 0) -> List[Tuple[str, tuple]]:
+        """Account for one activity log; returns (sql, params) upserts to run."""
+        deltas: Dict[Tuple[str, datetime, int], List[float]] = {}
+
+        def add(grain, bucket, bucket_app, index, amount):
+            deltas.setdefault((grain, bucket, bucket_app), [0, 0, 0, 0, 0])[index] += amount
+
+        last = self._last.get(user_id)
+        if last is not None and ts > last[0]:
+            last_ts, last_app, last_idle = last
+            for grain, seconds in GRAINS:
+                for bucket, amount in split_interval(last_ts, ts, seconds):
+                    add(grain, bucket, last_app, 1 if last_idle else 0, amount)
+        for grain, seconds in GRAINS:
+            bucket = floor_time(ts, seconds)
+            for index, amount in ((2, keystrokes), (3, mouse_events), (4, scroll_events)):
+                if amount:
+                    add(grain, bucket, app_id, index, amount)
+        if last is None or ts >= last[0]:
+            self._last[user_id] = (ts, app_id, idle)
+
+        return [
+            (UPSERT_SQL[grain], (user_id, bucket.strftime(TIME_FORMAT), bucket_app, *values))
+            for (grain, bucket, bucket_app), values in deltas.items()
+        ]
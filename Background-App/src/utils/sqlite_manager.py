@@ -1,97 +1,374 @@
 import sqlite3
 import os
-from datetime import datetime
+import json
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import RLock
 import logging
+from .ids import advance_past, next_id, to_uuid
+from .interning import Interner
+from .rollups import ROLLUP_TABLES, TIME_FORMAT, RollupTracker, cover
+from .migrations import migrate
+from .write_buffer import WriteBuffer
 
 logger = logging.getLogger(__name__)
 
+# Remote (Supabase) table names used by SyncManager -> local cache tables
+SYNC_TABLES = {
+    'activities': 'local_activity_logs',
+    'screenshots': 'local_screenshots',
+    'time_entries': 'local_time_entries',
+}
+
+# Tables whose ids come from next_id()
+ID_TABLES = (
+    'local_time_entries', 'local_activity_logs', 'local_app_usage',
+    'local_breaks', 'local_screenshots', 'local_recordings',
+)
+
+# Tables that store interned app/title ids -> views that join the strings back
+READ_VIEWS = {
+    'local_activity_logs': 'local_activity_logs_view',
+    'local_app_usage': 'local_app_usage_view',
+}
+
+# Ids per UPDATE ... WHERE id IN (...); well under SQLite's bound-parameter limit
+MARK_SYNCED_CHUNK = 500
+
+# is_synced value of rows moved to sync_dead_letters
+DEAD_LETTER = 2
+
+def bulk_mark_synced(conn, table_name, record_ids, flag_column="is_synced"):
+    """Set flag_column = 1 for record_ids using chunked IN lists.
+
+    Runs on the caller's connection, so all chunks share its transaction.
+    Returns the number of rows updated.
+    """
+    if isinstance(record_ids, (str, int)):
+        record_ids = [record_ids]
+    else:
+        record_ids = list(record_ids)
+    updated = 0
+    for i in range(0, len(record_ids), MARK_SYNCED_CHUNK):
+        chunk = record_ids[i:i + MARK_SYNCED_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"UPDATE {table_name} SET {flag_column} = 1 WHERE id IN ({placeholders})",
+            chunk
+        )
+        updated += cursor.rowcount
+    return updated
+
+class SQLiteProfile:
+    """Connection tuning applied to the manager's long-lived connection."""
+
+    def __init__(self,
+                 auto_vacuum="INCREMENTAL",
+                 journal_mode="WAL",
+                 synchronous="NORMAL",
+                 cache_size_kb=8192,
+                 mmap_size=64 * 1024 * 1024,
+                 temp_store="MEMORY",
+                 busy_timeout_ms=5000,
+                 statement_cache_size=128):
+        self.auto_vacuum = auto_vacuum
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache_size = statement_cache_size
+
+    def pragmas(self):
+        """PRAGMA statements to run on a new connection."""
+        return [
+            # Only takes effect on a new database; see enable_incremental_vacuum
+            f"PRAGMA auto_vacuum = {self.auto_vacuum}",
+            f"PRAGMA journal_mode = {self.journal_mode}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            # Negative cache_size is in KiB rather than pages
+            f"PRAGMA cache_size = -{int(self.cache_size_kb)}",
+            f"PRAGMA mmap_size = {int(self.mmap_size)}",
+            f"PRAGMA temp_store = {self.temp_store}",
+            f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}",
+        ]
+
+SQLITE_PROFILES = {
+    # WAL + NORMAL: commits don't fsync, only checkpoints do; a power loss
+    # can lose the last transactions but never corrupts the database.
+    'default': SQLiteProfile(),
+    # For machines where memory matters more than disk I/O
+    'low_memory': SQLiteProfile(cache_size_kb=2048, mmap_size=0, temp_store="DEFAULT"),
+    # fsync on every commit
+    'durable': SQLiteProfile(synchronous="FULL"),
+}
+
+def fetch_unsynced_page(conn, table_name, after, batch_size, deferred_at=None):
+    """Get up to batch_size unsynced rows of a sync table with ids after the given one.
+
+    Rows come back as dicts without the is_synced column, oldest first,
+    with app names and window titles rehydrated (see READ_VIEWS). If
+    deferred_at is given, rows whose next retry is later than it (see
+    sync_retries) are left out.
+    """
+    params = [-1 if after is None else after]
+    deferred = ""
+    if deferred_at is not None:
+        deferred = """AND NOT EXISTS (
+            SELECT 1 FROM sync_retries r
+            WHERE r.table_name = ? AND r.record_id = t.id AND r.next_attempt_at > ?
+        )"""
+        params += [table_name, deferred_at]
+    cursor = conn.execute(f"""
+        SELECT * FROM {READ_VIEWS.get(table_name, table_name)} t
+        WHERE is_synced = 0 AND id > ? {deferred}
+        ORDER BY id
+        LIMIT ?
+    """, params + [batch_size])
+    columns = [col[0] for col in cursor.description]
+    batch = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for record in batch:
+        record.pop('is_synced', None)
+    return batch
+
+def fetch_pending_screenshots(conn, user_id, limit=None):
+    """Get a user's screenshot rows whose file has not been uploaded yet, oldest first, as dicts."""
+    sql = "SELECT * FROM local_screenshots WHERE user_id = ? AND storage_path IS NULL ORDER BY created_at, id"
+    params = (user_id,)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit,)
+    cursor = conn.execute(sql, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def unsynced_start(conn, table_name, watermark):
+    """Get the id to page a sync table's outbox after, given its saved watermark.
+
+    The watermark is only a hint: ids are not guaranteed to grow across
+    restarts or between processes, so if an unsynced row lies at or below
+    it the outbox is paged from the start. idx_*_unsynced holds unsynced
+    rows only, so the check reads a single index entry.
+    """
+    if watermark is None:
+        return None
+    first = conn.execute(f"SELECT MIN(id) FROM {table_name} WHERE is_synced = 0").fetchone()[0]
+    return watermark if first is None or first > watermark else None
+
+def _sqlite_now():
+    """Current UTC time in the format of SQLite's datetime('now')."""
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
 class SQLiteManager:
-    def __init__(self, db_path="workmatrix.db"):
+    """The local storage engine: one database, one schema, one writer connection.
+
+    All local data (time entries, activity logs, screenshots, app usage,
+    breaks) lives in the ``local_*`` tables, whose schema is versioned by
+    migrations.py. LocalDatabase and src/sqlite_manager.py are adapters over
+    this class; use get_engine() to share one instance per database file.
+
+    Inserts are buffered and written in groups (see WriteBuffer): a row is
+    committed at most ``write_delay_ms`` after it was inserted, or sooner
+    once ``write_batch_size`` rows are pending. Reads and updates flush
+    first, so callers always see their own writes.
+    """
+
+    def __init__(self, db_path="workmatrix.db", profile="default",
+                 write_batch_size=500, write_delay_ms=1000):
         self.db_path = db_path
+        self.profile = profile if isinstance(profile, SQLiteProfile) else SQLITE_PROFILES[profile]
+        self._conn = None
+        self._lock = RLock()
+        self.write_buffer = WriteBuffer(write_batch_size, write_delay_ms)
+        self.apps = Interner('apps', 'name')
+        self.titles = Interner('titles', 'title', capacity=4096)
+        self.rollups = RollupTracker()
         self.initialize_db()
 
+    def _connect(self):
+        """Open the long-lived connection and apply the tuning profile."""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.profile.statement_cache_size
+        )
+        for pragma in self.profile.pragmas():
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Yield the shared connection inside a transaction.
+
+        The connection is opened once and reused; access is serialized with
+        a lock, and the transaction commits on exit or rolls back on error.
+        """
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            with self._conn:
+                yield self._conn
+
+    @contextmanager
+    def attached(self, path, alias):
+        """Attach another database file to the shared connection for the block.
+
+        The manager's lock is held throughout, so no other caller sees the
+        attachment; buffered inserts are flushed first.
+        """
+        with self._lock:
+            self.flush()
+            if self._conn is None:
+                self._conn = self._connect()
+            self._conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+            try:
+                yield self._conn
+            finally:
+                self._conn.execute(f"DETACH DATABASE {alias}")
+
+    def enable_incremental_vacuum(self):
+        """Switch an existing database to auto_vacuum=INCREMENTAL.
+
+        Needs a full VACUUM the first time, which rewrites the file; later
+        calls return immediately. Returns True if the database was converted.
+        """
+        with self._lock:
+            with self.get_connection() as conn:
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                    return False
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                logger.info("Converted database to incremental auto-vacuum")
+                return True
+
+    def incremental_vacuum(self, max_pages=0):
+        """Return free pages to the OS and report the bytes reclaimed.
+
+        max_pages of 0 frees every page on the freelist.
+        """
+        with self._lock:
+            with self.get_connection() as conn:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                before = conn.execute("PRAGMA page_count").fetchone()[0]
+                conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+                after = conn.execute("PRAGMA page_count").fetchone()[0]
+            # In WAL mode the file only shrinks once the WAL is checkpointed
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            return (before - after) * page_size
+
+    def _buffer_insert(self, sql, params):
+        """Queue a row for the next group commit, flushing if the buffer is due."""
+        if self.write_buffer.add(sql, params):
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows, one executemany per statement in a single transaction.
+
+        If the transaction fails for any reason other than a bad row (the
+        database is locked, the disk is full), the rows go back to the front
+        of the buffer for the next flush and the error is raised.
+        """
+        with self._lock:
+            pending = self.write_buffer.take()
+            if not pending:
+                return
+            try:
+                with self.get_connection() as conn:
+                    for sql, rows in pending.items():
+                        conn.executemany(sql, rows)
+            except sqlite3.IntegrityError as e:
+                # One bad row must not cost the whole group; retry row by row
+                logger.warning(f"Group commit failed ({e}), writing rows individually")
+                self._write_rows(pending)
+            except Exception as e:
+                logger.error(f"Error flushing write buffer, keeping {sum(map(len, pending.values()))} rows: {e}")
+                self.write_buffer.restore(pending)
+                raise
+
+    def flush_if_due(self):
+        """Flush if the oldest buffered row has reached the delay limit."""
+        if self.write_buffer.due():
+            self.flush()
+
+    def _write_rows(self, pending):
+        statements = list(pending.items())
+        for i, (sql, rows) in enumerate(statements):
+            for j, row in enumerate(rows):
+                try:
+                    with self.get_connection() as conn:
+                        conn.execute(sql, row)
+                except sqlite3.IntegrityError as e:
+                    logger.error(f"Dropping buffered row {row[0]}: {e}")
+                except Exception:
+                    # Keep this row and everything after it for the next flush
+                    self.write_buffer.restore(dict([(sql, rows[j:])] + statements[i + 1:]))
+                    raise
+
+    def close(self):
+        """Flush buffered rows and close the shared connection. It is reopened on next use."""
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
 
     def initialize_db(self):
-        """Initialize the database with the new schema."""
+        """Bring the database schema up to date (see migrations.py)."""
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Create local cache tables
-                cursor.executescript("""
-                    -- Local Time Entries
-                    CREATE TABLE IF NOT EXISTS local_time_entries (
-                        id TEXT PRIMARY KEY,
-                        user_id TEXT NOT NULL,
-                        task_id TEXT,
-                        start_time TEXT NOT NULL,
-                        end_time TEXT,
-                        duration INTEGER,
-                        status TEXT DEFAULT 'active',
-                        is_synced INTEGER DEFAULT 0,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    );
-
-                    -- Local Activity Logs
-                    CREATE TABLE IF NOT EXISTS local_activity_logs (
-                        id TEXT PRIMARY KEY,
-                        user_id TEXT NOT NULL,
-                        time_entry_id TEXT,
-                        app_name TEXT NOT NULL,
-                        window_title TEXT,
-                        activity_type TEXT NOT NULL,
-                        keystroke_count INTEGER DEFAULT 0,
-                        mouse_events INTEGER DEFAULT 0,
-                        idle_time INTEGER DEFAULT 0,
-                        is_synced INTEGER DEFAULT 0,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    );
-
-                    -- Local Screenshots
-                    CREATE TABLE IF NOT EXISTS local_screenshots (
-                        id TEXT PRIMARY KEY,
-                        user_id TEXT NOT NULL,
-                        time_entry_id TEXT,
-                        local_file_path TEXT NOT NULL,
-                        storage_path TEXT,
-                        is_synced INTEGER DEFAULT 0,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    );
-
-                    -- Local Settings
-                    CREATE TABLE IF NOT EXISTS local_settings (
-                        key TEXT PRIMARY KEY,
-                        value TEXT NOT NULL,
-                        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    );
-
-                    -- Create indexes for better performance
-                    CREATE INDEX IF NOT EXISTS idx_time_entries_user_id ON local_time_entries(user_id);
-                    CREATE INDEX IF NOT EXISTS idx_time_entries_sync ON local_time_entries(is_synced);
-                    CREATE INDEX IF NOT EXISTS idx_activity_logs_user_id ON local_activity_logs(user_id);
-                    CREATE INDEX IF NOT EXISTS idx_activity_logs_sync ON local_activity_logs(is_synced);
-                    CREATE INDEX IF NOT EXISTS idx_screenshots_user_id ON local_screenshots(user_id);
-                    CREATE INDEX IF NOT EXISTS idx_screenshots_sync ON local_screenshots(is_synced);
-                """)
-                
-                logger.info("Database initialized successfully")
+                version = migrate(conn)
+                self.install_id = self._get_install_id(conn)
+                # New ids must sort after stored ones even if the clock went back
+                advance_past(max(
+                    conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+                    for table in ID_TABLES
+                ))
+                logger.info(f"Database initialized successfully (schema version {version})")
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise
 
+    def _get_install_id(self, conn):
+        """Get this database's installation UUID, creating it on first use."""
+        row = conn.execute("SELECT value FROM local_settings WHERE key = 'install_id'").fetchone()
+        if row:
+            return uuid.UUID(row[0])
+        install_id = uuid.uuid4()
+        conn.execute(
+            "INSERT INTO local_settings (key, value) VALUES ('install_id', ?)",
+            (str(install_id),)
+        )
+        return install_id
+
+    def to_remote(self, record):
+        """Copy a local row dict with its ids replaced by the UUIDs used remotely."""
+        remote = dict(record)
+        for key in ("id", "time_entry_id"):
+            if remote.get(key) is not None:
+                remote[key] = str(to_uuid(remote[key], self.install_id))
+        return remote
+
+    def intern(self, app_name, window_title):
+        """Get the (app_id, title_id) for an app name and window title, adding new ones."""
+        try:
+            with self.get_connection() as conn:
+                return self.apps.id_for(conn, app_name or ''), self.titles.id_for(conn, window_title)
+        except Exception as e:
+            logger.error(f"Error interning app name: {e}")
+            raise
+
     def insert_time_entry(self, user_id, task_id=None):
         """Insert a new time entry."""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                entry_id = f"te_{datetime.now().timestamp()}"
-                cursor.execute("""
-                    INSERT INTO local_time_entries (id, user_id, task_id, start_time)
-                    VALUES (?, ?, ?, datetime('now'))
-                """, (entry_id, user_id, task_id))
-                return entry_id
+            entry_id = next_id()
+            now = _sqlite_now()
+            self._buffer_insert("""
+                INSERT INTO local_time_entries (id, user_id, task_id, start_time, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (entry_id, user_id, task_id, now, now))
+            return entry_id
         except Exception as e:
             logger.error(f"Error inserting time entry: {e}")
             raise
@@ -99,6 +376,7 @@ class SQLiteManager:
     def update_time_entry(self, entry_id, end_time=None, duration=None):
         """Update an existing time entry."""
         try:
+            self.flush()
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 if end_time:
@@ -112,43 +390,289 @@ class SQLiteManager:
             raise
 
     def insert_activity_log(self, user_id, time_entry_id, app_name, window_title, 
-                          activity_type, keystroke_count=0, mouse_events=0, idle_time=0):
+                          activity_type, keystroke_count=0, mouse_events=0, idle_time=0,
+                          mouse_movement_distance=0, scroll_events=0, details=None):
         """Insert a new activity log."""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                log_id = f"al_{datetime.now().timestamp()}"
-                cursor.execute("""
+            log_id = next_id()
+            now = datetime.utcnow().replace(microsecond=0)
+            app_id, title_id = self.intern(app_name, window_title)
+            with self._lock:
+                self._update_rollups(user_id, now, app_id, activity_type,
+                                     keystroke_count, mouse_events, scroll_events)
+                self._buffer_insert("""
                     INSERT INTO local_activity_logs 
-                    (id, user_id, time_entry_id, app_name, window_title, 
-                     activity_type, keystroke_count, mouse_events, idle_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (log_id, user_id, time_entry_id, app_name, window_title, 
-                      activity_type, keystroke_count, mouse_events, idle_time))
-                return log_id
+                    (id, user_id, time_entry_id, app_id, title_id, 
+                     activity_type, keystroke_count, mouse_events, idle_time,
+                     mouse_movement_distance, scroll_events, details, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (log_id, user_id, time_entry_id, app_id, title_id, 
+                      activity_type, keystroke_count, mouse_events, idle_time,
+                      mouse_movement_distance, scroll_events, details, now.strftime(TIME_FORMAT)))
+            return log_id
         except Exception as e:
             logger.error(f"Error inserting activity log: {e}")
             raise
 
+    def _update_rollups(self, user_id, now, app_id, activity_type, keystrokes, mouse_events, scroll_events):
+        """Buffer the rollup upserts for a new activity log (see rollups.py)."""
+        if user_id not in self.rollups:
+            # First log for this user since startup: continue from the latest stored one
+            with self.get_connection() as conn:
+                row = conn.execute("""
+                    SELECT created_at, app_id, activity_type FROM local_activity_logs
+                    WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 1
+                """, (user_id,)).fetchone()
+            if row:
+                self.rollups.seed(user_id, datetime.strptime(row[0], TIME_FORMAT), row[1], row[2] == 'idle')
+            else:
+                self.rollups.seed(user_id, None, None)
+        for sql, params in self.rollups.record(user_id, now, app_id, activity_type == 'idle',
+                                               keystrokes or 0, mouse_events or 0, scroll_events or 0):
+            self._buffer_insert(sql, params)
+
+    def rebuild_rollups(self, since=None, partitions=None):
+        """Recompute the activity rollups from the raw activity logs.
+
+        Rollups from the day containing since onwards (by default, the day
+        of the oldest log, hot or archived) are deleted and rebuilt. Logs
+        are read through partitions (a PartitionManager for this database
+        by default), so archived days are rebuilt too. Returns the number
+        of logs replayed.
+        """
+        if partitions is None:
+            # partitions.py imports this module
+            from .partitions import PartitionManager
+            partitions = PartitionManager(self)
+        try:
+            with self._lock:
+                self.flush()
+                found = partitions.partitions()
+                with self.get_connection() as conn:
+                    oldest, newest = conn.execute(
+                        "SELECT MIN(created_at), MAX(created_at) FROM local_activity_logs"
+                    ).fetchone()
+                bounds = [datetime.strptime(value, TIME_FORMAT) for value in (oldest, newest) if value]
+                if found:
+                    bounds.append(datetime.combine(found[0][0], datetime.min.time()))
+                    bounds.append(datetime.combine(found[-1][0], datetime.min.time())
+                                  + timedelta(days=partitions.period_days))
+                if not bounds:
+                    return 0
+                if since is None:
+                    since = min(bounds)
+                since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+                logs = partitions.read_range(
+                    'local_activity_logs', since, max(bounds) + timedelta(seconds=1),
+                    columns=['user_id', 'created_at', 'app_id', 'activity_type',
+                             'keystroke_count', 'mouse_events', 'scroll_events']
+                )
+                with self.get_connection() as conn:
+                    for table in ROLLUP_TABLES.values():
+                        conn.execute(f"DELETE FROM {table} WHERE bucket_start >= ?", (since.strftime(TIME_FORMAT),))
+                    tracker = RollupTracker()
+                    for log in logs:
+                        for sql, params in tracker.record(
+                            log['user_id'], datetime.strptime(log['created_at'], TIME_FORMAT), log['app_id'],
+                            log['activity_type'] == 'idle', log['keystroke_count'] or 0,
+                            log['mouse_events'] or 0, log['scroll_events'] or 0
+                        ):
+                            conn.execute(sql, params)
+                self.rollups = tracker
+                logger.info(f"Rebuilt activity rollups from {len(logs)} logs since {since.date()}")
+                return len(logs)
+        except Exception as e:
+            logger.error(f"Error rebuilding rollups: {e}")
+            raise
+
+    def get_rollup_summary(self, user_id, start, end):
+        """Get per-app totals for [start, end) from the rollup tables.
+
+        Returns {app_name: {active_seconds, idle_seconds, keystrokes,
+        mouse_events, scroll_events}}. The range is read with whole days,
+        hours and minutes (see rollups.cover), to minute precision.
+        """
+        try:
+            self.flush()
+            totals = {}
+            with self.get_connection() as conn:
+                for grain, low, high in cover(start, end):
+                    rows = conn.execute(f"""
+                        SELECT a.name, SUM(r.active_seconds), SUM(r.idle_seconds),
+                               SUM(r.keystrokes), SUM(r.mouse_events), SUM(r.scroll_events)
+                        FROM {ROLLUP_TABLES[grain]} r JOIN apps a ON a.id = r.app_id
+                        WHERE r.user_id = ? AND r.bucket_start >= ? AND r.bucket_start < ?
+                        GROUP BY r.app_id
+                    """, (user_id, low.strftime(TIME_FORMAT), high.strftime(TIME_FORMAT)))
+                    for name, *values in rows:
+                        app = totals.setdefault(name, {
+                            'active_seconds': 0, 'idle_seconds': 0,
+                            'keystrokes': 0, 'mouse_events': 0, 'scroll_events': 0
+                        })
+                        for key, value in zip(app, values):
+                            app[key] += value
+            return totals
+        except Exception as e:
+            logger.error(f"Error reading rollup summary: {e}")
+            raise
+
+    def insert_app_usage(self, user_id, app_name, window_title, duration_seconds=0,
+                         keystroke_count=0, mouse_event_count=0, mouse_movement_distance=0,
+                         scroll_events=0, idle_time_seconds=0):
+        """Insert a new app usage record."""
+        try:
+            usage_id = next_id()
+            app_id, title_id = self.intern(app_name, window_title)
+            self._buffer_insert("""
+                INSERT INTO local_app_usage
+                (id, user_id, app_id, title_id, duration_seconds, keystroke_count,
+                 mouse_event_count, mouse_movement_distance, scroll_events,
+                 idle_time_seconds, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (usage_id, user_id, app_id, title_id, duration_seconds, keystroke_count,
+                  mouse_event_count, mouse_movement_distance, scroll_events,
+                  idle_time_seconds, _sqlite_now()))
+            return usage_id
+        except Exception as e:
+            logger.error(f"Error inserting app usage: {e}")
+            raise
+
+    def insert_break(self, user_id, break_type):
+        """Insert a new break, starting now."""
+        try:
+            break_id = next_id()
+            now = _sqlite_now()
+            self._buffer_insert("""
+                INSERT INTO local_breaks (id, user_id, break_type, start_time, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (break_id, user_id, break_type, now, now))
+            return break_id
+        except Exception as e:
+            logger.error(f"Error inserting break: {e}")
+            raise
+
+    def end_break(self, break_id):
+        """Set the end time of a break to now."""
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                conn.execute(
+                    "UPDATE local_breaks SET end_time = ? WHERE id = ?",
+                    (_sqlite_now(), break_id)
+                )
+        except Exception as e:
+            logger.error(f"Error ending break: {e}")
+            raise
+
     def insert_screenshot(self, user_id, time_entry_id, local_file_path):
         """Insert a new screenshot record."""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                screenshot_id = f"ss_{datetime.now().timestamp()}"
-                cursor.execute("""
-                    INSERT INTO local_screenshots 
-                    (id, user_id, time_entry_id, local_file_path)
-                    VALUES (?, ?, ?, ?)
-                """, (screenshot_id, user_id, time_entry_id, local_file_path))
-                return screenshot_id
+            screenshot_id = next_id()
+            self._buffer_insert("""
+                INSERT INTO local_screenshots 
+                (id, user_id, time_entry_id, local_file_path, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (screenshot_id, user_id, time_entry_id, local_file_path, _sqlite_now()))
+            return screenshot_id
         except Exception as e:
             logger.error(f"Error inserting screenshot: {e}")
             raise
 
+    def insert_recording(self, user_id, file_path, file_size=0, duration_seconds=0):
+        """Insert a new screen recording record."""
+        try:
+            recording_id = next_id()
+            self._buffer_insert("""
+                INSERT INTO local_recordings (id, user_id, file_path, file_size, duration_seconds, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (recording_id, user_id, file_path, file_size, duration_seconds, _sqlite_now()))
+            return recording_id
+        except Exception as e:
+            logger.error(f"Error inserting recording: {e}")
+            raise
+
+    def get_recording_count(self, user_id):
+        """Get the number of recordings kept for a user."""
+        self.flush()
+        with self.get_connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM local_recordings WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def delete_old_recordings(self, user_id, keep):
+        """Delete a user's recordings, rows and files, beyond the newest keep. Returns the number deleted."""
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                old = conn.execute("""
+                    SELECT id, file_path FROM local_recordings WHERE user_id = ?
+                    ORDER BY id DESC LIMIT -1 OFFSET ?
+                """, (user_id, keep)).fetchall()
+                for i in range(0, len(old), MARK_SYNCED_CHUNK):
+                    chunk = [row[0] for row in old[i:i + MARK_SYNCED_CHUNK]]
+                    conn.execute(
+                        f"DELETE FROM local_recordings WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    )
+            for _, file_path in old:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            return len(old)
+        except Exception as e:
+            logger.error(f"Error deleting old recordings: {e}")
+            raise
+
+    def get_unsynced_screenshots_for_user(self, user_id, limit=None):
+        """Get a user's screenshots whose file has not been uploaded yet, oldest first."""
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                return fetch_pending_screenshots(conn, user_id, limit)
+        except Exception as e:
+            logger.error(f"Error getting unsynced screenshots: {e}")
+            raise
+
+    def update_screenshot_sync_details(self, screenshot_id, storage_path):
+        """Record where a screenshot's file was uploaded.
+
+        If the screenshot's row was already synced without the path, it is
+        queued again (and the table's watermark reset) so the upsert sends it.
+        """
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    "SELECT is_synced FROM local_screenshots WHERE id = ?", (screenshot_id,)
+                ).fetchone()
+                if row is None:
+                    return False
+                conn.execute(
+                    "UPDATE local_screenshots SET storage_path = ?, "
+                    "is_synced = CASE is_synced WHEN 1 THEN 0 ELSE is_synced END WHERE id = ?",
+                    (storage_path, screenshot_id)
+                )
+                if row[0] == 1:
+                    conn.execute("DELETE FROM local_settings WHERE key = ?", ("sync_watermark.local_screenshots",))
+                return True
+        except Exception as e:
+            logger.error(f"Error updating screenshot sync details: {e}")
+            raise
+
+    def delete_screenshot_record_and_file(self, screenshot_id, local_file_path=None):
+        """Delete a screenshot row and, if given, its local file."""
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                conn.execute("DELETE FROM local_screenshots WHERE id = ?", (screenshot_id,))
+            if local_file_path and os.path.exists(local_file_path):
+                os.remove(local_file_path)
+        except Exception as e:
+            logger.error(f"Error deleting screenshot: {e}")
+            raise
+
     def get_unsynced_data(self):
         """Get all unsynced data for synchronization."""
         try:
+            self.flush()
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -157,7 +681,7 @@ class SQLiteManager:
                 time_entries = cursor.fetchall()
                 
                 # Get unsynced activity logs
-                cursor.execute("SELECT * FROM local_activity_logs WHERE is_synced = 0")
+                cursor.execute("SELECT * FROM local_activity_logs_view WHERE is_synced = 0")
                 activity_logs = cursor.fetchall()
                 
                 # Get unsynced screenshots
@@ -173,20 +697,193 @@ class SQLiteManager:
             logger.error(f"Error getting unsynced data: {e}")
             raise
 
-    def mark_as_synced(self, table_name, record_id):
-        """Mark a record as synced."""
+    def iter_unsynced(self, table_name, batch_size=100):
+        """Yield unsynced rows of a sync table as lists of dicts, oldest first.
+
+        Rows are paged by id (ids are time-ordered), starting after the
+        table's sync watermark unless an unsynced row lies behind it (see
+        unsynced_start), so only one batch is in memory at a time and no
+        cursor is held open between batches. The is_synced column is
+        left out of the yielded dicts, which are ready to send as-is.
+        """
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        if table_name not in SYNC_TABLES.values():
+            raise ValueError(f"Unknown sync table: {table_name}")
+        self.flush()
+        watermark = self.get_sync_watermark(table_name)
+        with self.get_connection() as conn:
+            key = unsynced_start(conn, table_name, watermark)
+        while True:
+            try:
+                with self.get_connection() as conn:
+                    batch = fetch_unsynced_page(conn, table_name, key, batch_size)
+            except Exception as e:
+                logger.error(f"Error reading unsynced rows from {table_name}: {e}")
+                raise
+            if not batch:
+                return
+            key = batch[-1]['id']
+            yield batch
+            if len(batch) < batch_size:
+                return
+
+    def get_sync_watermark(self, table_name):
+        """Get the id up to which a sync table is fully synced, or None."""
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        value = self.get_setting(f"sync_watermark.{table_name}")
+        return json.loads(value) if value else None
+
+    def set_sync_watermark(self, table_name, record_id):
+        """Record that every row of a sync table up to and including record_id is synced."""
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        self.set_setting(f"sync_watermark.{table_name}", json.dumps(record_id))
+
+    def get_unsynced_counts(self):
+        """Get the number of unsynced rows per remote sync table."""
         try:
+            self.flush()
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"""
-                    UPDATE {table_name}
-                    SET is_synced = 1
-                    WHERE id = ?
-                """, (record_id,))
+                return {
+                    remote: conn.execute(
+                        f"SELECT COUNT(*) FROM {local} WHERE is_synced = 0"
+                    ).fetchone()[0]
+                    for remote, local in SYNC_TABLES.items()
+                }
+        except Exception as e:
+            logger.error(f"Error counting unsynced data: {e}")
+            raise
+
+    def mark_as_synced(self, table_name, record_ids):
+        """Mark one record id or a list of ids as synced in a single transaction.
+
+        table_name may be a local table or a remote name from SYNC_TABLES.
+        Returns the number of rows updated.
+        """
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        if table_name not in SYNC_TABLES.values():
+            raise ValueError(f"Unknown sync table: {table_name}")
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                updated = bulk_mark_synced(conn, table_name, record_ids)
+                if conn.execute(
+                    "SELECT 1 FROM sync_retries WHERE table_name = ? LIMIT 1", (table_name,)
+                ).fetchone():
+                    ids = [record_ids] if isinstance(record_ids, int) else list(record_ids)
+                    for i in range(0, len(ids), MARK_SYNCED_CHUNK):
+                        chunk = ids[i:i + MARK_SYNCED_CHUNK]
+                        conn.execute(
+                            f"DELETE FROM sync_retries WHERE table_name = ? "
+                            f"AND record_id IN ({','.join('?' * len(chunk))})",
+                            [table_name] + chunk
+                        )
+                return updated
         except Exception as e:
             logger.error(f"Error marking record as synced: {e}")
             raise
 
+    def record_sync_failure(self, table_name, records, error, permanent=False,
+                            max_attempts=5, base_delay=60, max_delay=3600):
+        """Schedule the retry of records (row dicts) whose upload failed.
+
+        Each record's attempt count goes up and its next attempt is pushed
+        back exponentially, from base_delay up to max_delay seconds. A
+        permanent failure (the server rejected the row itself) at
+        max_attempts or more moves the record to sync_dead_letters and sets
+        its is_synced to DEAD_LETTER. Returns the ids of dead-lettered records.
+        """
+        table_name = SYNC_TABLES.get(table_name, table_name)
+        if table_name not in SYNC_TABLES.values():
+            raise ValueError(f"Unknown sync table: {table_name}")
+        now = datetime.utcnow()
+        dead = []
+        try:
+            self.flush()
+            with self.get_connection() as conn:
+                for record in records:
+                    row = conn.execute(
+                        "SELECT attempts FROM sync_retries WHERE table_name = ? AND record_id = ?",
+                        (table_name, record['id'])
+                    ).fetchone()
+                    attempts = (row[0] if row else 0) + 1
+                    if permanent and attempts >= max_attempts:
+                        conn.execute("""
+                            INSERT OR REPLACE INTO sync_dead_letters
+                            (table_name, record_id, payload, error, attempts, failed_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        """, (table_name, record['id'], json.dumps(record, default=str), error,
+                              attempts, now.strftime('%Y-%m-%d %H:%M:%S')))
+                        conn.execute(f"UPDATE {table_name} SET is_synced = ? WHERE id = ?",
+                                     (DEAD_LETTER, record['id']))
+                        conn.execute("DELETE FROM sync_retries WHERE table_name = ? AND record_id = ?",
+                                     (table_name, record['id']))
+                        dead.append(record['id'])
+                        continue
+                    delay = min(max_delay, base_delay * 2 ** (attempts - 1))
+                    conn.execute("""
+                        INSERT INTO sync_retries (table_name, record_id, attempts, next_attempt_at, last_error)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (table_name, record_id) DO UPDATE SET
+                            attempts = excluded.attempts,
+                            next_attempt_at = excluded.next_attempt_at,
+                            last_error = excluded.last_error
+                    """, (table_name, record['id'], attempts,
+                          (now + timedelta(seconds=delay)).strftime('%Y-%m-%d %H:%M:%S'), error))
+            if dead:
+                logger.warning(f"Moved {len(dead)} records of {table_name} to the dead-letter table")
+            return dead
+        except Exception as e:
+            logger.error(f"Error recording sync failure: {e}")
+            raise
+
+    def get_dead_letters(self, table_name=None, limit=100):
+        """Get dead-lettered records, newest first, with their payload decoded."""
+        sql = "SELECT table_name, record_id, payload, error, attempts, failed_at FROM sync_dead_letters"
+        params = ()
+        if table_name:
+            sql += " WHERE table_name = ?"
+            params = (SYNC_TABLES.get(table_name, table_name),)
+        with self.get_connection() as conn:
+            rows = conn.execute(sql + " ORDER BY failed_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [
+            {'table_name': table, 'record_id': record_id, 'payload': json.loads(payload),
+             'error': error, 'attempts': attempts, 'failed_at': failed_at}
+            for table, record_id, payload, error, attempts, failed_at in rows
+        ]
+
+    def requeue_dead_letters(self, table_name=None):
+        """Put dead-lettered records back in the outbox. Returns the number requeued.
+
+        The sync watermark of each affected table is reset, since requeued
+        rows may lie behind it.
+        """
+        tables = [SYNC_TABLES.get(table_name, table_name)] if table_name else list(SYNC_TABLES.values())
+        requeued = 0
+        try:
+            with self.get_connection() as conn:
+                for table in tables:
+                    count = conn.execute(f"""
+                        UPDATE {table} SET is_synced = 0 WHERE is_synced = ? AND id IN (
+                            SELECT record_id FROM sync_dead_letters WHERE table_name = ?
+                        )
+                    """, (DEAD_LETTER, table)).rowcount
+                    conn.execute("DELETE FROM sync_dead_letters WHERE table_name = ?", (table,))
+                    if count:
+                        conn.execute("DELETE FROM local_settings WHERE key = ?", (f"sync_watermark.{table}",))
+                    requeued += count
+            return requeued
+        except Exception as e:
+            logger.error(f"Error requeueing dead letters: {e}")
+            raise
+
+    def get_retry_counts(self):
+        """Get the number of records waiting for a retry and in the dead-letter table."""
+        with self.get_connection() as conn:
+            return {
+                'retrying': conn.execute("SELECT COUNT(*) FROM sync_retries").fetchone()[0],
+                'dead_letters': conn.execute("SELECT COUNT(*) FROM sync_dead_letters").fetchone()[0],
+            }
+
     def get_setting(self, key):
         """Get a setting value."""
         try:
@@ -210,4 +907,16 @@ class SQLiteManager:
                 """, (key, value))
         except Exception as e:
             logger.error(f"Error setting setting: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+_engines = {}
+_engines_lock = RLock()
+
+def get_engine(db_path="workmatrix.db"):
+    """Get the process-wide SQLiteManager for a database file, creating it on first use."""
+    key = os.path.abspath(db_path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = SQLiteManager(db_path)
+        return engine
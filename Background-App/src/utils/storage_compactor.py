@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timedelta
+
+from .partitions import ARCHIVE_CONDITIONS
+from .sqlite_manager import SYNC_TABLES
+
+logger = logging.getLogger(__name__)
+
+class StorageCompactor:
+    """Deletes synced rows past retention and returns the freed pages to the OS.
+
+    Rows are deleted ``chunk_size`` at a time, each chunk in its own short
+    transaction. compact_async() submits every chunk, the one-time switch to
+    incremental auto-vacuum and the final incremental vacuum as separate
+    jobs to the AsyncStorage writer, so inserts queued by the monitor run
+    between them; compact() runs the same steps back to back.
+    """
+
+    def __init__(self, sqlite, retention_days=30, chunk_size=500, tables=None):
+        self.sqlite = sqlite
+        self.retention_days = retention_days
+        self.chunk_size = chunk_size
+        self.tables = tuple(tables or SYNC_TABLES.values())
+        self._incremental_checked = False
+
+    def _cutoff(self, now):
+        now = now or datetime.utcnow()
+        return (now - timedelta(days=self.retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+    def compact(self, now=None):
+        """Run one compaction pass and return what it did.
+
+        The result has the rows deleted per table and the bytes reclaimed
+        from the database file.
+        """
+        cutoff = self._cutoff(now)
+        try:
+            if not self._incremental_checked:
+                self.sqlite.enable_incremental_vacuum()
+                self._incremental_checked = True
+
+            deleted = {}
+            for table in self.tables:
+                deleted[table] = 0
+                while True:
+                    count = self.delete_chunk(table, cutoff)
+                    deleted[table] += count
+                    if count < self.chunk_size:
+                        break
+            return self._finish(deleted, self.sqlite.incremental_vacuum())
+        except Exception as e:
+            logger.error(f"Error compacting local database: {e}")
+            raise
+
+    async def compact_async(self, storage, now=None):
+        """Run one compaction pass on an AsyncStorage writer, one job per step."""
+        cutoff = self._cutoff(now)
+        try:
+            if not self._incremental_checked:
+                await storage.write(self.sqlite.enable_incremental_vacuum)
+                self._incremental_checked = True
+
+            deleted = {}
+            for table in self.tables:
+                deleted[table] = 0
+                while True:
+                    count = await storage.write(self.delete_chunk, table, cutoff)
+                    deleted[table] += count
+                    if count < self.chunk_size:
+                        break
+            return self._finish(deleted, await storage.write(self.sqlite.incremental_vacuum))
+        except Exception as e:
+            logger.error(f"Error compacting local database: {e}")
+            raise
+
+    def _finish(self, deleted, reclaimed):
+        if any(deleted.values()) or reclaimed:
+            logger.info(f"Compacted local database: deleted {deleted}, reclaimed {reclaimed} bytes")
+        return {'deleted': deleted, 'reclaimed_bytes': reclaimed}
+
+    def delete_chunk(self, table, cutoff):
+        """Delete up to chunk_size synced rows of table created before cutoff, in one transaction.
+
+        Rows must also meet the table's ARCHIVE_CONDITIONS, e.g. screenshots
+        whose file is not uploaded yet are kept.
+        """
+        condition = ARCHIVE_CONDITIONS.get(table)
+        with self.sqlite.get_connection() as conn:
+            return conn.execute(f"""
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table}
+                    WHERE is_synced = 1 AND created_at < ?{f" AND {condition}" if condition else ""}
+                    LIMIT ?
+                )
+            """, (cutoff, self.chunk_size)).rowcount
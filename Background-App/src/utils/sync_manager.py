@@ -1,29 +1,92 @@
 import asyncio
+import gzip
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 import aiohttp
-from .sqlite_manager import SQLiteManager
-import backoff
+from .sqlite_manager import SQLiteManager, SYNC_TABLES
+from .async_storage import AsyncStorage
+from .batch_sizer import AdaptiveBatchSizer, SHRINK_STATUSES
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Connection pool for the shared Supabase session
+HTTP_POOL_LIMIT = 8
+HTTP_POOL_LIMIT_PER_HOST = 4
+DNS_CACHE_TTL = 300  # seconds
+KEEPALIVE_TIMEOUT = 60  # seconds
+REQUEST_TIMEOUT = 30  # seconds
+
+# Batches of one table that may be queued or uploading at once
+TABLE_CONCURRENCY = 2
+
+# Per-record retries: exponential delay between attempts, and the number of
+# times the server may reject a record before it is dead-lettered
+RETRY_BASE_DELAY = 60  # seconds
+RETRY_MAX_DELAY = 3600  # seconds
+MAX_SYNC_ATTEMPTS = 5
+
+# 4xx statuses that blame the rows in the request rather than the request itself
+REJECT_STATUSES = {400, 409, 422}
+
+class SyncRejected(Exception):
+    """The server rejected a batch because of its contents (400, 409 or 422)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Sync rejected ({status}): {message}")
+        self.status = status
+
+class SyncAborted(Exception):
+    """The server refused the request itself (e.g. 401, 403, 404); no batch can succeed."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Sync aborted ({status}): {message}")
+        self.status = status
+
+def encode_json(payload: Any) -> bytes:
+    """Serialize a request body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, separators=(',', ':'), default=str).encode()
+
 class SyncManager:
     def __init__(self, 
                  supabase_url: str, 
                  supabase_key: str, 
                  sqlite: SQLiteManager,
                  max_batch_size: int = 100,
-                 sync_interval: int = 300):  # 5 minutes default
+                 sync_interval: int = 300,  # 5 minutes default
+                 storage: Optional[AsyncStorage] = None,
+                 compress_requests: bool = False,
+                 compress_min_bytes: int = 1024,
+                 upload_workers: int = 4,
+                 table_concurrency: Optional[Dict[str, int]] = None,
+                 max_rows_per_request: int = 1000):
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
         self.sqlite = sqlite
+        self.storage = storage or AsyncStorage(sqlite)
         self.max_batch_size = max_batch_size
         self.sync_interval = sync_interval
         self._running = False
         self._last_sync = datetime.min
         self._sync_lock = asyncio.Lock()
+        # Gzip request bodies of at least compress_min_bytes; the endpoint
+        # (or the gateway in front of it) must accept Content-Encoding: gzip
+        self.compress_requests = compress_requests
+        self.compress_min_bytes = compress_min_bytes
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.upload_workers = upload_workers
+        self.table_concurrency = table_concurrency or {}
+        # Rows per request adapt per table, starting from max_batch_size
+        self.max_rows_per_request = max_rows_per_request
+        self.batch_sizers: Dict[str, AdaptiveBatchSizer] = {}
         self._headers = {
             'apikey': supabase_key,
             'Authorization': f'Bearer {supabase_key}',
@@ -45,29 +108,54 @@ class SyncManager:
         """Stop the sync loop."""
         self._running = False
 
-    @backoff.on_exception(backoff.expo,
-                         (aiohttp.ClientError, asyncio.TimeoutError),
-                         max_tries=5)
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the long-lived HTTP session, creating it on first use.
+
+        Connections are kept alive and reused across batches and syncs, so
+        only the first request to Supabase pays for the TCP and TLS handshake.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self._headers,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _encode_body(self, payload: Any) -> tuple:
+        """Get the request body and any extra headers for a JSON payload."""
+        body = encode_json(payload)
+        if self.compress_requests and len(body) >= self.compress_min_bytes:
+            return gzip.compress(body, compresslevel=5), {'Content-Encoding': 'gzip'}
+        return body, {}
+
     async def sync_data(self):
-        """Sync data with Supabase with retries and batching."""
+        """Sync data with Supabase in batches.
+
+        Failures do not retry the pass: failed records get their own retry
+        schedule in SQLite (see _post_records) and the rest keep flowing.
+        """
         async with self._sync_lock:  # Prevent concurrent syncs
             try:
                 current_time = datetime.now()
-                
-                # Get unsynced data from SQLite
-                unsynced_data = await self._get_unsynced_data()
-                if not unsynced_data:
+                synced = await self._upload(list(SYNC_TABLES))
+
+                if not synced:
                     logger.debug("No data to sync")
                     return
 
-                # Process data in batches
-                for batch in self._create_batches(unsynced_data):
-                    try:
-                        await self._sync_batch(batch)
-                    except Exception as e:
-                        logger.error(f"Error syncing batch: {e}")
-                        continue
-
                 self._last_sync = current_time
                 logger.info(f"Sync completed successfully at {current_time}")
 
@@ -75,58 +163,162 @@ class SyncManager:
                 logger.error(f"Error in sync_data: {e}")
                 raise
 
-    async def _get_unsynced_data(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Get all unsynced data from SQLite."""
+    def _batch_sizer(self, table: str) -> AdaptiveBatchSizer:
+        sizer = self.batch_sizers.get(table)
+        if sizer is None:
+            sizer = self.batch_sizers[table] = AdaptiveBatchSizer(
+                initial=self.max_batch_size,
+                min_size=min(10, self.max_batch_size),
+                max_size=self.max_rows_per_request,
+                target_seconds=REQUEST_TIMEOUT / 10
+            )
+        return sizer
+
+    async def _upload(self, tables: List[str]) -> int:
+        """Upload the unsynced rows of tables through a producer/worker pipeline.
+
+        One producer per table pages batches out of SQLite, sized by the
+        table's AdaptiveBatchSizer at the time each page is read, into a shared
+        queue while ``upload_workers`` workers post them concurrently. Each
+        table has at most ``table_concurrency[table]`` batches queued or in
+        flight, which bounds memory and keeps one table from starving the
+        others. Records waiting for a retry are left out of their page.
+        Results are acknowledged in batch order per table (see _TableAcks).
+        Returns the number of records sent successfully.
+
+        A SyncAborted from any batch stops the pass: no more pages are read,
+        queued batches are dropped without a retry being recorded, and the
+        error is raised once the queue has drained.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = {
+            table: asyncio.Semaphore(self.table_concurrency.get(table, TABLE_CONCURRENCY))
+            for table in tables
+        }
+        acks = {table: _TableAcks(self.storage, table) for table in tables}
+        aborted: List[SyncAborted] = []
+
+        async def produce(table):
+            sizer = self._batch_sizer(table)
+            # Pages up to the first deferred record are whole: none of their
+            # records were left out, so the watermark may move past them
+            first_deferred = await self.storage.get_first_deferred_id(table)
+            pages = self.storage.iter_unsynced(table, lambda: sizer.size, skip_deferred=True).__aiter__()
+            seq = 0
+            while not aborted:
+                # Take the slot before reading, so the page is sized from
+                # the latest results and is not held while waiting
+                await slots[table].acquire()
+                try:
+                    records = await pages.__anext__()
+                except StopAsyncIteration:
+                    slots[table].release()
+                    return
+                except BaseException:
+                    slots[table].release()
+                    raise
+                if aborted:
+                    slots[table].release()
+                    return
+                whole = first_deferred is None or records[-1]['id'] < first_deferred
+                await queue.put((table, seq, records, whole))
+                seq += 1
+
+        async def work():
+            while True:
+                table, seq, records, whole = await queue.get()
+                try:
+                    if not aborted:
+                        sent, failures = await self._post_records(table, records) if records else ([], [])
+                        await acks[table].complete(seq, sent, failures, whole)
+                except SyncAborted as e:
+                    aborted.append(e)
+                finally:
+                    slots[table].release()
+                    queue.task_done()
+
+        producers = [asyncio.create_task(produce(table)) for table in tables]
+        workers = [asyncio.create_task(work()) for _ in range(max(1, self.upload_workers))]
         try:
-            return {
-                'activities': self.sqlite.get_unsynced_activities(),
-                'screenshots': self.sqlite.get_unsynced_screenshots(),
-                'time_entries': self.sqlite.get_unsynced_time_entries()
-            }
+            await asyncio.gather(*producers)
+            await queue.join()
+        finally:
+            for task in producers + workers:
+                task.cancel()
+            await asyncio.gather(*producers, *workers, return_exceptions=True)
+        if aborted:
+            raise aborted[0]
+        return sum(ack.synced for ack in acks.values())
+
+    async def _post_records(self, table: str, records: List[dict]) -> tuple:
+        """Post records, isolating the ones the server rejects.
+
+        A rejected batch is split in half and each half posted again, down
+        to single records, so one bad row does not hold back the rest.
+        Returns (sent records, failures), where each failure is (records,
+        error, permanent): permanent for a rejected record, otherwise a
+        transient error (timeout, 5xx, network) for the whole batch.
+        SyncAborted is raised as is; it says nothing about the records.
+        """
+        try:
+            await self._sync_batch({'table': table, 'records': records})
+            return records, []
+        except SyncRejected as e:
+            if len(records) == 1:
+                return [], [(records, str(e), True)]
+            middle = len(records) // 2
+            first_sent, first_failed = await self._post_records(table, records[:middle])
+            rest_sent, rest_failed = await self._post_records(table, records[middle:])
+            return first_sent + rest_sent, first_failed + rest_failed
+        except SyncAborted:
+            raise
         except Exception as e:
-            logger.error(f"Error getting unsynced data: {e}")
-            return {}
-
-    def _create_batches(self, data: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
-        """Split data into manageable batches."""
-        batches = []
-        for table, records in data.items():
-            for i in range(0, len(records), self.max_batch_size):
-                batch = records[i:i + self.max_batch_size]
-                batches.append({
-                    'table': table,
-                    'records': batch
-                })
-        return batches
+            logger.error(f"Error syncing batch: {e}")
+            return [], [(records, str(e), False)]
 
     async def _sync_batch(self, batch: Dict[str, Any]):
-        """Sync a single batch of data to Supabase."""
+        """Upsert a single batch of data into Supabase; raises if it was not accepted.
+
+        Rows are upserted on their id, so resending a batch that was
+        partially applied (or applied but not acknowledged) updates the
+        remote rows instead of duplicating them.
+        """
         table = batch['table']
         records = batch['records']
         
         if not records:
             return
 
+        sizer = self._batch_sizer(table)
+        body, headers = self._encode_body([self.sqlite.to_remote(r) for r in records])
+        started = time.monotonic()
         try:
-            async with aiohttp.ClientSession() as session:
-                endpoint = f"{self.supabase_url}/rest/v1/{table}"
-                async with session.post(endpoint,
-                                     headers=self._headers,
-                                     json=records,
-                                     timeout=30) as response:
-                    if response.status == 201:
-                        # Update sync status in SQLite
-                        record_ids = [r['id'] for r in records]
-                        self.sqlite.mark_as_synced(table, record_ids)
-                        logger.info(f"Successfully synced {len(records)} records to {table}")
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Error syncing to {table}: {response.status} - {error_text}")
-                        raise Exception(f"Sync failed: {error_text}")
+            endpoint = f"{self.supabase_url}/rest/v1/{table}"
+            headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+            async with self._get_session().post(endpoint, data=body, headers=headers,
+                                                params={'on_conflict': 'id'}) as response:
+                status = response.status
+                if status not in (200, 201, 204):
+                    error_text = await response.text()
+                sizer.record(len(records), time.monotonic() - started, len(body), status=status)
+                if status in (200, 201, 204):
+                    logger.info(f"Successfully synced {len(records)} records to {table}")
+                elif status in REJECT_STATUSES:
+                    logger.error(f"Supabase rejected {len(records)} records of {table}: {status} - {error_text}")
+                    raise SyncRejected(status, error_text)
+                elif 400 <= status < 500 and status not in SHRINK_STATUSES:
+                    logger.error(f"Supabase refused sync to {table}: {status} - {error_text}")
+                    raise SyncAborted(status, error_text)
+                else:
+                    logger.error(f"Error syncing to {table}: {status} - {error_text}")
+                    raise Exception(f"Sync failed: {error_text}")
 
         except asyncio.TimeoutError:
+            sizer.record(len(records), time.monotonic() - started, len(body), timed_out=True)
             logger.error(f"Timeout while syncing to {table}")
             raise
+        except (SyncRejected, SyncAborted):
+            raise
         except Exception as e:
             logger.error(f"Error in _sync_batch for {table}: {e}")
             raise
@@ -139,10 +331,57 @@ class SyncManager:
             logger.error(f"Error in force sync: {e}")
             raise
 
-    def get_sync_status(self) -> dict:
-        """Get current sync status."""
+    async def get_sync_status(self) -> dict:
+        """Get current sync status; the counts are read on the storage read pool."""
         return {
             'last_sync': self._last_sync.isoformat() if self._last_sync else None,
             'is_running': self._running,
-            'unsynced_count': self.sqlite.get_unsynced_counts()
-        } 
\ No newline at end of file
+            'unsynced_count': await self.storage.get_unsynced_counts(),
+            'retries': await self.storage.get_retry_counts(),
+            'batch_sizes': {table: sizer.get_stats() for table, sizer in self.batch_sizers.items()}
+        }
+
+class _TableAcks:
+    """Applies one table's upload results in batch order.
+
+    Batches can finish out of order; a result is held until every earlier
+    batch of the pass has been applied. Sent records are marked as synced
+    and failed ones get a retry scheduled. The sync watermark follows the
+    batches until the first one that was not sent whole.
+    """
+
+    def __init__(self, storage: AsyncStorage, table: str):
+        self.storage = storage
+        self.table = table
+        self.synced = 0
+        self._next = 0
+        self._done: Dict[int, tuple] = {}
+        self._contiguous = True
+        self._lock = asyncio.Lock()
+
+    async def complete(self, seq: int, sent: List[dict], failures: List[tuple], whole: bool = True):
+        """Record the result of batch seq; whole is False if records were left out of it."""
+        async with self._lock:
+            self._done[seq] = (sent, failures, whole)
+            while self._next in self._done:
+                sent, failures, whole = self._done.pop(self._next)
+                self._next += 1
+                if not await self._apply(sent, failures, whole) or failures or not whole:
+                    self._contiguous = False
+
+    async def _apply(self, sent: List[dict], failures: List[tuple], whole: bool) -> bool:
+        try:
+            if sent:
+                await self.storage.mark_as_synced(self.table, [r['id'] for r in sent])
+                self.synced += len(sent)
+            for records, error, permanent in failures:
+                await self.storage.record_sync_failure(
+                    self.table, records, error, permanent=permanent,
+                    max_attempts=MAX_SYNC_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY
+                )
+            if self._contiguous and whole and sent and not failures:
+                await self.storage.set_sync_watermark(self.table, sent[-1]['id'])
+            return True
+        except Exception as e:
+            logger.error(f"Error acknowledging batch of {self.table}: {e}")
+            return False
@@ -0,0 +1,76 @@
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+
+class WriteBuffer:
+    """Write-behind buffer of pending INSERT rows, grouped by statement.
+
+    Rows are held in memory until ``max_rows`` are pending or the oldest row
+    is ``max_delay_ms`` old, then the owner flushes them with one
+    ``executemany`` per statement inside a single transaction. At most
+    ``max_delay_ms`` of writes (plus one flush interval of the owner's
+    timer) are exposed to a crash.
+    """
+
+    def __init__(self, max_rows: int = 500, max_delay_ms: int = 1000):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self._pending: Dict[str, List[tuple]] = {}
+        self._count = 0
+        self._oldest: Optional[float] = None
+        # After a failed flush, the buffer is not due again before this time
+        self._hold_until = 0.0
+        self._lock = Lock()
+
+    def add(self, sql: str, params: tuple) -> bool:
+        """Queue a row. Returns True if the buffer should be flushed now."""
+        with self._lock:
+            rows = self._pending.get(sql)
+            if rows is None:
+                rows = self._pending[sql] = []
+            rows.append(params)
+            self._count += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            return self._is_due()
+
+    def _is_due(self) -> bool:
+        if not self._count or time.monotonic() < self._hold_until:
+            return False
+        return self._count >= self.max_rows or time.monotonic() - self._oldest >= self.max_delay
+
+    def due(self) -> bool:
+        """Whether the buffer has reached its row or age limit."""
+        with self._lock:
+            return self._is_due()
+
+    def take(self) -> Dict[str, List[tuple]]:
+        """Remove and return all pending rows, keyed by statement."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._count = 0
+            self._oldest = None
+            self._hold_until = 0.0
+            return pending
+
+    def restore(self, pending: Dict[str, List[tuple]]):
+        """Put rows from take() back ahead of any added since, e.g. after a failed flush.
+
+        The buffer is not due again for ``max_delay_ms``, so inserts don't
+        retry a failing flush on every row; explicit flushes still do.
+        """
+        with self._lock:
+            restored = 0
+            for sql, rows in pending.items():
+                self._pending[sql] = list(rows) + self._pending.get(sql, [])
+                restored += len(rows)
+            if not restored:
+                return
+            now = time.monotonic()
+            self._count += restored
+            self._oldest = now if self._oldest is None else min(self._oldest, now)
+            self._hold_until = now + self.max_delay
+
+    def __len__(self) -> int:
+        return self._count
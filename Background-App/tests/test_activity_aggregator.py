@@ -0,0 +1,32 @@
+import pytest
+from ..src.utils.activity_aggregator import ActivityAggregator
+
+def test_counts_are_rolled_up_per_window_and_app():
+    """Test that input is summed into one row per window and app."""
+    aggregator = ActivityAggregator(window_seconds=60)
+    aggregator.set_active_app('editor', 'main.py')
+    for _ in range(100):
+        aggregator.add_keystrokes(now=1200.0)
+    aggregator.add_mouse_events(3, now=1210.0)
+    aggregator.set_active_app('browser', 'docs')
+    aggregator.add_keystrokes(5, now=1230.0)
+
+    # Window still open: nothing to emit yet
+    assert aggregator.flush(now=1259.0) == []
+
+    rows = aggregator.flush(now=1260.0)
+    by_app = {row['app_name']: row for row in rows}
+    assert len(rows) == 2
+    assert by_app['editor']['keystroke_count'] == 100
+    assert by_app['editor']['mouse_events'] == 3
+    assert by_app['browser']['keystroke_count'] == 5
+
+def test_force_flush_emits_open_window():
+    """Test that a forced flush closes the current window."""
+    aggregator = ActivityAggregator(window_seconds=60)
+    aggregator.add_mouse_events(now=1200.0)
+
+    rows = aggregator.flush(force=True)
+    assert len(rows) == 1
+    assert rows[0]['mouse_events'] == 1
+    assert aggregator.flush(force=True) == []
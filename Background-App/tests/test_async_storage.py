@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+
+import pytest
+from ..src.utils.async_storage import AsyncStorage
+
+@pytest.mark.asyncio
+async def test_writes_run_on_writer_thread(sqlite_manager):
+    """Test that writes run in order on one thread other than the loop's."""
+    storage = AsyncStorage(sqlite_manager)
+    threads = []
+
+    def record(value):
+        threads.append(threading.current_thread().name)
+        return value
+
+    try:
+        results = [await storage.write(record, i) for i in range(3)]
+        assert results == [0, 1, 2]
+        assert set(threads) == {"sqlite-writer"}
+
+        entry_id = await storage.insert_time_entry('user-1')
+        await storage.flush()
+        rows = await storage.fetchall("SELECT user_id FROM local_time_entries WHERE id = ?", (entry_id,))
+        assert rows == [('user-1',)]
+    finally:
+        storage.close()
+
+@pytest.mark.asyncio
+async def test_reads_are_read_only(sqlite_manager):
+    """Test that the reader connections cannot write."""
+    storage = AsyncStorage(sqlite_manager)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            await storage.fetchall("DELETE FROM local_screenshots")
+    finally:
+        storage.close()
+
+@pytest.mark.asyncio
+async def test_iter_unsynced_pages_in_batches(sqlite_manager):
+    """Test that iter_unsynced pages buffered inserts from the watermark."""
+    storage = AsyncStorage(sqlite_manager)
+    try:
+        for i in range(5):
+            await storage.insert_screenshot('user-1', None, f'/tmp/{i}.jpg')
+        batches = [batch async for batch in storage.iter_unsynced('screenshots', 2)]
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+
+        await storage.mark_as_synced('screenshots', [r['id'] for r in batches[0]])
+        await storage.set_sync_watermark('screenshots', batches[0][-1]['id'])
+        rest = [batch async for batch in storage.iter_unsynced('screenshots', 10)]
+        assert [r['id'] for r in rest[0]] == [r['id'] for batch in batches[1:] for r in batch]
+
+        # A row that sorts below the watermark is not skipped
+        sql = """INSERT INTO local_screenshots (id, user_id, local_file_path)
+                 VALUES (?, 'user-1', '/tmp/old.jpg')"""
+        with sqlite_manager.get_connection() as conn:
+            conn.execute(sql, (batches[0][0]['id'] - 1,))
+        rest = [batch async for batch in storage.iter_unsynced('screenshots', 10)]
+        assert len(rest[0]) == (await storage.get_unsynced_counts())['screenshots'] == 4
+    finally:
+        storage.close()
+
+@pytest.mark.asyncio
+async def test_pending_screenshots_are_read_on_the_pool(sqlite_manager):
+    """Test that pending screenshots are read without a writer job for the query."""
+    storage = AsyncStorage(sqlite_manager)
+    jobs = []
+    submit = storage.submit
+
+    def record(func, *args, **kwargs):
+        jobs.append(func.__name__)
+        return submit(func, *args, **kwargs)
+
+    storage.submit = record
+    try:
+        first = await storage.insert_screenshot('user-1', None, '/tmp/a.jpg')
+        await storage.insert_screenshot('user-1', None, '/tmp/b.jpg')
+        await storage.update_screenshot_sync_details(first, 'user-1/a.webp')
+        jobs.clear()
+        pending = await storage.get_pending_screenshots('user-1')
+    finally:
+        storage.close()
+
+    assert [r['local_file_path'] for r in pending] == ['/tmp/b.jpg']
+    assert jobs == ['flush']
+
+@pytest.mark.asyncio
+async def test_close_finishes_queued_writes(sqlite_manager):
+    """Test that close runs queued writes before stopping the writer."""
+    storage = AsyncStorage(sqlite_manager)
+    future = storage.submit(sqlite_manager.insert_time_entry, 'user-1')
+    storage.close()
+    assert future.done()
+    assert storage._writer is None
@@ -0,0 +1,65 @@
+import pytest
+import asyncio
+from ..src.utils.event_manager import EventManager
+from ..src.utils.backpressure import CoalescePolicy, SamplingPolicy, BlockPolicy, create_policy
+
+@pytest.mark.asyncio
+async def test_drop_oldest_counts_evicted_events():
+    """Test that drop-oldest keeps the newest events and counts evictions."""
+    manager = EventManager(max_queue_size=10, backpressure='drop_oldest')
+    for i in range(15):
+        await manager.put_event('mouse', {'x': i})
+    await manager.put_event('window', {'title': 'Editor'})
+
+    stats = manager.get_event_stats()
+    assert stats['queue_size'] == 10
+    assert stats['dropped'] == {'mouse': 6}
+    assert stats['backpressure'] == 'drop_oldest'
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_mouse_moves_and_keeps_window_events():
+    """Test that mouse floods are merged instead of crowding out window events."""
+    manager = EventManager(max_queue_size=10, backpressure=CoalescePolicy(high_water=0.5))
+    for i in range(5):
+        await manager.put_event('keyboard', {'key': i})
+    for i in range(1000):
+        await manager.put_event('mouse', {'x': i})
+    await manager.put_event('window', {'title': 'Editor'})
+
+    stats = manager.get_event_stats()
+    assert stats['queue_size'] == 7
+    assert stats['coalesced'] == {'mouse': 999}
+    assert stats['dropped'] == {}
+
+    events = [manager.event_queue.get_nowait() for _ in range(7)]
+    mouse = [e for e in events if e['type'] == 'mouse']
+    assert mouse[0]['count'] == 1000
+    assert mouse[0]['data'] == {'x': 999}
+    assert events[-1]['type'] == 'window'
+
+@pytest.mark.asyncio
+async def test_sampling_drops_input_but_not_window_events():
+    """Test that sampling above the high-water mark only thins sampled types."""
+    policy = SamplingPolicy(high_water=0.5, sample_rate=0.0)
+    manager = EventManager(max_queue_size=10, backpressure=policy)
+    for i in range(20):
+        await manager.put_event('keyboard', {'key': i})
+    await manager.put_event('window', {'title': 'Editor'})
+
+    stats = manager.get_event_stats()
+    assert stats['queue_size'] == 6
+    assert stats['dropped'] == {'keyboard': 15}
+
+@pytest.mark.asyncio
+async def test_block_policy_times_out():
+    """Test that blocking gives up after its timeout and counts the drop."""
+    manager = EventManager(max_queue_size=1, backpressure=BlockPolicy(timeout=0.01))
+    await manager.put_event('keyboard', {'key': 'a'})
+    await manager.put_event('keyboard', {'key': 'b'})
+
+    assert manager.get_event_stats()['dropped'] == {'keyboard': 1}
+
+def test_unknown_policy():
+    """Test that an unknown policy name is rejected."""
+    with pytest.raises(ValueError):
+        create_policy('nope')
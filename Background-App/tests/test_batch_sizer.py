@@ -0,0 +1,29 @@
+from ..src.utils.batch_sizer import AdaptiveBatchSizer
+
+def test_full_fast_batches_grow_additively():
+    """Test that fast full batches grow the size by a fixed step, up to the maximum."""
+    sizer = AdaptiveBatchSizer(initial=100, max_size=140, step=25)
+    assert sizer.record(100, 0.2, 10_000, status=201) == 125
+    assert sizer.record(125, 0.2, 10_000, status=201) == 140
+    # A partial batch gives no evidence about bigger ones
+    assert sizer.record(30, 0.1, 1_000, status=201) == 140
+
+def test_failures_shrink_multiplicatively():
+    """Test that timeouts, 413 and 5xx halve the size but other errors do not."""
+    sizer = AdaptiveBatchSizer(initial=400, min_size=10)
+    assert sizer.record(400, 0.5, 10_000, status=413) == 200
+    assert sizer.record(200, 30.0, 10_000, timed_out=True) == 100
+    assert sizer.record(100, 0.5, 10_000, status=503) == 50
+    assert sizer.record(50, 0.5, 10_000, status=401) == 50
+    for _ in range(10):
+        sizer.record(50, 0.5, 10_000, status=500)
+    assert sizer.size == 10
+
+def test_over_budget_scales_to_fit():
+    """Test that a batch over the time or byte budget shrinks in proportion."""
+    sizer = AdaptiveBatchSizer(initial=200, target_seconds=2.0, target_bytes=100_000)
+    assert sizer.record(200, 4.0, 50_000, status=201) == 100
+    assert sizer.record(100, 1.0, 400_000, status=201) == 25
+    history = sizer.get_stats()['history']
+    assert [entry['outcome'] for entry in history] == ['over_budget', 'over_budget']
+    assert (history[-1]['size_before'], history[-1]['size_after']) == (100, 25)
@@ -0,0 +1,49 @@
+import pytest
+import os
+import asyncio
+from ..src.utils.event_manager import EventManager
+from ..src.utils.event_journal import EventRecorder, EventReplayer, read_journal
+
+@pytest.mark.asyncio
+async def test_recorded_events_round_trip(temp_dir, sample_events):
+    """Test that a recorded journal reads back the same events."""
+    path = os.path.join(temp_dir, 'events.wmej')
+    manager = EventManager()
+    recorder = EventRecorder(path)
+    manager.add_tap(recorder.record)
+
+    for event in sample_events:
+        await manager.put_event(event['type'], event['data'])
+    recorder.close()
+
+    records = list(read_journal(path))
+    assert [r[0] for r in records] == ['keyboard', 'mouse', 'window']
+    assert records[2][2] == sample_events[2]['data']
+    assert records[0][1] <= records[1][1] <= records[2][1]
+
+@pytest.mark.asyncio
+async def test_replay_feeds_handlers(temp_dir, sample_events):
+    """Test that a journal replayed at max speed reaches the handlers."""
+    path = os.path.join(temp_dir, 'events.wmej')
+    source = EventManager()
+    recorder = EventRecorder(path)
+    source.add_tap(recorder.record)
+    for _ in range(100):
+        for event in sample_events:
+            await source.put_event(event['type'], event['data'])
+    recorder.close()
+
+    received = []
+    async def handler(event):
+        received.append(event)
+
+    target = EventManager(max_queue_size=1000)
+    target.register_handler('keyboard', handler)
+    task = asyncio.create_task(target.start())
+
+    stats = await EventReplayer(path, speed=None).replay(target)
+    target.stop()
+    await task
+
+    assert stats['events'] == 300
+    assert len(received) == 100
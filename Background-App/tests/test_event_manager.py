@@ -112,4 +112,93 @@ async def test_reset_counts(event_manager, sample_events):
     event_manager.reset_counts()
     stats = event_manager.get_event_stats()
     
-    assert all(count == 0 for count in stats['counts'].values()) 
\ No newline at end of file
+    assert all(count == 0 for count in stats['counts'].values()) 
+
+
+@pytest.mark.asyncio
+async def test_batch_handler(event_manager):
+    """Test that batch handlers receive lists of events."""
+    batches = []
+    async def batch_handler(events):
+        batches.append(events)
+
+    event_manager.register_batch_handler('keyboard', batch_handler, max_batch=10, max_delay_ms=50)
+
+    task = asyncio.create_task(event_manager.start())
+
+    for i in range(25):
+        await event_manager.put_event('keyboard', {'key': i})
+    await asyncio.sleep(0.2)
+
+    event_manager.stop()
+    await task
+
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert batches[0][0]['data'] == {'key': 0}
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_does_not_block_others(event_manager):
+    """Test that a slow handler does not delay other handlers."""
+    fast_events = []
+    release = asyncio.Event()
+
+    async def slow_handler(event):
+        await release.wait()
+
+    async def fast_handler(event):
+        fast_events.append(event)
+
+    event_manager.register_handler('keyboard', slow_handler)
+    event_manager.register_handler('keyboard', fast_handler)
+
+    task = asyncio.create_task(event_manager.start())
+
+    for i in range(5):
+        await event_manager.put_event('keyboard', {'key': i})
+    await asyncio.sleep(0.1)
+
+    assert len(fast_events) == 5
+
+    release.set()
+    event_manager.stop()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_events_are_compact_records(event_manager):
+    """Test that queued events carry a type code and monotonic timestamp."""
+    await event_manager.put_event('keyboard', {'key': 'a'}, t_ns=123)
+    await event_manager.put_event('custom', {'value': 1})
+
+    keyboard_event = event_manager.event_queue.get_nowait()
+    custom_event = event_manager.event_queue.get_nowait()
+
+    assert keyboard_event.t_ns == 123
+    assert keyboard_event.type == keyboard_event['type'] == 'keyboard'
+    assert custom_event.type == 'custom'
+    assert custom_event.type_code != keyboard_event.type_code
+    assert isinstance(custom_event.timestamp, str)
+    assert not hasattr(custom_event, '__dict__')
+
+
+@pytest.mark.asyncio
+async def test_latency_stats(event_manager, sample_events):
+    """Test that queue, handler and end-to-end latencies are recorded per type."""
+    async def handler(event):
+        await asyncio.sleep(0.01)
+
+    event_manager.register_handler('keyboard', handler)
+    task = asyncio.create_task(event_manager.start())
+
+    await event_manager.put_event('keyboard', sample_events[0]['data'])
+    await asyncio.sleep(0.1)
+
+    event_manager.stop()
+    await task
+
+    latency = event_manager.get_event_stats()['latency']['keyboard']
+    assert latency['queue']['count'] == 1
+    assert latency['handler']['count'] == 1
+    assert latency['handler']['max_ms'] >= 10
+    assert latency['end_to_end']['max_ms'] >= latency['handler']['max_ms']
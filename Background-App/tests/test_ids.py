@@ -0,0 +1,38 @@
+import time
+import uuid
+from ..src.utils.ids import ID_EPOCH_MS, NODE_BITS, SEQUENCE_BITS, IdGenerator, id_timestamp_ms, to_uuid
+
+def test_ids_are_unique_and_increasing():
+    """Test that ids from one generator never repeat and sort by creation."""
+    generator = IdGenerator(node=1)
+    ids = [generator.next_id() for _ in range(20000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(0 < record_id < 2 ** 63 for record_id in ids)
+
+def test_nodes_do_not_collide():
+    """Test that generators with different nodes produce different ids."""
+    first = {IdGenerator(node=1).next_id() for _ in range(100)}
+    second = {IdGenerator(node=2).next_id() for _ in range(100)}
+    assert not first & second
+
+def test_id_timestamp_and_uuid_mapping():
+    """Test that ids carry their creation time and map to stable UUIDs."""
+    before = time.time_ns() // 1_000_000
+    record_id = IdGenerator(node=3).next_id()
+    after = time.time_ns() // 1_000_000
+    assert before <= id_timestamp_ms(record_id) <= after
+
+    namespace = uuid.uuid4()
+    assert to_uuid(record_id, namespace) == to_uuid(record_id, namespace)
+    assert to_uuid(record_id, namespace) != to_uuid(record_id, uuid.uuid4())
+
+def test_ids_sort_after_stored_ids():
+    """Test that a generator advanced past an id from the future stays above it."""
+    future_ms = time.time_ns() // 1_000_000 - ID_EPOCH_MS + 3_600_000
+    stored = (future_ms << (NODE_BITS + SEQUENCE_BITS)) | ((1 << NODE_BITS) - 1) << SEQUENCE_BITS | 7
+    generator = IdGenerator(node=0)
+    generator.advance_past(stored)
+    ids = [generator.next_id() for _ in range(5000)]
+    assert ids[0] > stored
+    assert ids == sorted(ids)
@@ -0,0 +1,74 @@
+import pytest
+import asyncio
+import threading
+from ..src.utils.event_manager import EventManager
+from ..src.utils.input_bridge import InputBridge
+
+@pytest.mark.asyncio
+async def test_bridge_forwards_events_from_hook_thread():
+    """Test that events pushed from another thread reach the event queue."""
+    event_manager = EventManager(max_queue_size=10000)
+    bridge = InputBridge(event_manager, capacity=2048, max_batch=64)
+    task = asyncio.create_task(bridge.run())
+    await asyncio.sleep(0)
+
+    def hook_thread():
+        for i in range(500):
+            bridge.push('keyboard', {'key': i})
+
+    thread = threading.Thread(target=hook_thread)
+    thread.start()
+    thread.join()
+    await asyncio.sleep(0.1)
+
+    bridge.stop()
+    await task
+
+    assert bridge.get_stats()['forwarded'] == 500
+    assert event_manager.get_event_stats()['counts']['keyboard'] == 500
+
+@pytest.mark.asyncio
+async def test_bridge_buffers_events_before_start():
+    """Test that events pushed before the drainer starts are not lost."""
+    event_manager = EventManager(max_queue_size=100)
+    bridge = InputBridge(event_manager, capacity=16)
+    bridge.push('mouse', {'x': 1, 'y': 2})
+
+    task = asyncio.create_task(bridge.run())
+    await asyncio.sleep(0.05)
+    bridge.stop()
+    await task
+
+    assert event_manager.event_queue.qsize() == 1
+
+@pytest.mark.asyncio
+async def test_bridge_forwards_buffered_events_on_shutdown():
+    """Test that events still in the ring buffer are forwarded when the drainer is cancelled."""
+    event_manager = EventManager(max_queue_size=1000)
+    bridge = InputBridge(event_manager, capacity=1024, max_batch=16)
+    task = asyncio.create_task(bridge.run())
+    await asyncio.sleep(0)
+
+    for i in range(100):
+        bridge.push('keyboard', {'key': i})
+    bridge.mouse_moves.add_move(0, 0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert bridge.get_stats()['buffered'] == 0
+    assert bridge.get_stats()['forwarded'] == 100
+    counts = event_manager.get_event_stats()['counts']
+    assert counts['keyboard'] == 100
+    assert counts['mouse_movement'] == 1
+
+def test_bridge_overwrites_oldest_when_full():
+    """Test that a full ring buffer drops the oldest events and counts them."""
+    bridge = InputBridge(EventManager(), capacity=4)
+    for i in range(6):
+        bridge.push('keyboard', {'key': i})
+
+    stats = bridge.get_stats()
+    assert stats['buffered'] == 4
+    assert stats['dropped'] == 2
+    assert [data['key'] for _, data, _ in bridge._drain()] == [2, 3, 4, 5]
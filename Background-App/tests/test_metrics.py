@@ -0,0 +1,25 @@
+import pytest
+from ..src.utils.metrics import LatencyHistogram
+
+def test_histogram_percentiles():
+    """Test that percentiles fall in the right power-of-two bucket."""
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.record(500_000)  # 0.5 ms
+    for _ in range(10):
+        histogram.record(40_000_000)  # 40 ms
+
+    summary = histogram.to_dict()
+    assert summary['count'] == 100
+    assert 0.5 <= summary['p50_ms'] <= 1.0
+    assert 40 <= summary['p99_ms'] <= 80
+    assert summary['max_ms'] == 40.0
+
+def test_histogram_reset():
+    """Test that reset clears all samples."""
+    histogram = LatencyHistogram()
+    histogram.record(1000)
+    histogram.reset()
+
+    assert histogram.to_dict()['count'] == 0
+    assert histogram.percentile(0.5) == 0.0
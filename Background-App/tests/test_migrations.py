@@ -0,0 +1,121 @@
+import sqlite3
+from ..src.utils.migrations import MIGRATIONS, migrate, schema_version
+from ..src.utils.sqlite_manager import SQLiteManager
+from ..src.sqlite_manager import SQLiteManager as AdminSchema
+
+LATEST = MIGRATIONS[-1][0]
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def test_new_database_is_at_latest_version(sqlite_manager):
+    """Test that a fresh database gets every migration once."""
+    with sqlite_manager.get_connection() as conn:
+        assert schema_version(conn) == LATEST
+        assert {'local_activity_logs', 'local_app_usage', 'local_breaks', 'profiles'} <= _tables(conn)
+        # Running again is a no-op
+        assert migrate(conn) == LATEST
+
+def test_failed_migration_is_rolled_back(temp_dir):
+    """Test that a migration and its version bump commit together."""
+    conn = sqlite3.connect(f"{temp_dir}/broken.db")
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (x)")
+        raise RuntimeError("boom")
+
+    MIGRATIONS.append((LATEST + 1, "broken", broken))
+    try:
+        try:
+            migrate(conn)
+        except RuntimeError:
+            pass
+        assert schema_version(conn) == LATEST
+        assert 'half_done' not in _tables(conn)
+    finally:
+        MIGRATIONS.pop()
+        conn.close()
+
+def test_legacy_tables_are_imported(temp_dir):
+    """Test that rows from the retired LocalDatabase tables move to local_* tables."""
+    path = f"{temp_dir}/legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE activity_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+            timestamp DATETIME NOT NULL, activity_type TEXT NOT NULL, details TEXT, synced BOOLEAN DEFAULT 0);
+        CREATE TABLE screenshots (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+            timestamp DATETIME NOT NULL, file_path TEXT NOT NULL, synced BOOLEAN DEFAULT 0);
+        CREATE TABLE breaks (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+            start_time DATETIME NOT NULL, end_time DATETIME, break_type TEXT NOT NULL, synced BOOLEAN DEFAULT 0);
+        INSERT INTO activity_logs (user_id, timestamp, activity_type, synced)
+            VALUES ('u', '2024-01-01T10:00:00.123456', 'idle', 1);
+        INSERT INTO screenshots (user_id, timestamp, file_path) VALUES ('u', '2024-01-01T10:00:00', '/tmp/a.png');
+        INSERT INTO breaks (user_id, start_time, break_type) VALUES ('u', '2024-01-01T12:00:00', 'lunch');
+    """)
+    conn.close()
+
+    manager = SQLiteManager(path)
+    with manager.get_connection() as conn:
+        assert not {'activity_logs', 'screenshots', 'breaks'} & _tables(conn)
+        assert conn.execute(
+            "SELECT activity_type, is_synced, created_at FROM local_activity_logs"
+        ).fetchall() == [('idle', 1, '2024-01-01 10:00:00')]
+        assert conn.execute("SELECT local_file_path FROM local_screenshots").fetchall() == [('/tmp/a.png',)]
+        assert conn.execute("SELECT break_type FROM local_breaks").fetchall() == [('lunch',)]
+    manager.close()
+
+def test_admin_schema_adapter(temp_dir):
+    """Test that src/sqlite_manager.py sets up the shared schema on a plain connection."""
+    conn = sqlite3.connect(f"{temp_dir}/admin.db")
+    AdminSchema(conn)
+    assert {'profiles', 'leave_requests', 'company_settings', 'local_app_usage'} <= _tables(conn)
+    assert schema_version(conn) == LATEST
+    conn.close()
+
+def test_app_names_are_interned(temp_dir):
+    """Test that version 5 moves app names and titles into lookup tables."""
+    path = f"{temp_dir}/v4.db"
+    conn = sqlite3.connect(path)
+    for version, _, func in MIGRATIONS:
+        if version <= 4:
+            func(conn)
+    conn.executemany(
+        "INSERT INTO local_activity_logs (id, user_id, app_name, window_title, activity_type) VALUES (?, 'u', ?, ?, 'input')",
+        [(1, 'code', 'a.py'), (2, 'code', 'b.py'), (3, 'chrome', None)]
+    )
+    conn.execute("INSERT INTO local_app_usage (id, user_id, app_name, window_title) VALUES (4, 'u', 'code', 'a.py')")
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+    conn.close()
+
+    manager = SQLiteManager(path)
+    with manager.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM apps").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0] == 2
+        assert 'app_name' not in [row[1] for row in conn.execute("PRAGMA table_info(local_activity_logs)")]
+        assert conn.execute(
+            "SELECT id, app_name, window_title FROM local_activity_logs_view ORDER BY id"
+        ).fetchall() == [(1, 'code', 'a.py'), (2, 'code', 'b.py'), (3, 'chrome', None)]
+        assert conn.execute(
+            "SELECT app_name, window_title FROM local_app_usage_view"
+        ).fetchall() == [('code', 'a.py')]
+    manager.close()
+
+def test_outbox_indexes_are_keyed_on_id(temp_dir):
+    """Test that migration 8 rebuilds the unsynced indexes on id and drops old watermarks."""
+    conn = sqlite3.connect(f"{temp_dir}/outbox.db")
+    for version, _, func in MIGRATIONS:
+        if version < 8:
+            func(conn)
+    conn.execute("PRAGMA user_version = 7")
+    conn.execute("""INSERT INTO local_settings (key, value)
+                    VALUES ('sync_watermark.local_screenshots', '["2024-01-01 00:00:00", 5]')""")
+    conn.commit()
+
+    migrate(conn)
+    index_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'idx_screenshots_unsynced'"
+    ).fetchone()[0]
+    assert "(id) WHERE is_synced = 0" in index_sql
+    assert conn.execute("SELECT COUNT(*) FROM local_settings WHERE key LIKE 'sync_watermark.%'").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,59 @@
+import pytest
+from ..src.utils.mouse_tracker import MouseMoveBuffer
+
+def test_distance_and_moves_are_summarized():
+    """Test that a straight path is measured and counted."""
+    buffer = MouseMoveBuffer(threshold=10)
+    for i in range(11):
+        buffer.add_move(i * 10, 0, t_ns=i)
+    buffer.add_scroll(3)
+
+    summary = buffer.flush()
+    assert summary['distance'] == 100
+    assert summary['moves'] == 10
+    assert summary['scroll_events'] == 3
+    assert summary['start_ns'] == 0
+    assert summary['end_ns'] == 10
+    assert buffer.flush() is None
+
+def test_sub_threshold_jitter_is_filtered():
+    """Test that jitter inside the threshold does not add distance."""
+    buffer = MouseMoveBuffer(threshold=10)
+    for i in range(500):
+        buffer.add_move(103 + (i % 3), 205 - (i % 2))
+
+    summary = buffer.flush()
+    assert summary['distance'] == 0
+    assert summary['moves'] == 0
+
+def test_jitter_across_grid_line_is_filtered():
+    """Test that jitter straddling a multiple of the threshold does not add distance."""
+    buffer = MouseMoveBuffer(threshold=10)
+    for i in range(500):
+        buffer.add_move(99 + (i % 2), 50)
+    summary = buffer.flush()
+    assert summary['distance'] == 0
+    assert summary['moves'] == 0
+
+    # Nor when the jitter continues in the next window
+    buffer.add_move(100, 50)
+    buffer.add_move(99, 50)
+    assert buffer.flush()['distance'] == 0
+
+def test_path_continues_across_windows():
+    """Test that distance between windows is not lost on flush."""
+    buffer = MouseMoveBuffer(threshold=10)
+    buffer.add_move(0, 0)
+    buffer.flush()
+    buffer.add_move(30, 40)
+
+    assert buffer.flush()['distance'] == 50
+
+def test_full_buffer_counts_dropped_samples():
+    """Test that samples past capacity are dropped and counted."""
+    buffer = MouseMoveBuffer(capacity=4)
+    for i in range(6):
+        buffer.add_move(i * 100, 0)
+
+    assert len(buffer) == 4
+    assert buffer.dropped == 2
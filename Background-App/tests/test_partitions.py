@@ -0,0 +1,107 @@
+import os
+from datetime import datetime
+from ..src.utils.partitions import PartitionManager
+
+def _insert_logs(sqlite_manager, rows):
+    sql = """INSERT INTO local_activity_logs (id, user_id, app_id, activity_type, is_synced, created_at)
+             VALUES (?, 'user-1', 1, 'input', ?, ?)"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, rows)
+
+def test_archive_moves_synced_rows_of_closed_days(sqlite_manager, temp_dir):
+    """Test that only synced rows from earlier days leave the hot table."""
+    _insert_logs(sqlite_manager, [
+        (1, 1, '2024-01-01 10:00:00'),
+        (2, 1, '2024-01-01 11:00:00'),
+        (3, 0, '2024-01-01 12:00:00'),
+        (4, 1, '2024-01-02 10:00:00'),
+        (5, 1, '2024-01-03 10:00:00'),
+    ])
+    partitions = PartitionManager(sqlite_manager, directory=os.path.join(temp_dir, 'parts'))
+
+    assert partitions.archive(now=datetime(2024, 1, 3, 12)) == 3
+    assert [key.isoformat() for key, _ in partitions.partitions()] == ['2024-01-01', '2024-01-02']
+    with sqlite_manager.get_connection() as conn:
+        hot = [row[0] for row in conn.execute("SELECT id FROM local_activity_logs ORDER BY id")]
+    assert hot == [3, 5]
+
+    with partitions.open_view('local_activity_logs') as view:
+        with sqlite_manager.get_connection() as conn:
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM {view} ORDER BY id")]
+    assert ids == [1, 2, 3, 4, 5]
+
+    with partitions.open_view('local_activity_logs', start=datetime(2024, 1, 2)) as view:
+        with sqlite_manager.get_connection() as conn:
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM {view} ORDER BY id")]
+    assert ids == [3, 4, 5]
+
+def test_drop_before_unlinks_expired_files(sqlite_manager, temp_dir):
+    """Test that retention removes whole partition files."""
+    _insert_logs(sqlite_manager, [
+        (1, 1, '2024-01-01 10:00:00'),
+        (2, 1, '2024-01-08 10:00:00'),
+    ])
+    partitions = PartitionManager(sqlite_manager, directory=os.path.join(temp_dir, 'parts'), period='week')
+    partitions.archive(now=datetime(2024, 1, 20))
+    assert len(partitions.partitions()) == 2
+
+    assert partitions.drop_before(datetime(2024, 1, 10)) == 1
+    assert [key.isoformat() for key, _ in partitions.partitions()] == ['2024-01-08']
+
+def test_legacy_partition_gets_interned_ids(sqlite_manager, temp_dir):
+    """Test that a partition archived with app name strings is rebuilt with ids."""
+    import sqlite3
+    partitions = PartitionManager(sqlite_manager, directory=os.path.join(temp_dir, 'parts'))
+    conn = sqlite3.connect(partitions.path_for('2024-01-01'))
+    conn.executescript("""
+        CREATE TABLE local_activity_logs (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, time_entry_id INTEGER,
+            app_name TEXT NOT NULL, window_title TEXT, activity_type TEXT NOT NULL,
+            is_synced INTEGER DEFAULT 0, created_at TEXT);
+        INSERT INTO local_activity_logs (id, user_id, app_name, window_title, activity_type, is_synced, created_at)
+            VALUES (1, 'user-1', 'code', 'a.py', 'input', 1, '2024-01-01 10:00:00');
+    """)
+    conn.close()
+    sqlite_manager.insert_activity_log('user-1', None, 'code', 'b.py', 'input')
+
+    with partitions.open_view('local_activity_logs') as view:
+        with sqlite_manager.get_connection() as conn:
+            rows = conn.execute(f"SELECT app_name, window_title FROM {view} ORDER BY id").fetchall()
+    assert rows == [('code', 'a.py'), ('code', 'b.py')]
+    with sqlite_manager.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM apps").fetchone()[0] == 1
+
+def test_range_reads_span_archived_days(sqlite_manager, temp_dir):
+    """Test that range and recent reads include rows already moved to partitions."""
+    # Two weeks of one synced log a day, plus one unsynced log on the first day
+    _insert_logs(sqlite_manager, [
+        (day, 1, f'2024-01-{day:02d} 10:00:00') for day in range(1, 15)
+    ] + [(100, 0, '2024-01-01 12:00:00')])
+    partitions = PartitionManager(sqlite_manager, directory=os.path.join(temp_dir, 'parts'))
+    partitions.archive(now=datetime(2024, 1, 14, 12))
+    assert len(partitions.partitions()) == 13
+
+    rows = partitions.read_range('local_activity_logs', datetime(2024, 1, 1), datetime(2024, 1, 15))
+    assert [r['id'] for r in rows] == [1, 100] + list(range(2, 15))
+    assert 'app_name' in rows[0] and 'app_id' not in rows[0]
+
+    rows = partitions.read_range('local_activity_logs', datetime(2024, 1, 2, 12), datetime(2024, 1, 4, 12))
+    assert [r['id'] for r in rows] == [3, 4]
+
+    recent = partitions.read_recent('local_activity_logs', 3, now=datetime(2024, 1, 14, 12))
+    assert [r['id'] for r in recent] == [14, 13, 12]
+    everything = partitions.read_recent('local_activity_logs', 100, now=datetime(2024, 1, 14, 12))
+    assert [r['id'] for r in everything] == list(range(14, 1, -1)) + [100, 1]
+
+def test_screenshots_wait_for_their_upload(sqlite_manager, temp_dir):
+    """Test that synced screenshot rows stay hot until their file has been uploaded."""
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, storage_path, is_synced, created_at)
+             VALUES (?, 'user-1', '/tmp/x.webp', ?, 1, '2024-01-01 10:00:00')"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(1, 'user-1/1.webp'), (2, None)])
+    partitions = PartitionManager(sqlite_manager, directory=os.path.join(temp_dir, 'parts'))
+
+    assert partitions.archive(now=datetime(2024, 1, 3)) == 1
+    assert [r['id'] for r in sqlite_manager.get_unsynced_screenshots_for_user('user-1')] == [2]
+    sqlite_manager.update_screenshot_sync_details(2, 'user-1/2.webp')
+    sqlite_manager.mark_as_synced('screenshots', [2])
+    assert partitions.archive(now=datetime(2024, 1, 3)) == 1
@@ -0,0 +1,81 @@
+import pytest
+
+def _plan(conn, sql, params=()):
+    return " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+def _assert_uses_index(plan, index):
+    assert f"INDEX {index}" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+@pytest.mark.parametrize('table,prefix', [
+    ('local_time_entries', 'time_entries'),
+    ('local_activity_logs', 'activity_logs'),
+    ('local_screenshots', 'screenshots'),
+])
+def test_unsynced_queries_use_partial_index(sqlite_manager, table, prefix):
+    """Test that the outbox reads only walk the unsynced rows."""
+    with sqlite_manager.get_connection() as conn:
+        _assert_uses_index(_plan(conn, f"""
+            SELECT * FROM {table}
+            WHERE is_synced = 0 AND id > ?
+            ORDER BY id LIMIT ?
+        """, (0, 100)), f"idx_{prefix}_unsynced")
+        _assert_uses_index(
+            _plan(conn, f"SELECT COUNT(*) FROM {table} WHERE is_synced = 0"),
+            f"idx_{prefix}_unsynced"
+        )
+
+@pytest.mark.parametrize('table,prefix', [
+    ('local_time_entries', 'time_entries'),
+    ('local_activity_logs', 'activity_logs'),
+    ('local_screenshots', 'screenshots'),
+])
+def test_user_range_queries_use_composite_index(sqlite_manager, table, prefix):
+    """Test that per-user time range reads are served by (user_id, created_at)."""
+    with sqlite_manager.get_connection() as conn:
+        _assert_uses_index(_plan(conn, f"""
+            SELECT * FROM {table}
+            WHERE user_id = ? AND created_at >= ?
+            ORDER BY created_at
+        """, ('user-1', '2024-01-01')), f"idx_{prefix}_user_created")
+
+def test_mark_as_synced_uses_primary_key(sqlite_manager):
+    """Test that acknowledgements look rows up by rowid."""
+    with sqlite_manager.get_connection() as conn:
+        plan = _plan(conn, "UPDATE local_activity_logs SET is_synced = 1 WHERE id IN (?, ?)", (1, 2))
+    assert "INTEGER PRIMARY KEY" in plan, plan
+
+@pytest.mark.parametrize('table,prefix', [
+    ('local_app_usage', 'app_usage'),
+    ('local_breaks', 'breaks'),
+])
+def test_local_database_unsynced_queries_use_index(sqlite_manager, table, prefix):
+    """Test that LocalDatabase's per-user unsynced reads use the partial indexes."""
+    with sqlite_manager.get_connection() as conn:
+        _assert_uses_index(_plan(conn, f"""
+            SELECT * FROM {table} WHERE user_id = ? AND is_synced = 0 AND id > ?
+            ORDER BY id LIMIT ?
+        """, ('user-1', 0, 100)), f"idx_{prefix}_unsynced")
+
+def test_outbox_view_uses_partial_index(sqlite_manager):
+    """Test that rehydrating app names keeps the keyset read on the partial index."""
+    with sqlite_manager.get_connection() as conn:
+        _assert_uses_index(_plan(conn, """
+            SELECT * FROM local_activity_logs_view
+            WHERE is_synced = 0 AND id > ?
+            ORDER BY id LIMIT ?
+        """, (0, 100)), "idx_activity_logs_unsynced")
+
+def test_outbox_skips_deferred_rows_by_primary_key(sqlite_manager):
+    """Test that leaving out deferred records probes sync_retries per row."""
+    with sqlite_manager.get_connection() as conn:
+        plan = _plan(conn, """
+            SELECT * FROM local_screenshots t
+            WHERE is_synced = 0 AND id > ? AND NOT EXISTS (
+                SELECT 1 FROM sync_retries r
+                WHERE r.table_name = ? AND r.record_id = t.id AND r.next_attempt_at > ?
+            )
+            ORDER BY id LIMIT ?
+        """, (0, 'local_screenshots', '2024-01-01 00:00:00', 100))
+    _assert_uses_index(plan, "idx_screenshots_unsynced")
+    assert "SEARCH r USING PRIMARY KEY" in plan, plan
@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import time
+import pytest
+from ..src.replay import FakeScreenBackend, FakeWindowBackend, replay_session
+from ..src.utils.event_journal import EventRecorder
+from ..src.utils.events import Event, type_code
+
+@pytest.mark.asyncio
+async def test_replay_feeds_window_and_screen_collectors(temp_dir):
+    """Test that replayed window and screenshot events go through the fake backends."""
+    path = os.path.join(temp_dir, 'session.wmej')
+    db_path = os.path.join(temp_dir, 'replay.db')
+    recorder = EventRecorder(path)
+    t_ns = time.monotonic_ns()
+    for i, event_type, data in [
+        (0, 'window', {'app_name': 'Editor', 'window_title': 'Editor'}),
+        (1, 'keyboard', {'event_type': 'down', 'name': 'a'}),
+        (2, 'screenshot', {}),
+        (3, 'window', {'app_name': 'Browser', 'window_title': 'Browser'}),
+        (4, 'screenshot', {}),
+    ]:
+        recorder.record(Event(type_code(event_type), data, t_ns + i))
+    recorder.close()
+
+    window_backend = FakeWindowBackend()
+    screen_backend = FakeScreenBackend()
+    stats = await replay_session(path, db_path, speed=None,
+                                 window_backend=window_backend,
+                                 screen_backend=screen_backend)
+
+    assert stats['events'] == 5
+    assert window_backend.polls == 2
+    assert screen_backend.grabs == 2
+
+    with sqlite3.connect(db_path) as conn:
+        apps = conn.execute("""SELECT app_name FROM local_activity_logs_view
+                               WHERE activity_type = 'window_focus' ORDER BY id""").fetchall()
+        files = conn.execute("SELECT local_file_path FROM local_screenshots ORDER BY id").fetchall()
+    assert [app for app, in apps] == ['Editor', 'Browser']
+    assert len(files) == 2
+    assert all(path.startswith(os.path.join(temp_dir, 'replay-data')) and os.path.exists(path)
+               for path, in files)
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+from ..src.utils import sqlite_manager as engine_module
+from ..src.utils.partitions import PartitionManager
+from ..src.utils.rollups import RollupTracker, cover, split_interval
+
+class FakeDatetime(datetime):
+    current = datetime(2024, 1, 1, 10, 0, 0)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.current
+
+def test_cover_uses_coarsest_buckets():
+    """Test that a range is read as whole days, then hours, then minutes."""
+    assert cover(datetime(2024, 1, 1, 23, 30, 45), datetime(2024, 1, 3, 1, 15)) == [
+        ('minute', datetime(2024, 1, 1, 23, 30), datetime(2024, 1, 2)),
+        ('day', datetime(2024, 1, 2), datetime(2024, 1, 3)),
+        ('hour', datetime(2024, 1, 3), datetime(2024, 1, 3, 1)),
+        ('minute', datetime(2024, 1, 3, 1), datetime(2024, 1, 3, 1, 15)),
+    ]
+
+def test_intervals_are_split_across_buckets():
+    """Test that an interval's seconds land in each bucket it overlaps."""
+    assert list(split_interval(datetime(2024, 1, 1, 10, 0, 50), datetime(2024, 1, 1, 10, 2, 10), 60)) == [
+        (datetime(2024, 1, 1, 10, 0), 10),
+        (datetime(2024, 1, 1, 10, 1), 60),
+        (datetime(2024, 1, 1, 10, 2), 10),
+    ]
+    tracker = RollupTracker()
+    assert tracker.record('u', datetime(2024, 1, 1, 10, 0, 50), 1) == []
+    upserts = tracker.record('u', datetime(2024, 1, 1, 10, 2, 10), 2, keystrokes=3)
+    # 3 minute + 1 hour + 1 day bucket for app 1, one of each grain for app 2's keystrokes
+    assert len(upserts) == 8
+
+def test_ingest_updates_rollups_incrementally(sqlite_manager, monkeypatch):
+    """Test that inserts maintain the rollups and a rebuild gives the same totals."""
+    monkeypatch.setattr(engine_module, 'datetime', FakeDatetime)
+    for at, app, activity_type, keys in (
+        (datetime(2024, 1, 1, 10, 0, 0), 'code', 'window_focus', 0),
+        (datetime(2024, 1, 1, 10, 0, 30), 'chrome', 'idle', 0),
+        (datetime(2024, 1, 1, 10, 2, 0), 'code', 'input', 5),
+    ):
+        FakeDatetime.current = at
+        sqlite_manager.insert_activity_log('user-1', None, app, None, activity_type, keystroke_count=keys)
+
+    expected = {
+        'code': {'active_seconds': 30, 'idle_seconds': 0, 'keystrokes': 5, 'mouse_events': 0, 'scroll_events': 0},
+        'chrome': {'active_seconds': 0, 'idle_seconds': 90, 'keystrokes': 0, 'mouse_events': 0, 'scroll_events': 0},
+    }
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    assert sqlite_manager.get_rollup_summary('user-1', start, end) == expected
+    assert sqlite_manager.get_rollup_summary('user-1', datetime(2024, 1, 1, 10, 1), end)['chrome']['idle_seconds'] == 60
+    assert sqlite_manager.get_rollup_summary('user-2', start, end) == {}
+
+    assert sqlite_manager.rebuild_rollups() == 3
+    assert sqlite_manager.get_rollup_summary('user-1', start, end) == expected
+
+def test_restart_continues_from_latest_log(temp_dir, monkeypatch):
+    """Test that the first log after a restart closes the interval of the last stored one."""
+    monkeypatch.setattr(engine_module, 'datetime', FakeDatetime)
+    path = f"{temp_dir}/restart.db"
+    first = engine_module.SQLiteManager(path)
+    FakeDatetime.current = datetime(2024, 1, 1, 10, 0, 0)
+    first.insert_activity_log('user-1', None, 'code', None, 'window_focus')
+    first.close()
+
+    second = engine_module.SQLiteManager(path)
+    FakeDatetime.current = datetime(2024, 1, 1, 10, 5, 0)
+    second.insert_activity_log('user-1', None, 'chrome', None, 'window_focus')
+    summary = second.get_rollup_summary('user-1', datetime(2024, 1, 1), datetime(2024, 1, 2))
+    assert summary['code']['active_seconds'] == 300
+    second.close()
+
+def test_rebuild_reads_archived_logs(sqlite_manager, monkeypatch):
+    """Test that a rebuild replays logs already moved to partition files."""
+    monkeypatch.setattr(engine_module, 'datetime', FakeDatetime)
+    for day in range(1, 5):
+        for hour in (10, 11):
+            FakeDatetime.current = datetime(2024, 1, day, hour)
+            sqlite_manager.insert_activity_log('user-1', None, 'code', None, 'input', keystroke_count=100)
+    sqlite_manager.flush()
+    with sqlite_manager.get_connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM local_activity_logs ORDER BY created_at")]
+    sqlite_manager.mark_as_synced('activities', ids[:5])
+    partitions = PartitionManager(sqlite_manager)
+    assert partitions.archive(now=datetime(2024, 1, 5)) == 5
+
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 5)
+    before = sqlite_manager.get_rollup_summary('user-1', start, end)
+    assert before['code']['keystrokes'] == 800
+    assert sqlite_manager.rebuild_rollups() == 8
+    assert sqlite_manager.get_rollup_summary('user-1', start, end) == before
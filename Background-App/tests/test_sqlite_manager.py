@@ -0,0 +1,351 @@
+import os
+import sqlite3
+import pytest
+from ..src.utils import ids
+from ..src.utils.sqlite_manager import SQLiteManager, SQLiteProfile
+
+def test_connection_is_reused(sqlite_manager):
+    """Test that the manager keeps one connection across calls."""
+    with sqlite_manager.get_connection() as first:
+        pass
+    sqlite_manager.insert_time_entry('user-1')
+    with sqlite_manager.get_connection() as second:
+        pass
+
+    assert first is second
+
+def test_profile_pragmas_are_applied(sqlite_manager):
+    """Test that the default profile enables WAL and relaxed syncing."""
+    with sqlite_manager.get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -8192
+
+def test_custom_profile(temp_dir):
+    """Test that a custom profile can be passed in."""
+    manager = SQLiteManager(f"{temp_dir}/custom.db", profile=SQLiteProfile(synchronous="FULL"))
+    with manager.get_connection() as conn:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+    manager.close()
+
+def test_failed_transaction_rolls_back(sqlite_manager):
+    """Test that an error inside get_connection discards the transaction."""
+    with pytest.raises(RuntimeError):
+        with sqlite_manager.get_connection() as conn:
+            conn.execute("INSERT INTO local_settings (key, value) VALUES ('a', 'b')")
+            raise RuntimeError("boom")
+
+    assert sqlite_manager.get_setting('a') is None
+
+def _count(manager, table):
+    with manager.get_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_inserts_are_buffered_until_flush(sqlite_manager):
+    """Test that inserts are held in the write buffer and committed together."""
+    for i in range(3):
+        sqlite_manager.insert_activity_log('user-1', None, f'app{i}', 'title', 'input')
+
+    assert len(sqlite_manager.write_buffer) == 3
+    assert _count(sqlite_manager, 'local_activity_logs') == 0
+
+    sqlite_manager.flush()
+    assert len(sqlite_manager.write_buffer) == 0
+    assert _count(sqlite_manager, 'local_activity_logs') == 3
+
+def test_write_buffer_flushes_on_batch_size(temp_dir):
+    """Test that reaching write_batch_size commits the buffered rows."""
+    manager = SQLiteManager(f"{temp_dir}/batch.db", write_batch_size=5, write_delay_ms=60000)
+    for i in range(5):
+        manager.insert_screenshot('user-1', None, f'/tmp/{i}.jpg')
+
+    assert len(manager.write_buffer) == 0
+    assert _count(manager, 'local_screenshots') == 5
+    manager.close()
+
+def test_reads_see_buffered_writes(sqlite_manager):
+    """Test that reads flush the buffer first."""
+    sqlite_manager.insert_time_entry('user-1')
+    data = sqlite_manager.get_unsynced_data()
+    assert len(data['time_entries']) == 1
+
+def test_duplicate_row_does_not_lose_group(sqlite_manager):
+    """Test that one conflicting row only drops itself from a group commit."""
+    sql = "INSERT INTO local_settings (key, value) VALUES (?, ?)"
+    sqlite_manager.write_buffer.add(sql, ('a', '1'))
+    sqlite_manager.write_buffer.add(sql, ('a', '2'))
+    sqlite_manager.write_buffer.add(sql, ('b', '3'))
+    sqlite_manager.flush()
+
+    assert sqlite_manager.get_setting('a') == '1'
+    assert sqlite_manager.get_setting('b') == '3'
+
+def test_failed_flush_keeps_rows(temp_dir):
+    """Test that rows survive a flush that fails because the database is locked."""
+    path = f"{temp_dir}/locked.db"
+    manager = SQLiteManager(path, profile=SQLiteProfile(busy_timeout_ms=50), write_delay_ms=60000)
+    first = [manager.insert_screenshot('user-1', None, f'/tmp/{i}.jpg') for i in range(3)]
+
+    blocker = sqlite3.connect(path)
+    blocker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError):
+        manager.flush()
+    assert len(manager.write_buffer) == 3
+    later = manager.insert_screenshot('user-1', None, '/tmp/later.jpg')
+    blocker.rollback()
+    blocker.close()
+
+    manager.flush()
+    assert len(manager.write_buffer) == 0
+    with manager.get_connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM local_screenshots ORDER BY rowid")]
+    assert ids == first + [later]
+    manager.close()
+
+def test_close_flushes_buffer(temp_dir):
+    """Test that close() commits pending rows."""
+    path = f"{temp_dir}/close.db"
+    manager = SQLiteManager(path)
+    manager.insert_time_entry('user-1')
+    manager.close()
+
+    reopened = SQLiteManager(path)
+    assert _count(reopened, 'local_time_entries') == 1
+    reopened.close()
+
+def test_bulk_mark_as_synced(sqlite_manager):
+    """Test that a large list of ids is acknowledged in one call."""
+    sql = "INSERT INTO local_activity_logs (id, user_id, app_id, activity_type) VALUES (?, ?, ?, ?)"
+    ids = list(range(1, 1201))
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(record_id, 'user-1', 1, 'input') for record_id in ids])
+
+    # Remote table names are mapped to the local cache tables
+    assert sqlite_manager.mark_as_synced('activities', ids[:1100]) == 1100
+    assert sqlite_manager.mark_as_synced('local_activity_logs', ids[1100]) == 1
+    assert len(sqlite_manager.get_unsynced_data()['activity_logs']) == 99
+
+def test_mark_as_synced_rejects_unknown_table(sqlite_manager):
+    """Test that only sync tables can be marked."""
+    with pytest.raises(ValueError):
+        sqlite_manager.mark_as_synced('local_settings', [1])
+
+def test_iter_unsynced_pages_by_keyset(sqlite_manager):
+    """Test that unsynced rows are streamed in batches, oldest first."""
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, created_at)
+             VALUES (?, 'user-1', '/tmp/x.jpg', ?)"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(i, f"2024-01-01 00:00:{i % 60:02d}") for i in range(1, 26)])
+
+    batches = list(sqlite_manager.iter_unsynced('screenshots', batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    keys = [(r['created_at'], r['id']) for batch in batches for r in batch]
+    assert keys == sorted(keys)
+    assert 'is_synced' not in batches[0][0]
+
+def test_iter_unsynced_starts_after_watermark(sqlite_manager):
+    """Test that the persisted watermark skips rows already known to be synced."""
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, created_at)
+             VALUES (?, 'user-1', '/tmp/x.jpg', '2024-01-01 00:00:00')"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(i,) for i in range(5)])
+    sqlite_manager.mark_as_synced('screenshots', [0, 1, 2])
+
+    sqlite_manager.set_sync_watermark('screenshots', 2)
+    assert sqlite_manager.get_sync_watermark('local_screenshots') == 2
+    rows = [r['id'] for batch in sqlite_manager.iter_unsynced('screenshots') for r in batch]
+    assert rows == [3, 4]
+
+def test_iter_unsynced_reads_rows_behind_watermark(sqlite_manager):
+    """Test that an unsynced row with an id below the watermark is still paged."""
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, created_at)
+             VALUES (?, 'user-1', '/tmp/x.jpg', '2024-01-01 00:00:00')"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(i,) for i in range(10, 15)])
+    sqlite_manager.mark_as_synced('screenshots', [10, 11, 12])
+    sqlite_manager.set_sync_watermark('screenshots', 12)
+    # Written by another process, or after a restart with the clock set back
+    with sqlite_manager.get_connection() as conn:
+        conn.execute(sql, (5,))
+
+    rows = [r['id'] for batch in sqlite_manager.iter_unsynced('screenshots') for r in batch]
+    assert rows == [5, 13, 14]
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 3
+
+def test_watermark_survives_clock_going_back(sqlite_manager):
+    """Test that rows written after the wall clock stepped back are still paged."""
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, created_at)
+             VALUES (?, 'user-1', '/tmp/x.jpg', ?)"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(1, '2024-01-01 12:00:00'), (2, '2024-01-01 12:00:01')])
+    sqlite_manager.mark_as_synced('screenshots', [1, 2])
+    sqlite_manager.set_sync_watermark('screenshots', 2)
+    # NTP moved the clock back an hour before the next insert
+    with sqlite_manager.get_connection() as conn:
+        conn.execute(sql, (3, '2024-01-01 11:00:00'))
+    rows = [r['id'] for batch in sqlite_manager.iter_unsynced('screenshots') for r in batch]
+    assert rows == [3]
+
+def test_legacy_text_ids_are_migrated(temp_dir):
+    """Test that a database with TEXT ids is rebuilt with integer ids."""
+    import sqlite3
+    path = f"{temp_dir}/legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE local_time_entries (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, task_id TEXT,
+            start_time TEXT NOT NULL, end_time TEXT, duration INTEGER, status TEXT DEFAULT 'active',
+            is_synced INTEGER DEFAULT 0, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE local_activity_logs (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, time_entry_id TEXT,
+            app_name TEXT NOT NULL, window_title TEXT, activity_type TEXT NOT NULL,
+            keystroke_count INTEGER DEFAULT 0, mouse_events INTEGER DEFAULT 0, idle_time INTEGER DEFAULT 0,
+            is_synced INTEGER DEFAULT 0, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE local_screenshots (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, time_entry_id TEXT,
+            local_file_path TEXT NOT NULL, storage_path TEXT, is_synced INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO local_time_entries (id, user_id, start_time) VALUES ('te_1.5', 'u', '2024-01-01');
+        INSERT INTO local_activity_logs (id, user_id, time_entry_id, app_name, activity_type)
+            VALUES ('al_1.6', 'u', 'te_1.5', 'app', 'input');
+    """)
+    conn.close()
+
+    manager = SQLiteManager(path)
+    data = manager.get_unsynced_data()
+    entry_id = data['time_entries'][0][0]
+    log = data['activity_logs'][0]
+    assert isinstance(entry_id, int)
+    assert isinstance(log[0], int)
+    assert log[2] == entry_id
+    with manager.get_connection() as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(local_activity_logs)")]
+    assert 'mouse_movement_distance' in columns
+    manager.close()
+
+def test_app_names_are_interned(sqlite_manager):
+    """Test that activity rows store ids and the views give back the strings."""
+    for title in ('a.py', 'b.py', 'a.py'):
+        sqlite_manager.insert_activity_log('user-1', None, 'code', title, 'input')
+    sqlite_manager.insert_app_usage('user-1', 'code', None, duration_seconds=5)
+
+    with sqlite_manager.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM apps").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0] == 2
+    sqlite_manager.flush()
+    with sqlite_manager.get_connection() as conn:
+        assert len({row[0] for row in conn.execute("SELECT app_id FROM local_activity_logs")}) == 1
+        assert conn.execute("SELECT app_name, window_title FROM local_app_usage_view").fetchall() == [('code', None)]
+
+    batch = next(sqlite_manager.iter_unsynced('activities'))
+    assert [(r['app_name'], r['window_title']) for r in batch] == [('code', 'a.py'), ('code', 'b.py'), ('code', 'a.py')]
+    assert 'app_id' not in batch[0]
+
+def test_interner_evicts_least_recently_used(sqlite_manager):
+    """Test that the LRU map stays bounded and evicted strings keep their ids."""
+    from ..src.utils.interning import Interner
+    interner = Interner('apps', 'name', capacity=2)
+    with sqlite_manager.get_connection() as conn:
+        first = interner.id_for(conn, 'one')
+        interner.id_for(conn, 'two')
+        interner.id_for(conn, 'one')
+        interner.id_for(conn, 'three')
+        assert len(interner) == 2
+        assert 'two' not in interner._cache
+        assert interner.id_for(conn, 'one') == first
+        assert interner.id_for(conn, None) is None
+
+def test_rejected_records_move_to_dead_letters(sqlite_manager):
+    """Test that repeated rejections dead-letter a record and requeueing restores it."""
+    sqlite_manager.insert_screenshot('user-1', None, '/tmp/a.jpg')
+    record = next(sqlite_manager.iter_unsynced('screenshots'))[0]
+    sqlite_manager.set_sync_watermark('screenshots', record['id'])
+
+    assert sqlite_manager.record_sync_failure('screenshots', [record], 'timeout', max_attempts=2) == []
+    assert sqlite_manager.record_sync_failure('screenshots', [record], 'bad row', permanent=True,
+                                              max_attempts=2) == [record['id']]
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 0
+    assert sqlite_manager.get_retry_counts() == {'retrying': 0, 'dead_letters': 1}
+    dead = sqlite_manager.get_dead_letters('screenshots')
+    assert [(d['record_id'], d['attempts'], d['error']) for d in dead] == [(record['id'], 2, 'bad row')]
+    assert dead[0]['payload']['local_file_path'] == '/tmp/a.jpg'
+
+    assert sqlite_manager.requeue_dead_letters() == 1
+    assert sqlite_manager.get_sync_watermark('screenshots') is None
+    assert [r['id'] for r in next(sqlite_manager.iter_unsynced('screenshots'))] == [record['id']]
+    assert sqlite_manager.get_retry_counts() == {'retrying': 0, 'dead_letters': 0}
+
+def test_mark_as_synced_clears_retry_state(sqlite_manager):
+    """Test that a record that finally syncs leaves the retry table."""
+    sqlite_manager.insert_screenshot('user-1', None, '/tmp/a.jpg')
+    record = next(sqlite_manager.iter_unsynced('screenshots'))[0]
+    sqlite_manager.record_sync_failure('screenshots', [record], 'timeout')
+    with sqlite_manager.get_connection() as conn:
+        attempts, next_attempt = conn.execute(
+            "SELECT attempts, next_attempt_at FROM sync_retries"
+        ).fetchone()
+    assert attempts == 1 and next_attempt > record['created_at']
+    sqlite_manager.mark_as_synced('screenshots', [record['id']])
+    assert sqlite_manager.get_retry_counts()['retrying'] == 0
+
+def test_screenshot_upload_details(sqlite_manager, temp_dir):
+    """Test the screenshot file upload bookkeeping used by SupabaseSync."""
+    path = os.path.join(temp_dir, 'a.webp')
+    with open(path, 'wb') as f:
+        f.write(b'webp')
+    first = sqlite_manager.insert_screenshot('user-1', None, path)
+    second = sqlite_manager.insert_screenshot('user-1', None, '/tmp/b.webp')
+    sqlite_manager.insert_screenshot('user-2', None, '/tmp/c.webp')
+
+    pending = sqlite_manager.get_unsynced_screenshots_for_user('user-1')
+    assert [r['id'] for r in pending] == [first, second]
+    assert [r['id'] for r in sqlite_manager.get_unsynced_screenshots_for_user('user-1', limit=1)] == [first]
+
+    # A row that was synced before its file was uploaded is queued again
+    record = next(sqlite_manager.iter_unsynced('screenshots'))[1]
+    sqlite_manager.mark_as_synced('screenshots', [second])
+    sqlite_manager.set_sync_watermark('screenshots', record['id'])
+    assert sqlite_manager.update_screenshot_sync_details(second, 'user-1/b.webp')
+    assert sqlite_manager.get_sync_watermark('screenshots') is None
+    synced = {r['id']: r['storage_path'] for batch in sqlite_manager.iter_unsynced('screenshots') for r in batch}
+    assert synced[second] == 'user-1/b.webp'
+    assert [r['id'] for r in sqlite_manager.get_unsynced_screenshots_for_user('user-1')] == [first]
+    assert not sqlite_manager.update_screenshot_sync_details(12345, 'missing.webp')
+
+    sqlite_manager.delete_screenshot_record_and_file(first, path)
+    assert not os.path.exists(path)
+    assert sqlite_manager.get_unsynced_screenshots_for_user('user-1') == []
+
+def test_recordings_keep_newest(sqlite_manager, temp_dir):
+    """Test that old recordings are deleted with their files once over the limit."""
+    paths = []
+    for i in range(4):
+        path = os.path.join(temp_dir, f'{i}.mp4')
+        with open(path, 'wb') as f:
+            f.write(b'mp4')
+        paths.append(path)
+        sqlite_manager.insert_recording('user-1', path, 3, 10)
+    sqlite_manager.insert_recording('user-2', '/tmp/other.mp4')
+
+    assert sqlite_manager.delete_old_recordings('user-1', keep=2) == 2
+    assert sqlite_manager.get_recording_count('user-1') == 2
+    assert sqlite_manager.get_recording_count('user-2') == 1
+    assert [os.path.exists(p) for p in paths] == [False, False, True, True]
+
+def test_new_ids_sort_after_stored_ones(temp_dir, monkeypatch):
+    """Test that opening a database seeds ids above its newest row, even one from the future."""
+    monkeypatch.setattr(ids, '_default_generator', ids.IdGenerator(node=1))
+    path = f"{temp_dir}/seeded.db"
+    engine = SQLiteManager(path)
+    future_ms = ids.id_timestamp_ms(ids.next_id()) - ids.ID_EPOCH_MS + 3_600_000
+    stored = (future_ms << (ids.NODE_BITS + ids.SEQUENCE_BITS)) | (2 << ids.SEQUENCE_BITS)
+    with engine.get_connection() as conn:
+        conn.execute("""INSERT INTO local_screenshots (id, user_id, local_file_path)
+                        VALUES (?, 'user-1', '/tmp/x.jpg')""", (stored,))
+    engine.close()
+
+    # A restart: the process starts over with a fresh generator
+    monkeypatch.setattr(ids, '_default_generator', ids.IdGenerator(node=1))
+    engine = SQLiteManager(path)
+    try:
+        assert engine.insert_time_entry('user-1') > stored
+    finally:
+        engine.close()
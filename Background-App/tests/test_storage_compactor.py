@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+from ..src.utils.async_storage import AsyncStorage
+from ..src.utils.sqlite_manager import SQLiteManager
+from ..src.utils.storage_compactor import StorageCompactor
+
+def _insert_entries(sqlite_manager, rows):
+    sql = """INSERT INTO local_time_entries (id, user_id, start_time, is_synced, created_at)
+             VALUES (?, 'user-1', ?, ?, ?)"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(i, 'x' * 500, synced, created) for i, synced, created in rows])
+
+def test_compact_deletes_only_old_synced_rows(sqlite_manager):
+    """Test that unsynced and recent rows survive compaction."""
+    _insert_entries(sqlite_manager, [
+        (i, 1, '2024-01-01 00:00:00') for i in range(1, 1201)
+    ] + [
+        (2000, 0, '2024-01-01 00:00:00'),
+        (2001, 1, '2024-03-01 00:00:00'),
+    ])
+    compactor = StorageCompactor(sqlite_manager, retention_days=30, chunk_size=100)
+
+    result = compactor.compact(now=datetime(2024, 3, 2))
+
+    assert result['deleted']['local_time_entries'] == 1200
+    assert result['reclaimed_bytes'] > 0
+    with sqlite_manager.get_connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM local_time_entries ORDER BY id")]
+    assert ids == [2000, 2001]
+
+def test_compact_keeps_screenshots_until_uploaded(sqlite_manager):
+    """Test that a synced screenshot row whose file is not uploaded survives compaction."""
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, storage_path, is_synced, created_at)
+             VALUES (?, 'user-1', '/tmp/x.jpg', ?, 1, '2024-01-01 00:00:00')"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(1, 'user-1/1.webp'), (2, None)])
+    compactor = StorageCompactor(sqlite_manager, retention_days=30, chunk_size=100)
+
+    result = compactor.compact(now=datetime(2024, 3, 2))
+
+    assert result['deleted']['local_screenshots'] == 1
+    with sqlite_manager.get_connection() as conn:
+        assert [row[0] for row in conn.execute("SELECT id FROM local_screenshots")] == [2]
+
+def test_existing_database_is_converted_to_incremental_vacuum(temp_dir):
+    """Test that a database created without auto_vacuum is converted once."""
+    path = f"{temp_dir}/old.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x)")
+    conn.close()
+
+    manager = SQLiteManager(path)
+    assert manager.enable_incremental_vacuum() is True
+    assert manager.enable_incremental_vacuum() is False
+    with manager.get_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    manager.close()
+
+@pytest.mark.asyncio
+async def test_async_compaction_lets_inserts_through(sqlite_manager):
+    """Test that each chunk is its own writer job, so queued inserts run mid-compaction."""
+    _insert_entries(sqlite_manager, [(i, 1, '2024-01-01 00:00:00') for i in range(1, 501)])
+    compactor = StorageCompactor(sqlite_manager, retention_days=30, chunk_size=100)
+    storage = AsyncStorage(sqlite_manager)
+    jobs = []
+    submit = storage.submit
+
+    def record(func, *args, **kwargs):
+        def job():
+            jobs.append(func.__name__)
+            return func(*args, **kwargs)
+        return submit(job)
+
+    storage.submit = record
+    try:
+        compaction = asyncio.create_task(compactor.compact_async(storage, now=datetime(2024, 3, 2)))
+        while 'delete_chunk' not in jobs:
+            await asyncio.sleep(0.001)
+        await storage.insert_screenshot('user-1', None, '/tmp/a.jpg')
+        result = await compaction
+    finally:
+        storage.close()
+
+    assert result['deleted']['local_time_entries'] == 500
+    assert jobs[0] == 'enable_incremental_vacuum'
+    assert jobs[-1] == 'incremental_vacuum'
+    assert jobs.count('delete_chunk') >= 6
+    assert jobs.index('insert_screenshot') < len(jobs) - 1
@@ -0,0 +1,121 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("supabase")
+from ..src.services import supabase_sync
+from ..src.services.supabase_sync import SupabaseSync, read_chunks, retry_delay
+
+@asynccontextmanager
+async def _storage_server(monkeypatch, respond=lambda name: 200):
+    """Serve a fake Supabase Storage upload endpoint; respond(name) picks each status."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    state = {'requests': [], 'in_flight': 0, 'peak': 0}
+
+    async def upload(request):
+        state['in_flight'] += 1
+        state['peak'] = max(state['peak'], state['in_flight'])
+        try:
+            body = await request.read()
+            state['requests'].append((request.match_info['name'], request.headers, len(body)))
+            await asyncio.sleep(0.02)
+            return web.Response(status=respond(request.match_info['name']), text='{}')
+        finally:
+            state['in_flight'] -= 1
+
+    app = web.Application()
+    app.router.add_post('/storage/v1/object/user-captures/user-1/{name}', upload)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(supabase_sync, 'SUPABASE_URL', str(server.make_url('')).rstrip('/'))
+    try:
+        yield state
+    finally:
+        await server.close()
+
+@pytest.fixture
+def supabase(sqlite_manager, temp_dir, monkeypatch):
+    """A SupabaseSync for user-1 on the test database."""
+    monkeypatch.chdir(temp_dir)
+    monkeypatch.setattr(supabase_sync, 'create_client', lambda url, key: None)
+    monkeypatch.setattr(supabase_sync, 'SUPABASE_KEY', 'test-key')
+    sync = SupabaseSync('user-1', sqlite_db=sqlite_manager)
+    yield sync
+    sync.close()
+
+def _screenshots(sqlite_manager, temp_dir, count, size=1000):
+    paths = []
+    for i in range(count):
+        path = os.path.join(temp_dir, f'{i}.webp')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        sqlite_manager.insert_screenshot('user-1', None, path)
+        paths.append(path)
+    return paths
+
+def test_retry_delay_is_jittered_and_bounded():
+    """Test that retry delays are spread out, grow exponentially and stop at RETRY_DELAY."""
+    for attempt in range(10):
+        limit = min(supabase_sync.RETRY_DELAY, supabase_sync.UPLOAD_RETRY_BASE_DELAY * 2 ** attempt)
+        delays = [retry_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= limit for delay in delays)
+        assert len(set(delays)) > 1
+        assert max(delays) > limit / 2
+
+@pytest.mark.asyncio
+async def test_read_chunks_streams_file(temp_dir):
+    """Test that files are read in fixed-size chunks."""
+    path = os.path.join(temp_dir, 'a.webp')
+    data = os.urandom(200_000)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    chunks = [chunk async for chunk in read_chunks(path, chunk_size=65536)]
+    assert [len(chunk) for chunk in chunks] == [65536, 65536, 65536, 3392]
+    assert b''.join(chunks) == data
+
+@pytest.mark.asyncio
+async def test_uploads_run_on_bounded_pool(supabase, sqlite_manager, temp_dir, monkeypatch):
+    """Test that uploads overlap up to the worker limit and each one is recorded."""
+    paths = _screenshots(sqlite_manager, temp_dir, 12, size=100_000)
+    records = sqlite_manager.get_unsynced_screenshots_for_user('user-1')
+
+    async with _storage_server(monkeypatch) as storage_server:
+        assert await supabase.upload_screenshots(records, workers=3) == 12
+
+    assert 2 <= storage_server['peak'] <= 3
+    for _, headers, size in storage_server['requests']:
+        assert 'Transfer-Encoding' not in headers
+        assert int(headers['Content-Length']) == size == 100_000
+        assert headers['x-upsert'] == 'true'
+    assert sqlite_manager.get_unsynced_screenshots_for_user('user-1') == []
+    assert not any(os.path.exists(path) for path in paths)
+
+@pytest.mark.asyncio
+async def test_rejected_upload_is_not_retried(supabase, sqlite_manager, temp_dir, monkeypatch):
+    """Test that transient failures are retried while a 403 gives up at once."""
+    _screenshots(sqlite_manager, temp_dir, 2)
+    flaky, forbidden = [f"{r['id']}.webp" for r in sqlite_manager.get_unsynced_screenshots_for_user('user-1')]
+    attempts = {}
+
+    def respond(name):
+        attempts[name] = attempts.get(name, 0) + 1
+        if name == forbidden:
+            return 403
+        return 503 if attempts[name] < 3 else 200
+
+    delays = []
+    monkeypatch.setattr(supabase_sync, 'retry_delay', lambda attempt: delays.append(attempt) or 0)
+
+    async with _storage_server(monkeypatch, respond):
+        await supabase.sync_screenshots()
+
+    assert attempts == {flaky: 3, forbidden: 1}
+    assert delays == [0, 1]
+    pending = sqlite_manager.get_unsynced_screenshots_for_user('user-1')
+    assert [f"{r['id']}.webp" for r in pending] == [forbidden]
+    assert os.path.exists(pending[0]['local_file_path'])
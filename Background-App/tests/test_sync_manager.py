@@ -0,0 +1,214 @@
+import pytest
+
+def _insert_screenshots(sqlite_manager, count):
+    sql = """INSERT INTO local_screenshots (id, user_id, local_file_path, created_at)
+             VALUES (?, 'user-1', '/tmp/x.jpg', '2024-01-01 00:00:00')"""
+    with sqlite_manager.get_connection() as conn:
+        conn.executemany(sql, [(i,) for i in range(count)])
+
+@pytest.mark.asyncio
+async def test_sync_streams_batches_and_advances_watermark(sync_manager, sqlite_manager):
+    """Test that the watermark stops at the first failed batch."""
+    _insert_screenshots(sqlite_manager, 12)
+    sync_manager.max_batch_size = 4
+    sent = []
+
+    async def sync_batch(batch):
+        if batch['records'][0]['id'] == 4:
+            raise RuntimeError("upload failed")
+        sent.append(len(batch['records']))
+        sqlite_manager.mark_as_synced(batch['table'], [r['id'] for r in batch['records']])
+
+    sync_manager._sync_batch = sync_batch
+    await sync_manager.sync_data()
+
+    assert sent == [4, 4]
+    assert sqlite_manager.get_sync_watermark('screenshots') == 3
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 4
+
+@pytest.mark.asyncio
+async def test_batches_share_one_connection_and_gzip(sync_manager, sqlite_manager):
+    """Test that batches reuse a pooled connection and large bodies are gzipped."""
+    import json
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    received = []
+
+    async def handler(request):
+        # aiohttp decodes gzip request bodies itself
+        body = await request.read()
+        received.append((request.transport.get_extra_info('peername'),
+                         request.headers['Content-Type'],
+                         request.headers.get('Content-Encoding'),
+                         json.loads(body)))
+        return web.Response(status=201)
+
+    app = web.Application()
+    app.router.add_post('/rest/v1/{table}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        sync_manager.supabase_url = str(server.make_url('')).rstrip('/')
+        sync_manager.compress_requests = True
+        sync_manager.compress_min_bytes = 200
+        sync_manager.max_batch_size = 4
+        _insert_screenshots(sqlite_manager, 9)
+
+        await sync_manager.sync_data()
+    finally:
+        await sync_manager.close()
+        await server.close()
+
+    assert [len(records) for _, _, _, records in received] == [4, 4, 1]
+    # Two batches are in flight at a time; the third reuses a pooled connection
+    assert len({peer for peer, _, _, _ in received}) < len(received)
+    assert {content_type for _, content_type, _, _ in received} == {'application/json'}
+    assert [encoding for _, _, encoding, _ in received] == ['gzip', 'gzip', None]
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 0
+
+@pytest.mark.asyncio
+async def test_batches_upload_concurrently_and_ack_in_order(sync_manager, sqlite_manager):
+    """Test that batches overlap up to the table's cap but are acknowledged in order."""
+    import asyncio
+    _insert_screenshots(sqlite_manager, 12)
+    sync_manager.max_batch_size = 2
+    sync_manager.upload_workers = 4
+    sync_manager.table_concurrency = {'screenshots': 3}
+    in_flight = []
+    peak = 0
+    acked = []
+
+    async def sync_batch(batch):
+        nonlocal peak
+        in_flight.append(batch)
+        peak = max(peak, len(in_flight))
+        # Earlier batches take longer, so they finish out of order
+        await asyncio.sleep(0.01 * (6 - batch['records'][0]['id'] // 2))
+        in_flight.remove(batch)
+
+    mark_as_synced = sync_manager.storage.mark_as_synced
+
+    async def record_ack(table, record_ids):
+        acked.append(record_ids[0])
+        return await mark_as_synced(table, record_ids)
+
+    sync_manager._sync_batch = sync_batch
+    sync_manager.storage.mark_as_synced = record_ack
+    await sync_manager.sync_data()
+
+    assert peak == 3
+    assert acked == [0, 2, 4, 6, 8, 10]
+    assert sqlite_manager.get_sync_watermark('screenshots') == 11
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 0
+
+@pytest.mark.asyncio
+async def test_batch_size_adapts_to_responses(sync_manager, sqlite_manager):
+    """Test that a 413 shrinks the next batches and the sizes show in the status."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    sizes = []
+
+    async def handler(request):
+        records = await request.json()
+        sizes.append(len(records))
+        return web.Response(status=413 if len(records) > 10 else 201)
+
+    app = web.Application()
+    app.router.add_post('/rest/v1/{table}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        sync_manager.supabase_url = str(server.make_url('')).rstrip('/')
+        sync_manager.max_batch_size = 20
+        sync_manager.table_concurrency = {'screenshots': 1}
+        _insert_screenshots(sqlite_manager, 40)
+        await sync_manager.sync_data()
+    finally:
+        await sync_manager.close()
+        await server.close()
+
+    # 20 is rejected, halved to 10, then grows again but only 10 rows are left
+    assert sizes == [20, 10, 10]
+    stats = (await sync_manager.get_sync_status())['batch_sizes']['screenshots']
+    assert stats['history'][0]['outcome'] == 'http_413'
+    assert [entry['size_after'] for entry in stats['history']] == [10, 35, 35]
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 20
+
+@pytest.mark.asyncio
+async def test_rejected_record_is_isolated_and_deferred(sync_manager, sqlite_manager):
+    """Test that a bad row is bisected out, scheduled for retry and skipped until then."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    requests = []
+    bad_id = str(sqlite_manager.to_remote({'id': 5})['id'])
+
+    async def handler(request):
+        records = await request.json()
+        requests.append((request.query.get('on_conflict'), request.headers.get('Prefer'), len(records)))
+        if any(r['id'] == bad_id for r in records):
+            return web.Response(status=400, text='bad row')
+        return web.Response(status=201)
+
+    app = web.Application()
+    app.router.add_post('/rest/v1/{table}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        sync_manager.supabase_url = str(server.make_url('')).rstrip('/')
+        sync_manager.max_batch_size = 12
+        _insert_screenshots(sqlite_manager, 12)
+        await sync_manager.sync_data()
+        first_pass = len(requests)
+        await sync_manager.sync_data()
+    finally:
+        await sync_manager.close()
+        await server.close()
+
+    assert {(on_conflict, prefer) for on_conflict, prefer, _ in requests} == {
+        ('id', 'resolution=merge-duplicates,return=minimal')
+    }
+    # Rows 0-11 with row 5 bad: [0-11] x, [0-5] x, [0-2], [3-5] x, [3], [4-5] x, [4], [5] x, [6-11]
+    assert [size for _, _, size in requests[:first_pass]] == [12, 6, 3, 3, 1, 2, 1, 1, 6]
+    # The deferred row is not sent again before its retry time
+    assert len(requests) == first_pass
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 1
+    assert sqlite_manager.get_sync_watermark('screenshots') is None
+    status = await sync_manager.get_sync_status()
+    assert status['retries'] == {'retrying': 1, 'dead_letters': 0}
+    assert status['unsynced_count']['screenshots'] == 1
+
+@pytest.mark.asyncio
+async def test_unauthorized_aborts_pass_without_bisecting(sync_manager, sqlite_manager):
+    """Test that a 401 stops the pass without splitting batches or recording failures."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from ..src.utils.sync_manager import SyncAborted
+
+    sizes = []
+
+    async def handler(request):
+        sizes.append(len(await request.json()))
+        return web.Response(status=401, text='invalid JWT')
+
+    app = web.Application()
+    app.router.add_post('/rest/v1/{table}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        sync_manager.supabase_url = str(server.make_url('')).rstrip('/')
+        _insert_screenshots(sqlite_manager, 200)
+        for _ in range(5):
+            with pytest.raises(SyncAborted):
+                await sync_manager.sync_data()
+    finally:
+        await sync_manager.close()
+        await server.close()
+
+    # At most the batches already in flight when the first 401 came back
+    assert sizes and set(sizes) == {10}
+    assert len(sizes) <= 5 * sync_manager.upload_workers
+    assert sqlite_manager.get_unsynced_counts()['screenshots'] == 200
+    assert sqlite_manager.get_retry_counts() == {'retrying': 0, 'dead_letters': 0}